@@ -1,16 +1,27 @@
-import seaborn as sns
 from faicons import icon_svg  # Import FontAwesome icons for UI elements
-from shared import app_dir, load_dataset  # Import dataset loader function
+from shared import app_dir, dataset_fingerprint, load_dataset  # Import dataset loader function
+from formats import UPLOAD_EXTENSIONS  # Every format the loader sniffs
+from streaming import ChunkReader, StreamingProfile, is_streamable, profile_next_chunk  # Chunked ingest for large files
+from plotting import (  # Server-side aggregated figures
+    add_scatter_layers, bar_figure, binned_histogram_figure, density_figure, histogram_figure, scatter_points,
+    set_trendline, style_scatter, trendline,
+)
+from pushdown import PUSHDOWN_AVAILABLE, is_pushdown_format, open_dataset  # Statistics as DuckDB queries over the whole file
+from correlation import correlation_matrix as compute_correlations, sample_correlation_matrix  # Cached correlation service
+from approximate import REFINE_FACTOR, preview, sampled_histogram, sampled_value_counts  # Sampled views with 95% intervals
+from incremental import append_file, appendable  # Appended batches merged into running aggregates
+from dataset_profile import get_profile  # Per-column statistics, computed once per dataset
+from jobs import run_analysis_in_background, run_in_background  # Thread pools for slow work, off the event loop
+from paged_grid import paged_grid_server, paged_grid_ui  # Server-side sorted/filtered pages
+from instrumentation import PERF_PANEL, instrument, perf_panel_server, perf_panel_ui  # Timing of every reactive
 import pandas as pd
 import numpy as np
-import plotly.express as px  # Import Plotly Express for interactive plots
-import plotly.graph_objects as go
 from shiny import reactive, req  # Import reactive utilities for interactivity
 from shiny.express import input, render, ui  # Import Shiny Express for UI and rendering
 from shinywidgets import render_widget  # Import render_widget for Plotly plots
 
 # Constants for performance optimization
-MAX_POINTS_SCATTER = 1000  # Maximum number of points to plot in scatter
+MAX_POINTS_SCATTER = 1000  # Above this many points, the scatter plot switches to a density raster
 MAX_BINS_HIST = 50  # Maximum number of bins for histogram
 
 ui.page_opts(title="Data Analysis Dashboard", fillable=True)  # Set the title of the dashboard
@@ -18,21 +29,278 @@ ui.page_opts(title="Data Analysis Dashboard", fillable=True)  # Set the title of
 # Sidebar for dataset upload and filters
 with ui.sidebar(title="Dataset Upload & Filters"):
     # File Upload Input
-    ui.input_file("uploaded_file", "Upload a Dataset", accept=[".csv", ".xlsx", ".json", ".rds"])
+    ui.input_file("uploaded_file", "Upload a Dataset", accept=UPLOAD_EXTENSIONS)
+    # Streaming reads CSV/TSV/JSON-lines in chunks; plots and previews then use a uniform row sample
+    ui.input_checkbox("streaming", "Streaming ingest (large files)", value=False)
+    # Pushdown registers CSV/TSV/JSON-lines/Parquet in DuckDB; statistics are queries, previews a row sample
+    ui.input_checkbox("pushdown", "SQL pushdown (large files, needs duckdb)", value=False)
+    # Fast preview computes every view on a row sample sized to a time budget, then refines it in the background
+    ui.input_checkbox("fast_preview", "Fast preview (sampled, refines to exact)", value=False)
+    # Appended rows update the statistics from running aggregates, in time proportional to the new rows
+    ui.input_file("append_file", "Append rows to the dataset", accept=UPLOAD_EXTENSIONS)
+
+    @render.text
+    @instrument
+    def preview_status():
+        if not preview_active():
+            return ""
+        state = preview_state()
+        if state is None:
+            return "Sampling…"
+        if state.exact:
+            return f"Exact: all {len(state.sample):,} rows"
+        return f"Estimates from {len(state.sample):,} of {state.profile.rows:,} rows (95% intervals), refining…"
+
+# **Streaming ingest: chunks are parsed and profiled in the background, then merged so statistics fill in progressively**
+stream_state = {"chunks": None, "profile": None}  # Per-session reader and running aggregates
+stream_version = reactive.value(0)  # Bumped after every chunk and at end of file
+stream_sample_version = reactive.value(0)  # Bumped when the row sample should be re-read
+
+def _bump(value):
+    with reactive.isolate():
+        value.set(value() + 1)
+
+def streaming_active():
+    uploaded_file = input.uploaded_file()
+    return bool(input.streaming() and uploaded_file and is_streamable(uploaded_file[0]["datapath"]))
+
+@reactive.extended_task
+@instrument
+async def chunk_job(chunks):
+    return await run_in_background(profile_next_chunk, chunks, name="stream_chunk")
+
+@reactive.effect
+@instrument
+def _start_stream():
+    chunk_job.cancel()  # A chunk of the previous file still parsing is discarded
+    if stream_state["chunks"] is not None:
+        stream_state["chunks"].close()  # Releases the previous file and parser
+    if not streaming_active():
+        stream_state["chunks"] = stream_state["profile"] = None
+        return
+    stream_state["profile"] = StreamingProfile()
+    stream_state["chunks"] = ChunkReader(input.uploaded_file()[0]["datapath"])
+    chunk_job.invoke(stream_state["chunks"])
+
+@reactive.effect
+@instrument
+def _store_chunk():
+    part = chunk_job.result()
+    profile = stream_state["profile"]
+    if part is None:  # End of file
+        stream_state["chunks"] = None
+        profile.done = True
+        _bump(stream_sample_version)
+    else:
+        first = profile.rows == 0
+        profile.merge(part)
+        if first:  # Give the plots something to show
+            _bump(stream_sample_version)
+        chunk_job.invoke(stream_state["chunks"])  # Outputs are sent while the next chunk parses
+    _bump(stream_version)
+
+def pushdown_active():
+    uploaded_file = input.uploaded_file()
+    return bool(PUSHDOWN_AVAILABLE and input.pushdown() and not streaming_active() and uploaded_file
+                and is_pushdown_format(uploaded_file[0]["datapath"]))
+
+def preview_active():
+    return bool(input.fast_preview() and not streaming_active() and not pushdown_active() and appended() is None)
+
+@reactive.calc
+@instrument
+def stream_profile():
+    """Returns the running StreamingProfile, or None when not streaming."""
+    stream_version()
+    return stream_state["profile"] if streaming_active() else None
+
+# **Background jobs: parsing, density plots and correlations run off the event loop; stale jobs are cancelled**
+@reactive.extended_task
+@instrument
+async def load_job(file_path):
+    return await run_in_background(load_dataset, file_path)
+
+@reactive.extended_task
+@instrument
+async def pushdown_job(file_path):
+    return await run_in_background(open_dataset, file_path)  # Imports into DuckDB once per file, then profiles
+
+@reactive.effect
+@reactive.event(input.pushdown)
+@instrument
+def _warn_pushdown_unavailable():
+    if input.pushdown() and not PUSHDOWN_AVAILABLE:
+        ui.notification_show("SQL pushdown needs the duckdb package; files are loaded into pandas instead.",
+                             type="warning")
+
+@reactive.effect(priority=1)
+@instrument
+def _submit_pushdown():
+    if pushdown_active():
+        pushdown_job.cancel()
+        pushdown_job.invoke(input.uploaded_file()[0]["datapath"])
+
+@reactive.calc
+@instrument
+def sql_dataset():
+    """The uploaded file registered in DuckDB, or None when pushdown is off."""
+    if not pushdown_active():
+        return None
+    return pushdown_job.result()
+
+@reactive.effect(priority=1)  # Before outputs, so they show progress instead of the previous result
+@instrument
+def _submit_load():
+    append_job.cancel()
+    append_frame_job.cancel()
+    append_state["chain"] = {}
+    appended.set(None)  # A new dataset (or mode) starts without appended rows
+    if streaming_active() or pushdown_active():
+        return
+    uploaded_file = input.uploaded_file()
+    load_job.cancel()
+    load_job.invoke(uploaded_file[0]["datapath"] if uploaded_file else None)  # None = default dataset
+
+# **Fast preview: a sample sized to PREVIEW_BUDGET_SECONDS first, then REFINE_FACTOR times larger until exact**
+preview_state = reactive.value(None)  # Latest Preview; stays on screen while the next refinement runs
+
+@reactive.extended_task
+@instrument
+async def preview_job(df, key, rows):
+    return await run_in_background(preview, df, key, rows)
+
+@reactive.effect(priority=1)
+@instrument
+def _start_preview():
+    preview_job.cancel()
+    preview_state.set(None)
+    if preview_active():
+        preview_job.invoke(dataset(), dataset_key(), None)  # None = sized to the latency budget
+
+@reactive.effect
+@instrument
+def _refine_preview():
+    state = preview_job.result()
+    preview_state.set(state)
+    if not state.exact:
+        with reactive.isolate():
+            preview_job.invoke(dataset(), dataset_key(), len(state.sample) * REFINE_FACTOR)
+
+# **Append mode: each batch is merged into the dataset's aggregates, so the stats don't rescan earlier rows**
+appended = reactive.value(None)  # Latest incremental.AppendableDataset, or None before the first append
+append_state = {"chain": {}, "seen": set()}  # chain: latest version of the current dataset; seen: uploads handled
+
+def append_rows(chain, df, key, file_path):
+    """Appends a file to the chain's latest version (the loaded dataset at first). Queued invocations run
+    one after another, so each batch builds on the previous one even if it was uploaded while that one ran.
+    """
+    try:
+        chain["version"] = append_file(chain.get("version") or appendable(df, key), file_path)
+    except ValueError as e:
+        return None, str(e)
+    return chain["version"], None
+
+@reactive.extended_task
+@instrument
+async def append_job(chain, df, key, file_path):
+    return await run_in_background(append_rows, chain, df, key, file_path, name="append")
+
+@reactive.extended_task
+@instrument
+async def append_frame_job(version):
+    return await run_in_background(getattr, version, "frame", name="append_frame")  # Joins the batches once
+
+@reactive.effect
+@instrument
+def _submit_append():
+    file_info = input.append_file()
+    req(file_info)
+    df = load_job.result()  # A batch uploaded while the dataset is still loading waits for it
+    with reactive.isolate():
+        file_path = file_info[0]["datapath"]
+        if file_path in append_state["seen"]:  # The input keeps its last upload when a new dataset is loaded
+            return
+        append_state["seen"].add(file_path)
+        if streaming_active() or pushdown_active():
+            ui.notification_show("Appending needs the dataset in memory: turn off streaming ingest and SQL pushdown.",
+                                 type="warning")
+            return
+        append_job.invoke(append_state["chain"], df, dataset_key(), file_path)
+
+@reactive.effect
+@instrument
+def _store_append():
+    version, error = append_job.result()
+    if error:
+        ui.notification_show(f"Could not append the file: {error}", type="error", duration=None)
+        return
+    appended.set(version)
+    append_frame_job.invoke(version)  # Only the views that read rows wait for it
+    ui.notification_show(f"Appended batch {version.batches}: {version.rows:,} rows in total", type="message")
+
+@reactive.effect
+@instrument
+def _report_load_error():
+    error = load_job.result().attrs.get("load_error")
+    if error:
+        ui.notification_show(f"Could not load the file: {error}", type="error", duration=None)
 
 # **Reactive function to load dataset**
 @reactive.calc
+@instrument
 def dataset():
     """Loads the dataset reactively when a new file is uploaded."""
     uploaded_file = input.uploaded_file()
-    if uploaded_file:
-        path = uploaded_file[0]["datapath"]
-        if path.endswith('.csv'):
-            return pd.read_csv(path)
-        elif path.endswith(('.xlsx', '.xls')):
-            return pd.read_excel(path)
-        return load_dataset(path)  # Load user-uploaded file
-    return load_dataset()  # Use default dataset if no file is uploaded
+    if streaming_active():
+        stream_sample_version()
+        profile = stream_state["profile"]
+        req(profile is not None and profile.rows > 0)
+        return profile.sample.rows.copy(deep=False)  # Uniform sample; never the full file
+    if pushdown_active():
+        return sql_dataset().sample()  # Drawn by pushdown_job (open_dataset); stats query the engine
+    if appended() is not None:
+        return append_frame_job.result()  # Loaded rows plus every appended batch, joined in the background
+    return load_job.result()  # Parsed in the background (cached by content); outputs show progress until then
+
+@reactive.calc
+@instrument
+def dataset_key():
+    """Content fingerprint of the current dataset, shared by caches across sessions (None for streamed samples)."""
+    if streaming_active() or pushdown_active():
+        return None
+    if appended() is not None:
+        return appended().key  # Derived from the loaded file and the appended batches
+    uploaded_file = input.uploaded_file()
+    return dataset_fingerprint(uploaded_file[0]["datapath"] if uploaded_file else app_dir / "penguins.csv")
+
+@reactive.calc
+@instrument
+def preview_sample():
+    """The current fast-preview Preview, or None when the views use the whole dataset."""
+    if not preview_active():
+        return None
+    state = preview_state()
+    req(state is not None)
+    return state
+
+@reactive.calc
+@instrument
+def analysis_frame():
+    """The rows the plots are computed from: the fast-preview sample, or the whole dataset."""
+    state = preview_sample()
+    return state.sample if state is not None else dataset()
+
+@reactive.calc
+@instrument
+def dataset_profile():
+    """Column types, counts and moments of the current dataset; every stats view and selector reads this."""
+    if pushdown_active():
+        return sql_dataset().profile  # Aggregated in DuckDB over every row
+    if (state := preview_sample()) is not None:
+        return state.profile  # Estimates with 95% intervals until the preview is exact
+    if appended() is not None:
+        return appended().profile  # From the merged aggregates; quartiles and numeric distinct counts are sketched
+    return get_profile(dataset(), dataset_key())
 
 # **Creates a responsive layout for value boxes**
 with ui.layout_column_wrap(fill=False):
@@ -40,54 +308,57 @@ with ui.layout_column_wrap(fill=False):
         "Number of rows in dataset"
 
         @render.text
+        @instrument
         def count():
-            return dataset().shape[0]  # Displays the number of rows in the dataset
+            profile = stream_profile()
+            if profile is not None:
+                return f"{profile.rows:,}" + ("" if profile.done else " (loading…)")
+            return dataset_profile().rows  # Displays the number of rows in the dataset
 
     with ui.value_box(showcase=icon_svg("ruler-horizontal")):
         "Number of columns"
 
         @render.text
+        @instrument
         def column_count():
-            return dataset().shape[1]  # Displays the number of columns
+            profile = stream_profile()
+            if profile is not None:
+                return profile.column_count
+            return dataset_profile().column_count  # Displays the number of columns
 
 # **Column layout for plots and data tables**
 with ui.layout_columns():
     with ui.card(full_screen=True):
         ui.card_header("Data Preview")
 
-        @render.data_frame
-        def data_preview():
-            df = dataset()  # Load dataset
-            df.columns = df.columns.astype(str)  # Ensure column names are strings
-            return render.DataGrid(df, filters=False, selection_mode="none")
+        paged_grid_ui("data_preview")  # Only the visible page of rows is sent to the browser
+        paged_grid_server("data_preview", dataset, dataset_key)
 
 # Main content area with tabs
 with ui.navset_tab():
     # Summary Statistics Tab
     with ui.nav_panel("Descriptive Statistics"):
         @render.data_frame
+        @instrument
         def summary_stats():
-            df = dataset()
-            numeric_cols = df.select_dtypes(include=np.number).columns
-            if len(numeric_cols) > 0:
-                stats = df[numeric_cols].describe().T
-                stats = stats.reset_index().rename(columns={'index': 'Variable'})
+            profile = stream_profile()
+            if profile is not None:
+                stats = profile.summary_stats()  # Running aggregates; quantiles are approximate
+                return stats if len(stats) > 0 else pd.DataFrame({"Message": ["No numeric variables found"]})
+            stats = dataset_profile().summary_stats()
+            if len(stats) > 0:
                 return stats
             return pd.DataFrame({"Message": ["No numeric variables found"]})
 
     # Variable Types Tab
     with ui.nav_panel("Data Structure"):
         @render.data_frame
+        @instrument
         def var_types():
-            df = dataset()
-            var_type_df = pd.DataFrame({
-                'Variable': df.columns,
-                'Data Type': df.dtypes.astype(str),
-                'Unique Values': [df[col].nunique() for col in df.columns],
-                'Missing Values': df.isna().sum().values,
-                '% Missing': (df.isna().sum().values / len(df) * 100).round(2)
-            })
-            return var_type_df
+            profile = stream_profile()
+            if profile is not None:
+                return profile.var_types()  # Unique Values are HyperLogLog estimates
+            return dataset_profile().var_types()
 
     # Distribution Analysis Tab
     with ui.nav_panel("Univariate Analysis"):
@@ -101,25 +372,39 @@ with ui.navset_tab():
             ui.input_select("plot_var", "Select Variable:", choices=[])
         
         @render_widget
+        @instrument
         def distribution_plot():
             req(input.plot_var())
-            df = dataset()
+            df = analysis_frame()
             var = input.plot_var()
+            sql = sql_dataset()
+            if sql is not None:  # Binned and counted in the engine over every row
+                req(var in sql.schema)
+                if dataset_profile().columns[var].kind == "numeric":
+                    counts, edges = sql.histogram(var, min(MAX_BINS_HIST, dataset_profile().columns[var].distinct))
+                    return binned_histogram_figure(counts, edges, f"Distribution of {var}", var)
+                return bar_figure(sql.value_counts(var), title=f"Distribution of {var} (Top 20 Categories)")
+            req(var in df.columns)  # A selection from the previous dataset
+            state = preview_sample()
+            if state is not None and not state.exact:  # Sample counts scaled to the table, with 95% error bars
+                rows, note = state.profile.rows, f" (estimated from {len(df):,} rows)"
+                if df[var].dtype.kind in 'ifc':
+                    counts, errors, edges = sampled_histogram(
+                        df[var], min(MAX_BINS_HIST, dataset_profile().columns[var].distinct), rows)
+                    return binned_histogram_figure(counts, edges, f"Distribution of {var}{note}", var, errors=errors)
+                counts, errors = sampled_value_counts(df[var], rows)
+                return bar_figure(counts, title=f"Distribution of {var} (Top 20 Categories){note}", errors=errors)
             
-            if df[var].dtype.kind in 'ifc':  # If numeric
-                return px.histogram(
-                    df, 
-                    x=var,
+            if df[var].dtype.kind in 'ifc':  # If numeric: binned here, only edges and counts are sent
+                return histogram_figure(
+                    df[var],
                     title=f"Distribution of {var}",
-                    nbins=min(MAX_BINS_HIST, len(df[var].unique()))
+                    nbins=min(MAX_BINS_HIST, dataset_profile().columns[var].distinct)
                 )
             else:  # If categorical
-                value_counts = df[var].value_counts().nlargest(20)
-                return px.bar(
-                    x=value_counts.index, 
-                    y=value_counts.values,
-                    title=f"Distribution of {var} (Top 20 Categories)"
-                )
+                top_values = dataset_profile().columns[var].top_values if appended() is not None else None
+                value_counts = top_values if top_values is not None else df[var].value_counts().nlargest(20)
+                return bar_figure(value_counts, title=f"Distribution of {var} (Top 20 Categories)")
 
     # Correlation Analysis Tab
     with ui.nav_panel("Bivariate Analysis"):
@@ -140,50 +425,118 @@ with ui.navset_tab():
                 ui.input_checkbox("show_outliers", "Highlight Outliers", value=False)
                 ui.input_select("color_by", "Color By:", choices=[])
         
+        # Stages: points and outliers (dataset, x, y) -> trendline (+ reg_type) -> figure (+ color_by) -> style.
+        # A later stage never recomputes an earlier one, and the trendline and style patch the live widget.
+        @reactive.extended_task
+        @instrument
+        async def scatter_points_job(df, x_var, y_var):
+            return await run_in_background(scatter_points, df, x_var, y_var)
+
+        @reactive.effect(priority=1)
+        @instrument
+        def _submit_scatter_points():
+            req(input.x_var(), input.y_var())
+            df = analysis_frame()
+            req(input.x_var() in df.columns, input.y_var() in df.columns)
+            if len(df) > MAX_POINTS_SCATTER:
+                scatter_points_job.cancel()
+                scatter_points_job.invoke(df, input.x_var(), input.y_var())
+
+        @reactive.calc
+        @instrument
+        def scatter_data():
+            """Finite (x, y) pairs and z-score outliers of the selected columns; extracted in the background for large data."""
+            req(input.x_var(), input.y_var())
+            df = analysis_frame()
+            req(input.x_var() in df.columns, input.y_var() in df.columns)  # Selections from the previous dataset
+            if len(df) > MAX_POINTS_SCATTER:
+                return scatter_points_job.result()
+            return scatter_points(df, input.x_var(), input.y_var())
+
+        @reactive.extended_task
+        @instrument
+        async def trendline_job(points, reg_type):
+            return await run_analysis_in_background(trendline, points.x, points.y, reg_type)
+
+        @reactive.effect(priority=1)
+        @instrument
+        def _submit_trendline():
+            points = scatter_data()
+            trendline_job.cancel()
+            trendline_job.invoke(points, input.reg_type())
+
         @render_widget
+        @instrument
         def scatter_plot():
-            req(input.x_var(), input.y_var())
-            df = dataset()
+            import plotly.express as px  # Imported on the first plot, not at startup
+
+            points = scatter_data()
+            x_var, y_var = input.x_var(), input.y_var()
+            df = analysis_frame()
             
+            # Large data: density raster of every row plus individual outliers, instead of a random sample
             if len(df) > MAX_POINTS_SCATTER:
-                df = df.sample(n=MAX_POINTS_SCATTER, random_state=42)
-            
-            # Calculate outliers if requested
-            if input.show_outliers():
-                z_scores = np.abs((df[input.x_var()] - df[input.x_var()].mean()) / df[input.x_var()].std())
-                z_scores_y = np.abs((df[input.y_var()] - df[input.y_var()].mean()) / df[input.y_var()].std())
-                df['is_outlier'] = (z_scores > 3) | (z_scores_y > 3)
-                color_col = 'is_outlier'
-            elif input.color_by() and input.color_by() != "None":
-                color_col = input.color_by()
+                fig = density_figure(points, x_var, y_var, title=f"{x_var} vs {y_var}")
             else:
-                color_col = None
-            
-            fig = px.scatter(
-                df,
-                x=input.x_var(),
-                y=input.y_var(),
-                color=color_col,
-                title=f"{input.x_var()} vs {input.y_var()}",
-                size=[input.point_size()] * len(df),
-                trendline="ols" if input.reg_type() == "Linear" else "lowess" if input.reg_type() == "Lowess" else None
-            )
+                color_col = input.color_by() if input.color_by() and input.color_by() != "None" else None
+                fig = add_scatter_layers(px.scatter(df, x=x_var, y=y_var, color=color_col, title=f"{x_var} vs {y_var}"), points)
             
-            if input.show_outliers():
-                fig.update_traces(
-                    marker=dict(
-                        size=[input.point_size() * 1.5 if x else input.point_size() for x in df['is_outlier']],
-                        color=['red' if x else 'blue' for x in df['is_outlier']]
-                    )
-                )
-            
-            return fig
+            with reactive.isolate():  # Style changes are patched in by _restyle_scatter, not rebuilt
+                return style_scatter(fig, input.show_outliers(), input.point_size())
+
+        @reactive.effect
+        @instrument
+        def _restyle_scatter():
+            show_outliers, point_size = input.show_outliers(), input.point_size()
+            with reactive.isolate():
+                widget = scatter_plot.widget
+            style_scatter(widget, show_outliers, point_size)
+
+        @reactive.effect
+        @instrument
+        def _update_trendline():
+            trend = trendline_job.result()
+            with reactive.isolate():
+                reg_type = input.reg_type()
+            set_trendline(scatter_plot.widget, trend, reg_type)  # Re-applied whenever the figure is rebuilt
+
+        @reactive.extended_task
+        @instrument
+        async def pair_correlation_job(df, columns, key, sql=None, rows=None, version=None):
+            if version is not None:  # From the appended dataset's co-moments, without a pass over the rows
+                return version.correlation_matrix(columns)
+            if sql is not None:
+                return await run_analysis_in_background(sql.correlation_matrix, columns)
+            if rows is not None:  # df is a fast-preview sample of a `rows`-row table
+                return await run_analysis_in_background(sample_correlation_matrix, df, columns, "pearson", rows)
+            return await run_analysis_in_background(compute_correlations, df, columns, dataset_key=key)
+
+        @reactive.effect(priority=1)
+        @instrument
+        def _submit_pair_correlation():
+            pair_correlation_job.cancel()
+            req(input.x_var(), input.y_var())
+            req(input.x_var() in dataset_profile().columns, input.y_var() in dataset_profile().columns)
+            columns = [input.x_var(), input.y_var()]
+            sql = sql_dataset()
+            state = preview_sample()
+            if sql is not None:
+                pair_correlation_job.invoke(None, columns, None, sql)
+            elif appended() is not None:
+                pair_correlation_job.invoke(None, columns, None, version=appended())
+            elif state is not None and not state.exact:
+                pair_correlation_job.invoke(state.sample, columns, None, rows=state.profile.rows)
+            else:
+                pair_correlation_job.invoke(dataset(), columns, dataset_key())
 
         @render.text
+        @instrument
         def correlation_stats():
-            req(input.x_var(), input.y_var())
-            df = dataset()
-            corr = df[[input.x_var(), input.y_var()]].corr().iloc[0, 1]
+            result = pair_correlation_job.result()  # Computed in the background
+            corr = result.matrix.iloc[0, 1]
+            if result.approximate:
+                low, high = result.lower.iloc[0, 1], result.upper.iloc[0, 1]
+                return f"Pearson correlation coefficient: {corr:.4f} (95% CI [{low:.4f}, {high:.4f}], {result.n:,} sampled rows)"
             return f"Pearson correlation coefficient: {corr:.4f}"
 
     # Correlation Matrix Tab
@@ -194,20 +547,65 @@ with ui.navset_tab():
             choices={"pearson": "Pearson", "spearman": "Spearman", "kendall": "Kendall"},
             selected="pearson"
         )
+        ui.input_checkbox("corr_approximate", "Approximate (sampled, with 95% confidence bounds)", value=False)
+        
+        @reactive.calc
+        @instrument
+        def correlation_columns():
+            profile = dataset_profile()
+            # Only include columns with sufficient non-NA values
+            return [col for col in profile.numeric_columns if profile.columns[col].count > 10]
+        
+        @reactive.extended_task
+        @instrument
+        async def correlation_job(df, columns, method, key, approximate, sql=None, rows=None, version=None):
+            if version is not None:  # Pearson from the appended dataset's co-moments, without a pass over the rows
+                return version.correlation_matrix(columns)
+            if sql is not None:  # Pearson in the engine; rank methods on its row sample
+                return await run_analysis_in_background(sql.correlation_matrix, columns, method)
+            if rows is not None:  # df is a fast-preview sample of a `rows`-row table
+                return await run_analysis_in_background(sample_correlation_matrix, df, columns, method, rows)
+            return await run_analysis_in_background(
+                compute_correlations, df, columns,
+                method=method,
+                dataset_key=key,
+                approximate=approximate
+            )
+        
+        @reactive.effect(priority=1)
+        @instrument
+        def _submit_correlation():
+            valid_cols = correlation_columns()
+            correlation_job.cancel()
+            if len(valid_cols) >= 2:
+                state = preview_sample()
+                if state is not None and not state.exact:
+                    correlation_job.invoke(state.sample, valid_cols, input.corr_method(), None, True,
+                                           rows=state.profile.rows)
+                    return
+                version = appended() if input.corr_method() == "pearson" else None  # Ranks need every row
+                df = dataset() if version is None else None  # The co-moments don't need the rows
+                correlation_job.invoke(df, valid_cols, input.corr_method(), dataset_key(),
+                                       input.corr_approximate(), sql_dataset(), version=version)
+        
+        @reactive.calc
+        @instrument
+        def correlation_result():
+            """Full correlation matrix per (dataset, method, mode); threshold and labels only re-render it."""
+            if len(correlation_columns()) < 2:
+                return None
+            return correlation_job.result()  # Computed in the background
         
         @render_widget
+        @instrument
         def correlation_matrix():
-            df = dataset()
-            numeric_df = df.select_dtypes(include=np.number)
-            
-            # Only include columns with sufficient non-NA values
-            valid_cols = [col for col in numeric_df.columns if numeric_df[col].count() > 10]
-            
-            if len(valid_cols) < 2:
+            import plotly.express as px
+
+            result = correlation_result()
+            if result is None:
                 return px.imshow([[0]], title="Not enough numeric variables for correlation analysis")
             
-            # Calculate correlation matrix
-            corr_matrix = numeric_df[valid_cols].corr(method=input.corr_method())
+            corr_matrix = result.matrix
             
             # Apply threshold filter
             threshold = input.corr_threshold()
@@ -225,37 +623,66 @@ with ui.navset_tab():
                     columns=corr_matrix.columns
                 )
             
-            return px.imshow(
+            title = f"{input.corr_method().capitalize()} Correlation Matrix"
+            if result.approximate:
+                title += f" (sample of {result.n:,} rows)"
+            fig = px.imshow(
                 corr_matrix,
-                text_auto=input.show_corr_values(),
+                text_auto=".2f" if input.show_corr_values() else False,
                 color_continuous_scale="RdBu_r",
                 zmin=-1, zmax=1,
-                title=f"{input.corr_method().capitalize()} Correlation Matrix"
+                title=title
             )
+            if result.approximate:
+                fig.update_traces(
+                    customdata=np.dstack([result.lower.to_numpy(), result.upper.to_numpy()]),
+                    hovertemplate="%{x} vs %{y}<br>r = %{z:.3f}<br>95% CI [%{customdata[0]:.3f}, %{customdata[1]:.3f}]<extra></extra>"
+                )
+            return fig
+
+    # Timings of every reactive in this process (PERF_PANEL=1)
+    if PERF_PANEL:
+        with ui.nav_panel("Performance"):
+            perf_panel_ui("perf")
+            perf_panel_server("perf")
 
 # Update UI elements based on dataset
 @reactive.effect
-def _():
-    df = dataset()
+@instrument
+def _update_plot_var():
+    profile = dataset_profile()
     
     # Update variable selections for distribution plot
-    if hasattr(input, 'var_type_filter') and input.var_type_filter() == "Numeric":
-        var_choices = df.select_dtypes(include=np.number).columns.tolist()
-    elif hasattr(input, 'var_type_filter') and input.var_type_filter() == "Categorical":
-        var_choices = df.select_dtypes(exclude=np.number).columns.tolist()
+    if input.var_type_filter() == "Numeric":
+        var_choices = profile.numeric_columns
+    elif input.var_type_filter() == "Categorical":
+        var_choices = profile.categorical_columns
     else:  # All variables
-        var_choices = df.columns.tolist()
+        var_choices = list(profile.columns)
+    with reactive.isolate():  # Keep a selection that is still valid (e.g. while a fast preview refines)
+        current = input.plot_var()
         
-    ui.update_select("plot_var", choices=var_choices, selected=var_choices[0] if var_choices else None)
+    ui.update_select("plot_var", choices=var_choices,
+                     selected=current if current in var_choices else var_choices[0] if var_choices else None)
+
+@reactive.effect
+@instrument
+def _update_bivariate_vars():
+    """A new dataset resets the scatter selections unless they still exist; the univariate type filter leaves them alone."""
+    profile = dataset_profile()
+    with reactive.isolate():  # A refined fast preview has the same columns; keep what the user picked
+        x_var, y_var, color_by = input.x_var(), input.y_var(), input.color_by()
     
     # Update variable selections for correlation plot
-    numeric_cols = df.select_dtypes(include=np.number).columns.tolist()
-    ui.update_select("x_var", choices=numeric_cols, selected=numeric_cols[0] if numeric_cols else None)
-    ui.update_select("y_var", choices=numeric_cols, selected=numeric_cols[1] if len(numeric_cols) > 1 else numeric_cols[0] if numeric_cols else None)
+    numeric_cols = profile.numeric_columns
+    default_y = numeric_cols[1] if len(numeric_cols) > 1 else numeric_cols[0] if numeric_cols else None
+    ui.update_select("x_var", choices=numeric_cols,
+                     selected=x_var if x_var in numeric_cols else numeric_cols[0] if numeric_cols else None)
+    ui.update_select("y_var", choices=numeric_cols, selected=y_var if y_var in numeric_cols else default_y)
     
     # Update color_by choices for scatter plot
-    all_cols = ["None"] + df.columns.tolist()
-    ui.update_select("color_by", choices=all_cols, selected="None")
+    all_cols = ["None"] + list(profile.columns)
+    ui.update_select("color_by", choices=all_cols, selected=color_by if color_by in all_cols else "None")
 
 # **Load custom CSS file**
 ui.include_css(app_dir / "styles.css")
\ No newline at end of file
@@ -0,0 +1,142 @@
+import os
+import time
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+from dataset_profile import TOP_K, DatasetProfile, get_profile
+
+PREVIEW_BUDGET_SECONDS = float(os.environ.get("PREVIEW_BUDGET_SECONDS", 0.3))  # Profiling time for the first answer
+PILOT_ROWS = 5_000  # Rows profiled to measure throughput before sizing the first sample
+MIN_SAMPLE_ROWS = 1_000
+REFINE_FACTOR = 4  # Each refinement profiles this many times more rows, up to the whole table
+Z_95 = 1.959963984540054  # Two-sided 95% normal quantile
+
+# sample: the rows every view is computed from; profile: SampledProfile, or the DatasetProfile once exact
+Preview = namedtuple("Preview", ["sample", "profile", "exact"])
+
+
+def draw_sample(df, rows, seed=42):
+    """A uniform sample of `rows` rows without replacement, kept in table order."""
+    if rows >= len(df):
+        return df
+    index = np.sort(np.random.default_rng(seed).choice(len(df), size=rows, replace=False))
+    return df.take(index)
+
+
+def scale_counts(counts, sample_rows, rows):
+    """Estimates of table-wide counts from counts in a uniform sample, with 95% half-widths.
+
+    Binomial intervals with the finite-population correction, so they are 0 when the sample is the table.
+    """
+    share = np.asarray(counts, dtype=np.float64) / max(sample_rows, 1)
+    fpc = np.sqrt(max(1 - sample_rows / rows, 0.0)) if rows else 0.0
+    errors = Z_95 * rows * np.sqrt(share * (1 - share) / max(sample_rows - 1, 1)) * fpc
+    return share * rows, errors
+
+
+def _quantile_interval(values, q, fpc):
+    """95% order-statistic interval for the q-quantile of sorted sample values."""
+    m = len(values)
+    if m == 0:
+        return np.nan, np.nan
+    spread = Z_95 * np.sqrt(m * q * (1 - q)) * fpc
+    low = int(np.clip(np.floor(m * q - spread), 0, m - 1))
+    high = int(np.clip(np.ceil(m * q + spread), 0, m - 1))
+    return values[low], values[high]
+
+
+class SampledProfile(DatasetProfile):
+    """DatasetProfile of a uniform row sample standing in for a `rows`-row table.
+
+    Column statistics describe the sample. summary_stats() and var_types() scale counts to the whole
+    table and add 95% intervals: binomial for counts, normal for means and order statistics for
+    medians, all with the finite-population correction. Distinct counts use the Haas-Stokes "Duj1"
+    estimator (as PostgreSQL's ANALYZE does), never below the distinct values seen.
+    """
+
+    def __init__(self, sample, rows, top_k=TOP_K):
+        super().__init__(sample, top_k)
+        self.sample_rows = len(sample)
+        self.rows = rows
+        self.done = self.sample_rows >= rows
+        self._fpc = np.sqrt(max(1 - self.sample_rows / rows, 0.0)) if rows else 0.0
+        self.distinct_estimates, self.median_intervals = {}, {}
+        for name, col in self.columns.items():
+            singletons = int((sample[name].value_counts() == 1).sum())
+            n = max(col.count, 1)  # Haas-Stokes over non-missing values; population share scaled like the count
+            population = max(col.count * rows / max(self.sample_rows, 1), n)
+            estimate = n * col.distinct / (n - singletons + singletons * n / population)
+            self.distinct_estimates[name] = int(round(min(max(estimate, col.distinct), population)))
+            if col.kind == "numeric":
+                values = sample[name].to_numpy(dtype=np.float64, na_value=np.nan)
+                values = np.sort(values[~np.isnan(values)])
+                self.median_intervals[name] = _quantile_interval(values, 0.5, self._fpc)
+
+    def summary_stats(self):
+        """describe() statistics estimated from the sample, with 95% half-widths for count and mean and a median interval."""
+        records = []
+        for name, col in self.columns.items():
+            if col.kind != "numeric":
+                continue
+            count, count_error = scale_counts(col.count, self.sample_rows, self.rows)
+            mean_error = Z_95 * col.std / np.sqrt(col.count) * self._fpc if col.count > 1 else np.nan
+            low, high = self.median_intervals[name]
+            records.append({
+                "Variable": name, "count": round(float(count)), "count ±": round(float(count_error)),
+                "mean": col.mean, "mean ±": mean_error, "std": col.std, "min": col.min,
+                "25%": col.quantiles[0.25], "50%": col.quantiles[0.5], "50% (95% CI)": f"[{low:.4g}, {high:.4g}]",
+                "75%": col.quantiles[0.75], "max": col.max,
+            })
+        return pd.DataFrame(records)
+
+    def var_types(self):
+        """Type, estimated distinct count and estimated missing values (with 95% half-width) per column."""
+        missing, errors = scale_counts([col.missing for col in self.columns.values()], self.sample_rows, self.rows)
+        return pd.DataFrame({
+            "Variable": list(self.columns),
+            "Data Type": [col.dtype for col in self.columns.values()],
+            "Unique Values": [self.distinct_estimates[name] for name in self.columns],
+            "Missing Values": np.round(missing).astype(np.int64),
+            "Missing ±": np.round(errors).astype(np.int64),
+            "% Missing": np.round(missing / self.rows * 100, 2) if self.rows else np.nan,
+        })
+
+
+def sample_rows_for_budget(df, budget=PREVIEW_BUDGET_SECONDS):
+    """Rows a SampledProfile can be built from in about `budget` seconds, extrapolated from a pilot sample."""
+    pilot = draw_sample(df, min(PILOT_ROWS, len(df)), seed=0)
+    start = time.perf_counter()
+    SampledProfile(pilot, len(df))
+    seconds = time.perf_counter() - start
+    return max(MIN_SAMPLE_ROWS, int(len(pilot) * budget / max(seconds, 1e-6)))
+
+
+def preview(df, dataset_key=None, rows=None, budget=PREVIEW_BUDGET_SECONDS):
+    """A Preview of df from a uniform sample of `rows` rows (None = sized to `budget` seconds of profiling).
+
+    Once `rows` covers the table the preview is exact: the whole frame and its cached DatasetProfile.
+    """
+    if rows is None:
+        rows = sample_rows_for_budget(df, budget)
+    if rows >= len(df):
+        return Preview(df, get_profile(df, dataset_key), exact=True)
+    sample = draw_sample(df, rows)
+    return Preview(sample, SampledProfile(sample, len(df)), exact=False)
+
+
+def sampled_histogram(series, bins, rows):
+    """Equal-width histogram of a sample's finite values, scaled to a `rows`-row table: (estimates, errors, edges)."""
+    values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+    values = values[np.isfinite(values)]
+    if len(values) == 0:
+        return np.zeros(0), np.zeros(0), np.zeros(1)
+    counts, edges = np.histogram(values, bins=max(int(bins), 1))
+    estimates, errors = scale_counts(counts, len(series), rows)
+    return estimates, errors, edges
+
+
+def sampled_value_counts(series, rows, n=TOP_K):
+    """The n most frequent values of a sample, counts scaled to a `rows`-row table: (estimates, errors)."""
+    counts = series.value_counts().head(n)
+    estimates, errors = scale_counts(counts.to_numpy(), len(series), rows)
+    return pd.Series(estimates, index=counts.index, name="count"), errors
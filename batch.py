@@ -0,0 +1,192 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from pathlib import Path
+from export import EXPORT_FORMATS, export_filename
+from formats import COMPRESSED_SUFFIXES
+
+BATCH_JOBS = int(os.environ.get("BATCH_JOBS", os.cpu_count() or 1))  # Files processed at once; 1 = in this process
+TASKS_PER_WORKER = 100  # Files a worker process handles before it is replaced, returning its memory to the OS
+
+
+def output_path(input_path, input_dir, output_dir, fmt):
+    """Where a file's result goes: its path relative to input_dir under output_dir, extension set by `fmt`.
+
+    "in/2024/day.csv.gz" -> "out/2024/day.parquet".
+    """
+    relative = Path(input_path).relative_to(input_dir)
+    name = relative.name
+    if name.lower().endswith(tuple("." + suffix for suffix in COMPRESSED_SUFFIXES)):
+        name = name.rsplit(".", 1)[0]
+    stem = name.rsplit(".", 1)[0] if "." in name.lstrip(".") else name
+    return Path(output_dir) / relative.parent / export_filename(stem, fmt)
+
+
+def find_inputs(input_dir, pattern="*"):
+    """Files under input_dir matching a glob pattern ("**/*.csv" recurses), in name order; hidden files are skipped."""
+    return sorted(path for path in Path(input_dir).glob(pattern)
+                  if path.is_file() and not any(part.startswith(".") for part in path.relative_to(input_dir).parts))
+
+
+def _init_worker(jobs):
+    import pyarrow as pa
+
+    pa.set_cpu_count(max(1, (os.cpu_count() or 1) // jobs))  # Arrow's parse threads, shared by the worker processes
+
+
+def process_file(input_path, output, pipeline_spec=None, feature_spec=None, fmt="csv"):
+    """Loads one file, runs the preprocessing pipeline and then the feature transformation, and streams
+    the result to `output` (through a temporary file, so a failed run never leaves a partial output).
+
+    Returns a JSON-serializable record: rows and bytes in and out, seconds per stage, the worker's
+    peak RSS and, if the file failed, the error instead of the output.
+    """
+    from feature_spec import FeatureSpec
+    from instrumentation import peak_rss_bytes
+    from pipeline import Pipeline
+    from shared import read_dataset
+
+    record = {"input": str(input_path), "output": str(output), "bytes_in": os.path.getsize(input_path)}
+    start = time.perf_counter()
+    timings = {}
+    try:
+        df = read_dataset(input_path, timings)
+        record["rows_in"] = len(df)
+        stage = time.perf_counter()
+        # No step cache and a fixed fingerprint: each frame is seen once, so hashing it would be wasted work
+        df = Pipeline.from_dict(pipeline_spec or {}).run(df, fingerprint="batch", cache=None, workers=1)
+        timings["preprocess"] = time.perf_counter() - stage
+        record["rows_out"] = len(df)
+        stage = time.perf_counter()
+        output.parent.mkdir(parents=True, exist_ok=True)
+        partial = output.with_name(f"{output.name}.{os.getpid()}.tmp")
+        try:
+            with open(partial, "wb") as f:
+                for chunk in FeatureSpec.from_dict(feature_spec or {}).iter_export(df, fmt):
+                    f.write(chunk)
+            os.replace(partial, output)
+        finally:
+            if partial.exists():
+                partial.unlink()
+        timings["transform_write"] = time.perf_counter() - stage
+        record["bytes_out"] = os.path.getsize(output)
+    except Exception as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+        record["output"] = None
+    record["seconds"] = time.perf_counter() - start
+    record["timings"] = timings
+    record["peak_rss_bytes"] = peak_rss_bytes()
+    return record
+
+
+def run_batch(inputs, input_dir, output_dir, pipeline_spec=None, feature_spec=None, fmt="csv", jobs=BATCH_JOBS,
+              skip_existing=False, on_result=None):
+    """Processes every input file (see process_file) on `jobs` worker processes. Returns the per-file records.
+
+    With skip_existing, files whose output is newer than the input are left alone, so a cron job can be
+    rerun over a growing directory. `on_result` is called with each record as its file finishes.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    tasks = []
+    for path in inputs:
+        output = output_path(path, input_dir, output_dir, fmt)
+        if skip_existing and output.exists() and output.stat().st_mtime >= path.stat().st_mtime:
+            continue
+        tasks.append((path, output))
+    records = []
+
+    def done(record):
+        records.append(record)
+        if on_result is not None:
+            on_result(record)
+
+    if jobs <= 1 or len(tasks) <= 1:
+        for path, output in tasks:
+            done(process_file(path, output, pipeline_spec, feature_spec, fmt))
+        return records
+    jobs = min(jobs, len(tasks))
+    with ProcessPoolExecutor(jobs, mp_context=get_context("spawn"), initializer=_init_worker, initargs=(jobs,),
+                             max_tasks_per_child=TASKS_PER_WORKER) as pool:
+        futures = [pool.submit(process_file, path, output, pipeline_spec, feature_spec, fmt) for path, output in tasks]
+        for future in as_completed(futures):
+            done(future.result())
+    return records
+
+
+def summarize(records, seconds):
+    """Totals for a batch: files, failures, rows and bytes in and out, throughput and the largest worker RSS."""
+    succeeded = [record for record in records if "error" not in record]
+    rows_in = sum(record["rows_in"] for record in succeeded)
+    bytes_in = sum(record["bytes_in"] for record in succeeded)
+    return {
+        "files": len(records),
+        "failed": len(records) - len(succeeded),
+        "rows_in": rows_in,
+        "rows_out": sum(record["rows_out"] for record in succeeded),
+        "bytes_in": bytes_in,
+        "bytes_out": sum(record["bytes_out"] for record in succeeded),
+        "seconds": seconds,
+        "rows_per_second": rows_in / seconds if seconds else 0.0,
+        "mb_per_second": bytes_in / 1024**2 / seconds if seconds else 0.0,
+        "peak_worker_rss_bytes": max((record["peak_rss_bytes"] for record in records), default=0),
+    }
+
+
+def _print_record(record):
+    if "error" in record:
+        print(f"FAILED {record['input']}: {record['error']}", flush=True)
+        return
+    print(f"{record['input']}: {record['rows_in']:,} -> {record['rows_out']:,} rows in {record['seconds']:.2f}s "
+          f"({record['rows_in'] / max(record['seconds'], 1e-9):,.0f} rows/s, "
+          f"peak RSS {record['peak_rss_bytes'] / 1024**2:.0f} MB) -> {record['output']}", flush=True)
+
+
+def main(argv=None):
+    """Applies saved specs to a directory of files:
+    python batch.py incoming/ processed/ --pipeline preprocessing_pipeline.json --feature feature_spec.json
+    """
+    parser = argparse.ArgumentParser(description="Run saved preprocessing and feature specs over many files.")
+    parser.add_argument("input_dir", help="Directory of datasets (any format formats.py reads)")
+    parser.add_argument("output_dir", help="Results go here, mirroring the input directory layout")
+    parser.add_argument("--pipeline", help="Preprocessing spec saved from data_preprocessing.py")
+    parser.add_argument("--feature", help="Feature spec saved from feature.py")
+    parser.add_argument("--pattern", default="*", help='Glob pattern for the input files, e.g. "*.csv" or "**/*.parquet"')
+    parser.add_argument("--format", default="csv", choices=list(EXPORT_FORMATS), help="Output format")
+    parser.add_argument("--jobs", type=int, default=BATCH_JOBS, help=f"Worker processes (default {BATCH_JOBS}; 1 = serial)")
+    parser.add_argument("--skip-existing", action="store_true", help="Skip files whose output is newer than the input")
+    parser.add_argument("--report", help="Write one JSON record per file, then the totals, to this JSON-lines file")
+    args = parser.parse_args(argv)
+
+    from feature_spec import FeatureSpec
+    from pipeline import Pipeline
+
+    pipeline_spec = Pipeline.load(args.pipeline).to_dict() if args.pipeline else None  # Validated before any work starts
+    feature_spec = FeatureSpec.load(args.feature).to_dict() if args.feature else None
+    inputs = find_inputs(args.input_dir, args.pattern)
+    if not inputs:
+        parser.error(f"No files match {args.pattern!r} in {args.input_dir}")
+
+    start = time.perf_counter()
+    records = run_batch(inputs, args.input_dir, args.output_dir, pipeline_spec, feature_spec, args.format, args.jobs,
+                        args.skip_existing, on_result=_print_record)
+    totals = summarize(records, time.perf_counter() - start)
+    print(f"\n{totals['files']} files ({totals['failed']} failed, {len(inputs) - totals['files']} skipped): "
+          f"{totals['rows_in']:,} rows in, {totals['rows_out']:,} out in {totals['seconds']:.2f}s; "
+          f"{totals['rows_per_second']:,.0f} rows/s, {totals['mb_per_second']:.1f} MB/s read; "
+          f"peak worker RSS {totals['peak_worker_rss_bytes'] / 1024**2:.0f} MB")
+    if args.report:
+        with open(args.report, "w") as f:
+            for record in records:
+                f.write(json.dumps(record) + "\n")
+            f.write(json.dumps({"totals": totals}) + "\n")
+    if totals["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+import argparse
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+import numpy as np
+from instrumentation import rss_bytes
+
+DEFAULT_ROWS = [10_000, 100_000]
+DEFAULT_FORMATS = ["csv", "tsv", "json", "jsonl", "xlsx", "parquet", "gz"]
+XLSX_MAX_ROWS = 100_000  # Writing and parsing .xlsx beyond this takes minutes
+REGRESSION_TOLERANCE = 1.25  # Fail when a benchmark gets this many times slower than the baseline
+NOISE_FLOOR = 0.01  # Seconds; faster benchmarks are too noisy to compare
+STATISTICS_CASES = {"impute:mean", "impute:median", "impute:mode", "outliers:remove", "scale:zscore", "scale:robust"}
+
+
+class PeakRss:
+    """Samples RSS on a background thread while the block runs; `.increase` is the peak above the starting RSS."""
+
+    def __init__(self, interval=0.002):
+        self.interval = interval
+        self.increase = 0
+
+    def __enter__(self):
+        self._start = self._peak = rss_bytes()
+        self._running = True
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while self._running:
+            self._peak = max(self._peak, rss_bytes())
+            time.sleep(self.interval)
+
+    def __exit__(self, *exc):
+        self._running = False
+        self._thread.join()
+        self._peak = max(self._peak, rss_bytes())
+        self.increase = self._peak - self._start
+
+
+def measure(fn, repeat=3):
+    """Returns the best wall time (seconds) over `repeat` runs and the largest peak RSS increase (bytes)."""
+    times, peaks = [], []
+    for _ in range(repeat):
+        with PeakRss() as rss:
+            start = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - start)
+        peaks.append(rss.increase)
+    return min(times), max(peaks)
+
+
+# **Benchmarks: one (name, setup-free callable) per reactive hot path**
+
+def load_benchmarks(files):
+    from dataset_cache import _digest_memo
+    from shared import dataset_cache, load_dataset
+
+    def cold(path):
+        dataset_cache.clear(disk=True)
+        _digest_memo.clear()
+        return load_dataset(path)  # Hash, parse and write the Arrow snapshot
+
+    def snapshot(path):
+        dataset_cache.clear()
+        return load_dataset(path)  # Memory-map the snapshot written by a previous load
+
+    cases = []
+    for fmt, path in files.items():
+        cases += [
+            (f"load:{fmt}:cold", lambda path=path: cold(path)),
+            (f"load:{fmt}:snapshot", lambda path=path: snapshot(path)),
+            (f"load:{fmt}:memory", lambda path=path: load_dataset(path)),
+        ]
+    return cases
+
+
+def preprocessing_benchmarks(df, workers=1):
+    from pipeline import Pipeline
+
+    specs = [("impute:" + method, {"step": "impute", "method": method})
+             for method in ["drop", "mean", "median", "mode", "remove_columns"]]
+    specs += [
+        ("outliers:remove", {"step": "outliers", "method": "remove"}),
+        ("leverage:remove", {"step": "leverage", "method": "remove", "solver": "qr"}),
+        ("leverage:remove:sketch", {"step": "leverage", "method": "remove", "solver": "sketch"}),
+        ("outliers:remove:mad", {"step": "outliers", "method": "remove", "rule": "mad"}),
+        ("to_numeric", {"step": "to_numeric"}),
+        ("scale:zscore", {"step": "scale", "method": "zscore"}),
+        ("scale:robust", {"step": "scale", "method": "robust"}),
+    ]
+    # A fixed input fingerprint and no cache, so every run executes the step
+    cases = [(f"preprocess:{name}", lambda spec=spec: Pipeline([spec]).run(df, fingerprint="benchmark", cache=None, workers=1))
+             for name, spec in specs]
+    if workers > 1:  # Steps that compute column statistics, on the process pool (wide tables only; see PARALLEL_MIN_CELLS)
+        parallel = [(f"preprocess:{name}:parallel",
+                     lambda spec=spec: Pipeline([spec]).run(df, fingerprint="benchmark", cache=None, workers=workers))
+                    for name, spec in specs if name in STATISTICS_CASES]
+        parallel[0][1]()  # Start the worker processes outside the timings
+        cases += parallel
+    return cases
+
+
+def feature_benchmarks(df):
+    from encoding import CategoryCodes, count_encode, hash_encode, one_hot_chunks
+    from transforms import TRANSFORMS, apply_transform, transform_many
+
+    numeric = [col for col in df.columns if col.startswith("num_")]
+    cases = [(f"feature:{name}", lambda name=name: apply_transform(df[numeric[0]], name)) for name in TRANSFORMS]
+    cases.append(("feature:one_hot", lambda: list(one_hot_chunks(df, "cat_0", CategoryCodes(df["cat_0"])))))
+    cases.append(("feature:hashing", lambda: hash_encode(df["cat_0"])))
+    cases.append(("feature:count", lambda: count_encode(df["cat_0"])))
+    cases.append(("feature:transform_many", lambda: transform_many(df, numeric, list(TRANSFORMS))))
+    return cases
+
+
+def stats_benchmarks(df):
+    from dataset_profile import DatasetProfile
+
+    def profile_tables():
+        profile = DatasetProfile(df)
+        return profile.summary_stats(), profile.var_types()
+
+    return [("stats:profile", profile_tables)]
+
+
+def correlation_benchmarks(df):
+    from correlation import correlation_matrix
+
+    numeric = [col for col in df.columns if col.startswith("num_")]
+    cases = [(f"correlation:{method}", lambda method=method: correlation_matrix(df, numeric, method))
+             for method in ["pearson", "spearman", "kendall"]]
+    cases.append(("correlation:pearson:approximate",
+                  lambda: correlation_matrix(df, numeric, "pearson", approximate=True)))
+    return cases
+
+
+def figure_benchmarks(df):
+    import plotly.express as px
+    from correlation import correlation_matrix
+    from plotting import bar_figure, density_scatter_figure, histogram_figure
+
+    numeric = [col for col in df.columns if col.startswith("num_")]
+    matrix = correlation_matrix(df, numeric).matrix
+    return [
+        ("figure:histogram", lambda: histogram_figure(df["num_0"], "num_0", 50)),
+        ("figure:bar", lambda: bar_figure(df["cat_0"].value_counts().nlargest(20), "cat_0")),
+        ("figure:density_scatter", lambda: density_scatter_figure(df, "num_0", "num_1", "scatter")),
+        ("figure:density_scatter:lowess",
+         lambda: density_scatter_figure(df, "num_0", "num_1", "scatter", reg_type="Lowess")),
+        ("figure:correlation_heatmap",
+         lambda: px.imshow(matrix, text_auto=".2f", color_continuous_scale="RdBu_r", zmin=-1, zmax=1)),
+    ]
+
+
+# **Running, reporting and regression checks**
+
+def run_suite(rows_list, formats, shape, repeat=3, only=None, workdir=None, workers=1):
+    """Runs every benchmark at each row count. Returns {name: {rows: {"seconds": s, "peak_rss_mb": mb}}}."""
+    from synthetic import generate_dataset, write_dataset
+
+    results = {}
+    for rows in rows_list:
+        df = generate_dataset(rows, **shape)
+        files = {}
+        for fmt in formats:
+            if fmt == "xlsx" and rows > XLSX_MAX_ROWS:
+                continue
+            files[fmt] = write_dataset(df, Path(workdir) / f"synthetic_{rows}.{fmt}")
+        cases = (load_benchmarks(files) + preprocessing_benchmarks(df, workers) + feature_benchmarks(df)
+                 + stats_benchmarks(df) + correlation_benchmarks(df) + figure_benchmarks(df))
+        for name, fn in cases:
+            if only and not any(pattern in name for pattern in only):
+                continue
+            seconds, peak = measure(fn, repeat)
+            results.setdefault(name, {})[rows] = {"seconds": seconds, "peak_rss_mb": peak / 1024**2}
+            print(f"{name:<40} {rows:>12,} rows {seconds:>10.4f} s {peak / 1024**2:>10.1f} MB", flush=True)
+    return results
+
+
+def scaling_exponents(results):
+    """Fits seconds ~ rows^k per benchmark (log-log slope); needs at least two row counts."""
+    exponents = {}
+    for name, by_rows in results.items():
+        points = [(rows, r["seconds"]) for rows, r in by_rows.items() if r["seconds"] > 0]
+        if len(points) >= 2:
+            rows, seconds = np.log(np.array(points, dtype=np.float64)).T
+            exponents[name] = float(np.polyfit(rows, seconds, 1)[0])
+    return exponents
+
+
+def find_regressions(results, baseline, tolerance=REGRESSION_TOLERANCE, noise_floor=NOISE_FLOOR):
+    """Returns (name, rows, baseline seconds, seconds) for every benchmark slower than tolerance x baseline."""
+    regressions = []
+    for name, by_rows in results.items():
+        for rows, result in by_rows.items():
+            before = baseline.get(name, {}).get(str(rows))
+            if before is None or result["seconds"] < noise_floor:
+                continue
+            if result["seconds"] > tolerance * before["seconds"]:
+                regressions.append((name, rows, before["seconds"], result["seconds"]))
+    return regressions
+
+
+def main(argv=None):
+    """Runs the suite: python benchmark.py --rows 10000 100000 1000000 --save baseline.json"""
+    parser = argparse.ArgumentParser(description="Time the app's data paths on synthetic datasets.")
+    parser.add_argument("--rows", type=int, nargs="+", default=DEFAULT_ROWS, help="Row counts (several give scaling curves)")
+    parser.add_argument("--formats", nargs="+", default=DEFAULT_FORMATS, help="File formats for the load benchmarks")
+    parser.add_argument("--numeric", type=int, default=6)
+    parser.add_argument("--categorical", type=int, default=3)
+    parser.add_argument("--missing-rate", type=float, default=0.05)
+    parser.add_argument("--cardinality", type=int, default=20)
+    parser.add_argument("--outlier-rate", type=float, default=0.01)
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per benchmark; the fastest is reported")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Also time preprocessing on this many processes (e.g. --numeric 2000 --workers 32)")
+    parser.add_argument("--only", nargs="+", help="Only run benchmarks whose name contains one of these")
+    parser.add_argument("--save", help="Write results to this JSON file (e.g. a baseline)")
+    parser.add_argument("--baseline", help="Compare against a saved JSON file and exit 1 on regressions")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE)
+    args = parser.parse_args(argv)
+
+    shape = dict(numeric=args.numeric, categorical=args.categorical, missing_rate=args.missing_rate,
+                 cardinality=args.cardinality, outlier_rate=args.outlier_rate)
+    with tempfile.TemporaryDirectory() as workdir:
+        os.environ.setdefault("DATASET_CACHE_DIR", str(Path(workdir) / "cache"))  # Keep snapshots out of the app's cache
+        results = run_suite(args.rows, args.formats, shape, args.repeat, args.only, workdir, args.workers)
+
+    exponents = scaling_exponents(results)
+    if exponents:
+        print("\nScaling (seconds ~ rows^k):")
+        for name, k in exponents.items():
+            print(f"{name:<40} k = {k:.2f}")
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"shape": shape, "results": results}, f, indent=2)
+        print(f"\nSaved results to {args.save}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+        regressions = find_regressions(json.loads(json.dumps(results)), baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance}x:")
+            for name, rows, before, after in regressions:
+                print(f"{name:<40} {rows:>12} rows {before:.4f} s -> {after:.4f} s")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.tolerance}x against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
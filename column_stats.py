@@ -0,0 +1,105 @@
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+import numpy as np
+import pandas as pd
+
+PREPROCESS_WORKERS = int(os.environ.get("PREPROCESS_WORKERS", os.cpu_count() or 1))  # 1 = always serial
+PARALLEL_MIN_CELLS = 5_000_000  # Rows x columns below which the process pool costs more than it saves
+PARALLEL_MIN_COLUMNS = 8
+
+_QUARTILE_STATISTICS = {"q1", "q3"}
+
+
+def _statistic_values(columns, statistics):
+    """Returns {statistic: [value per column]} for an iterable of numeric Series.
+
+    Each value depends only on its own column, so any partition of the columns gives bit-identical results.
+    """
+    values = {statistic: [] for statistic in statistics}
+    needs_quartiles = bool(_QUARTILE_STATISTICS.intersection(statistics))
+    for s in columns:
+        q1, q3 = s.quantile([0.25, 0.75]) if needs_quartiles else (None, None)
+        for statistic in statistics:
+            if statistic == "q1":
+                value = q1
+            elif statistic == "q3":
+                value = q3
+            elif statistic == "mad":  # Median absolute deviation from the median
+                value = (s - s.median()).abs().median()
+            elif statistic == "mode":
+                modes = s.mode()
+                value = modes.iloc[0] if len(modes) > 0 else np.nan
+            else:  # mean, median, std, min, max
+                value = getattr(s, statistic)()
+            values[statistic].append(value)
+    return values
+
+
+def _statistics_worker(shm_name, layout, rows, statistics):
+    """Computes statistics for the columns at (dtype, offset) in `layout` of a shared-memory block."""
+    shm = shared_memory.SharedMemory(name=shm_name)  # Spawned workers share the parent's resource tracker
+    try:
+        columns = [pd.Series(np.ndarray(rows, dtype=dtype, buffer=shm.buf, offset=offset), copy=False)
+                   for dtype, offset in layout]
+        values = _statistic_values(columns, statistics)
+        del columns  # Release the views before closing the buffer
+        return values
+    finally:
+        shm.close()
+
+
+_pool = None  # (workers, ProcessPoolExecutor), started on first parallel use and reused afterwards
+_pool_lock = threading.Lock()
+
+
+def _process_pool(workers):
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool[0] != workers:
+            if _pool is not None:
+                _pool[1].shutdown(wait=False)
+            _pool = (workers, ProcessPoolExecutor(workers, mp_context=get_context("spawn")))
+        return _pool[1]
+
+
+def _parallel_statistic_values(x, statistics, workers):
+    """_statistic_values() over column partitions of x in the process pool; columns are shared, not pickled."""
+    offsets = np.concatenate([[0], np.cumsum([dtype.itemsize * len(x) for dtype in x.dtypes])])
+    shm = shared_memory.SharedMemory(create=True, size=max(int(offsets[-1]), 1))
+    try:
+        layout = []
+        for i, dtype in enumerate(x.dtypes):
+            np.ndarray(len(x), dtype=dtype, buffer=shm.buf, offset=offsets[i])[:] = x.iloc[:, i].to_numpy()
+            layout.append((dtype, int(offsets[i])))
+        parts = np.array_split(np.arange(x.shape[1]), min(workers * 4, x.shape[1]))  # Several per worker to balance
+        pool = _process_pool(workers)
+        futures = [pool.submit(_statistics_worker, shm.name, [layout[i] for i in part], len(x), statistics)
+                   for part in parts]
+        values = {statistic: [] for statistic in statistics}
+        for future in futures:
+            for statistic, part_values in future.result().items():
+                values[statistic] += part_values
+        return values
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def column_statistics(x, statistics, workers=None):
+    """Returns {statistic: Series over x's columns} for a numeric frame x.
+
+    Statistics: mean, median, std, min, max, mode, q1, q3 and mad (median absolute deviation).
+    Wide frames are split by column across `workers` processes (default PREPROCESS_WORKERS;
+    1 forces the serial path) with identical results.
+    """
+    workers = PREPROCESS_WORKERS if workers is None else workers
+    parallel = (workers > 1 and x.shape[1] >= PARALLEL_MIN_COLUMNS and x.size >= PARALLEL_MIN_CELLS
+                and all(isinstance(dtype, np.dtype) for dtype in x.dtypes))  # Extension dtypes can't be shared
+    if parallel:
+        values = _parallel_statistic_values(x, statistics, workers)
+    else:
+        values = _statistic_values((x.iloc[:, i] for i in range(x.shape[1])), statistics)
+    return {statistic: pd.Series(column_values, index=x.columns, dtype=None if column_values else np.float64)
+            for statistic, column_values in values.items()}
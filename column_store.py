@@ -0,0 +1,108 @@
+import json
+import os
+import threading
+import uuid
+import weakref
+import numpy as np
+import pandas as pd
+
+# Memory-mapped frames are backed by read-only buffers; copy-on-write makes pandas copy
+# a column before modifying it instead of failing (always on from pandas 3)
+if int(pd.__version__.split(".")[0]) < 3:
+    pd.set_option("mode.copy_on_write", True)
+
+_METADATA_KEY = b"dataset_metadata"
+_open_stores = weakref.WeakValueDictionary()  # path -> ColumnStore, shared by every session in this process
+_open_lock = threading.Lock()
+
+
+def _to_arrow_column(series):
+    """Converts a column to an Arrow array, keeping NaN as NaN so float columns stay zero-copy."""
+    import pyarrow as pa
+
+    if series.dtype.kind in "biuf":
+        return pa.array(series.to_numpy(), from_pandas=False)
+    return pa.array(series, from_pandas=True)
+
+
+def write_store(df, path, metadata=None):
+    """Writes a DataFrame as an uncompressed Arrow IPC file that can be memory-mapped.
+
+    `metadata` is an optional JSON-serializable dict stored in the file's schema.
+    """
+    import pyarrow as pa
+
+    if not isinstance(df.index, pd.RangeIndex) or df.index.start != 0 or df.index.step != 1:
+        raise ValueError("Column store only holds frames with a default RangeIndex")
+    table = pa.table({str(name): _to_arrow_column(df[name]) for name in df.columns})
+    if metadata is not None:
+        table = table.replace_schema_metadata({_METADATA_KEY: json.dumps(metadata)})
+    tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+    try:
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table, max_chunksize=max(len(table), 1))  # One chunk per column
+        os.replace(tmp_path, path)  # Atomic, so other workers never map a partial file
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _column_view(chunked):
+    """Returns a pandas-compatible array over an Arrow column without copying when possible."""
+    import pyarrow as pa
+
+    numeric = pa.types.is_integer(chunked.type) or pa.types.is_floating(chunked.type)
+    if numeric and chunked.num_chunks == 1 and chunked.null_count == 0:
+        return chunked.chunk(0).to_numpy(zero_copy_only=True)
+    if pa.types.is_string(chunked.type) or pa.types.is_large_string(chunked.type):
+        try:
+            return pd.array(chunked, dtype=pd.StringDtype("pyarrow", na_value=np.nan))
+        except (TypeError, ValueError):
+            pass
+    return chunked.to_pandas()  # Booleans, categoricals, dates and nullable ints are materialized
+
+
+class ColumnStore:
+    """A memory-mapped Arrow IPC file exposed as a DataFrame of zero-copy column views.
+
+    Pages live in the OS page cache, so every session and worker process that opens
+    the same file shares one physical copy of the data.
+    """
+
+    def __init__(self, path):
+        import pyarrow as pa
+
+        self.path = str(path)
+        self._source = pa.memory_map(self.path, "r")
+        self.table = pa.ipc.open_file(self._source).read_all()
+        self.frame = pd.DataFrame(
+            {name: _column_view(self.table.column(name)) for name in self.table.column_names},
+            copy=False,
+        )
+
+    @property
+    def nbytes(self):
+        return self.table.nbytes
+
+    @property
+    def metadata(self):
+        """The dict passed to write_store(), or None."""
+        stored = (self.table.schema.metadata or {}).get(_METADATA_KEY)
+        return json.loads(stored) if stored is not None else None
+
+    def view(self):
+        """Returns a shallow copy of the shared frame; new or modified columns stay private to the caller."""
+        return self.frame.copy(deep=False)
+
+
+def open_store(path):
+    """Opens a column store, reusing the mapping if this process already has it open."""
+    path = str(path)
+    with _open_lock:
+        store = _open_stores.get(path)
+        if store is None:
+            store = ColumnStore(path)
+            _open_stores[path] = store
+        return store
+
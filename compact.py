@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+
+CATEGORY_MAX_LEVELS = 1_000  # Strings with at most this many distinct values become categoricals...
+CATEGORY_MAX_RATIO = 0.5  # ...as long as that is at most this share of the rows
+INT_TYPES = [np.int32]  # Narrowest integer type used: int8/int16 arithmetic wraps around silently
+INT_HEADROOM_BITS = 1  # Values must fit in int32 with this many bits spare, so sums and differences stay exact
+ARROW_STRING = pd.StringDtype("pyarrow", na_value=np.nan)  # pandas 3's default "str" dtype
+
+
+def _is_string_column(series):
+    if isinstance(series.dtype, pd.StringDtype):
+        return True
+    return series.dtype == object and pd.api.types.infer_dtype(series, skipna=True) == "string"
+
+
+def compact_series(series):
+    """Returns the column in the smallest dtype that holds exactly the same values.
+
+    Integers are downcast to int32 when their range leaves INT_HEADROOM_BITS spare; low-cardinality
+    strings become categoricals (categories sorted, so sorting and one-hot columns keep their
+    order) and other strings Arrow-backed strings. Floats stay float64: float32 would change sums
+    and means computed downstream. Anything else is returned as is.
+    """
+    dtype = series.dtype
+    if isinstance(dtype, np.dtype) and dtype.kind in "iu" and len(series) > 0:
+        low, high = series.min(), series.max()
+        for candidate in INT_TYPES:
+            info = np.iinfo(candidate)
+            limit = (int(info.max) + 1) >> INT_HEADROOM_BITS
+            if np.dtype(candidate).itemsize < dtype.itemsize and -limit <= low and high < limit:
+                return series.astype(candidate)
+        return series
+    if _is_string_column(series):
+        levels = series.dropna().unique()
+        if len(levels) <= CATEGORY_MAX_LEVELS and len(levels) <= CATEGORY_MAX_RATIO * len(series):
+            return series.astype(pd.CategoricalDtype(sorted(levels)))
+        return series if dtype == ARROW_STRING else series.astype(ARROW_STRING)
+    return series
+
+
+def compact_frame(df):
+    """Compacts every column of df. Returns (compacted frame, report with one row per column).
+
+    The report has the column's dtype and deep memory size before and after.
+    """
+    columns, rows = {}, []
+    for name in df.columns:
+        before = df[name]
+        after = compact_series(before)
+        columns[name] = after
+        rows.append({
+            "Column": str(name), "Before": str(before.dtype), "After": str(after.dtype),
+            "Bytes Before": int(before.memory_usage(index=False, deep=True)),
+            "Bytes After": int(after.memory_usage(index=False, deep=True)),
+        })
+    compacted = pd.DataFrame(columns, index=df.index, copy=False)
+    report = pd.DataFrame(rows, columns=["Column", "Before", "After", "Bytes Before", "Bytes After"])
+    return compacted, report
@@ -0,0 +1,238 @@
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context, shared_memory
+import numpy as np
+import pandas as pd
+from lru import LRU
+
+CORRELATION_WORKERS = int(os.environ.get("CORRELATION_WORKERS", os.cpu_count() or 1))
+PARALLEL_MIN_CELLS = 2_000_000  # Use the process pool when pairs x rows exceeds this (Kendall only)
+APPROX_SAMPLE_ROWS = 100_000  # Rows used in approximate mode
+RANK_CACHE_MAX_BYTES = int(os.environ.get("RANK_CACHE_MAX_BYTES", 512 * 1024**2))
+MATRIX_CACHE_ENTRIES = 64
+
+# Standard error of Fisher's z for each coefficient (Fieller et al. 1957 for Spearman and Kendall)
+_FISHER_SE = {
+    "pearson": lambda n: 1 / np.sqrt(n - 3),
+    "spearman": lambda n: np.sqrt(1.06 / (n - 3)),
+    "kendall": lambda n: np.sqrt(0.437 / (n - 4)),
+}
+
+CorrelationResult = namedtuple("CorrelationResult", ["matrix", "lower", "upper", "n", "approximate"])
+
+
+_matrix_cache = LRU(max_entries=MATRIX_CACHE_ENTRIES)  # (dataset, method, columns, sample) -> CorrelationResult
+_rank_cache = LRU(max_bytes=RANK_CACHE_MAX_BYTES)  # (dataset, column, sample) -> average ranks
+
+
+def _average_ranks(values):
+    """Average ranks (ties share the mean rank), NaN stays NaN; same as Series.rank()."""
+    return pd.Series(values).rank().to_numpy()
+
+
+def _pearson(block):
+    """Pairwise-complete Pearson matrix of the columns of a 2D float array."""
+    if not np.isnan(block).any():
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.atleast_2d(np.corrcoef(block, rowvar=False))
+    return pd.DataFrame(block).corr().to_numpy(copy=True)
+
+
+def _kendall_pair(x, y):
+    """Kendall's tau-b on pairwise-complete rows in O(n log n) (Knight's algorithm, via SciPy)."""
+    from scipy.stats import kendalltau
+
+    mask = ~(np.isnan(x) | np.isnan(y))
+    if mask.sum() < 2:
+        return np.nan
+    return kendalltau(x[mask], y[mask]).statistic
+
+
+def _kendall_pairs_worker(shm_name, shape, pairs):
+    """Kendall's tau for `pairs` of the columns of a (columns x rows) float64 block in shared memory."""
+    shm = shared_memory.SharedMemory(name=shm_name)  # Spawned workers share the parent's resource tracker
+    try:
+        columns = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        values = [_kendall_pair(columns[i], columns[j]) for i, j in pairs]
+        del columns  # Release the view before closing the buffer
+        return values
+    finally:
+        shm.close()
+
+
+_pool = None  # (workers, ProcessPoolExecutor), started on first parallel use and reused afterwards
+_pool_lock = threading.Lock()
+
+
+def _process_pool(workers):
+    global _pool
+    with _pool_lock:
+        if _pool is None or _pool[0] != workers:
+            if _pool is not None:
+                _pool[1].shutdown(wait=False)
+            _pool = (workers, ProcessPoolExecutor(workers, mp_context=get_context("spawn")))
+        return _pool[1]
+
+
+def _parallel_kendall(block, pairs, workers):
+    """Kendall's tau for `pairs` across the process pool; the block is shared with the workers, not pickled."""
+    shm = shared_memory.SharedMemory(create=True, size=max(block.nbytes, 1))
+    try:
+        columns = np.ndarray(block.shape[::-1], dtype=np.float64, buffer=shm.buf)
+        columns[:] = block.T  # One contiguous row per column
+        del columns
+        n_chunks = min(workers * 4, len(pairs))  # Several per worker to balance
+        chunks = [pairs[i::n_chunks] for i in range(n_chunks)]
+        pool = _process_pool(workers)
+        futures = [pool.submit(_kendall_pairs_worker, shm.name, block.shape[::-1], chunk) for chunk in chunks]
+        return {pair: value for chunk, future in zip(chunks, futures) for pair, value in zip(chunk, future.result())}
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def _kendall(block, parallel=True):
+    k = block.shape[1]
+    pairs = [(i, j) for i in range(k) for j in range(i + 1, k)]
+    result = np.eye(k)
+    if not pairs:
+        return result
+    if parallel and CORRELATION_WORKERS > 1 and len(pairs) > 1 and len(pairs) * len(block) >= PARALLEL_MIN_CELLS:
+        values = _parallel_kendall(block, pairs, min(CORRELATION_WORKERS, len(pairs)))
+    else:
+        values = {(i, j): _kendall_pair(block[:, i], block[:, j]) for i, j in pairs}
+    for (i, j), value in values.items():
+        result[i, j] = result[j, i] = value
+    return result
+
+
+def _column_ranks(df, col, dataset_key, sample_key):
+    """Average ranks of a column (NaN where it is missing), cached per (dataset, column, sample)."""
+    key = (dataset_key, col, sample_key)
+    ranks = _rank_cache.get(key) if dataset_key is not None else None
+    if ranks is None:
+        ranks = _average_ranks(df[col].to_numpy(dtype=np.float64, na_value=np.nan))
+        if dataset_key is not None:
+            _rank_cache.put(key, ranks, ranks.nbytes)
+    return ranks
+
+
+def _rank_correlation(x, y):
+    if len(x) < 2:
+        return np.nan
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.corrcoef(x, y)[0, 1]
+
+
+def _spearman(df, columns, dataset_key, sample_key):
+    """Spearman = Pearson on ranks, over each pair's complete rows (like DataFrame.corr(method="spearman")).
+
+    Ranks are cached per column. Columns missing in the same rows (e.g. none) are correlated together from
+    their cached ranks; for other pairs only the side that loses rows is re-ranked, from its ranks (which
+    order and tie exactly like its values), once per pair.
+    """
+    ranks = [_column_ranks(df, col, dataset_key, sample_key) for col in columns]
+    valid = [~np.isnan(col_ranks) for col_ranks in ranks]
+    counts = [int(mask.sum()) for mask in valid]
+    groups = {}  # Missing-value pattern -> indexes of the columns with it
+    for i, mask in enumerate(valid):
+        groups.setdefault(np.packbits(mask).tobytes(), []).append(i)
+    k = len(columns)
+    result = np.full((k, k), np.nan)
+    for members in groups.values():
+        mask = valid[members[0]]
+        if counts[members[0]] >= 2:
+            result[np.ix_(members, members)] = _pearson(np.column_stack([ranks[i][mask] for i in members]))
+    group_of = {i: key for key, members in groups.items() for i in members}
+    for i in range(k):
+        for j in range(i + 1, k):
+            if group_of[i] == group_of[j]:
+                continue
+            mask = valid[i] & valid[j]
+            n = int(mask.sum())
+            x = ranks[i][mask] if n == counts[i] else _average_ranks(ranks[i][mask])
+            y = ranks[j][mask] if n == counts[j] else _average_ranks(ranks[j][mask])
+            result[i, j] = result[j, i] = _rank_correlation(x, y)
+    return result
+
+
+def _pair_counts(block):
+    """Number of pairwise-complete rows for every pair of columns."""
+    valid = (~np.isnan(block)).astype(np.float64)
+    return valid.T @ valid
+
+
+def _confidence_bounds(matrix, counts, method, confidence):
+    from scipy.stats import norm
+
+    z_crit = norm.ppf(0.5 + confidence / 2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        z = np.arctanh(np.clip(matrix, -0.999999, 0.999999))
+        se = _FISHER_SE[method](np.where(counts > 4, counts, np.nan))
+        lower, upper = np.tanh(z - z_crit * se), np.tanh(z + z_crit * se)
+    np.fill_diagonal(lower, 1.0)
+    np.fill_diagonal(upper, 1.0)
+    return lower, upper
+
+
+def _frame(values, columns):
+    """A square matrix labelled by `columns` on both axes."""
+    return pd.DataFrame(values, index=columns, columns=columns)
+
+
+def correlation_matrix(df, columns, method="pearson", dataset_key=None, approximate=False,
+                       sample_rows=APPROX_SAMPLE_ROWS, confidence=0.95, parallel=True):
+    """Returns a CorrelationResult for `columns` of df, cached per (dataset_key, method, columns, mode).
+
+    With approximate=True the coefficients come from a uniform sample of `sample_rows` rows and
+    lower/upper hold Fisher-z confidence bounds; otherwise lower/upper are None.
+    """
+    columns = list(columns)
+    sample_key = min(sample_rows, len(df)) if approximate and len(df) > sample_rows else None
+    cache_key = (dataset_key, method, tuple(columns), sample_key, confidence)
+    if dataset_key is not None:
+        cached = _matrix_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    if sample_key is not None:
+        df = df.sample(n=sample_key, random_state=42)
+    block = df[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+    if method == "pearson":
+        matrix = _pearson(block)
+    elif method == "spearman":
+        matrix = _spearman(df, columns, dataset_key, sample_key)
+    elif method == "kendall":
+        matrix = _kendall(block, parallel=parallel)
+    else:
+        raise ValueError(f"Unknown correlation method: {method}")
+
+    lower = upper = None
+    if sample_key is not None:
+        lower, upper = _confidence_bounds(matrix, _pair_counts(block), method, confidence)
+    result = CorrelationResult(
+        matrix=_frame(matrix, columns),
+        lower=_frame(lower, columns) if lower is not None else None,
+        upper=_frame(upper, columns) if upper is not None else None,
+        n=len(df),
+        approximate=sample_key is not None,
+    )
+    if dataset_key is not None:
+        _matrix_cache.put(cache_key, result)
+    return result
+
+
+def sample_correlation_matrix(sample, columns, method, rows, confidence=0.95):
+    """CorrelationResult from a uniform row sample of a `rows`-row table, with Fisher-z confidence bounds.
+
+    When the sample is the whole table the result is exact and has no bounds.
+    """
+    columns = list(columns)
+    result = correlation_matrix(sample, columns, method)
+    if len(sample) >= rows:
+        return result
+    block = sample[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+    lower, upper = _confidence_bounds(result.matrix.to_numpy(), _pair_counts(block), method, confidence)
+    return result._replace(lower=_frame(lower, columns), upper=_frame(upper, columns), approximate=True)
@@ -1,22 +1,49 @@
 from shiny import App, ui, render, reactive
 import pandas as pd
 import numpy as np
-import tempfile
+import json
+from shared import compaction_report, dataset_fingerprint, load_dataset
+from formats import UPLOAD_EXTENSIONS
+from pipeline import Pipeline, streaming_issue
+from outliers import LEVERAGE_SOLVERS, OUTLIER_RULES
+from streaming import ChunkReader, StreamingProfile, is_streamable, iter_chunks, profile_next_chunk
+from dataset_profile import get_profile
+from jobs import iterate_in_background, run_in_background
+from export import export_choices, export_filename, iter_export, iter_export_chunks
+from paged_grid import paged_grid_server, paged_grid_ui
+from instrumentation import PERF_PANEL, instrument, perf_panel_server, perf_panel_ui
+
+MISSING_VALUE_METHODS = {
+    "none": "Do Nothing",
+    "drop": "Remove Rows with Missing Values",
+    "mean": "Fill with Mean",
+    "median": "Fill with Median",
+    "mode": "Fill with Mode",
+    "remove_columns": "Remove Columns with High Missing Values"
+}
+LEVERAGE_METHODS = {
+    "none": "Do Nothing",
+    "remove": "Remove Leverage Points",
+    "mean": "Replace with Mean",
+    "median": "Replace with Median"
+}
+
+
+def streamable_choices(step, choices, key="method", **params):
+    """The choices of a step option that pipeline.Pipeline.run_chunks can apply chunk by chunk."""
+    return {value: label for value, label in choices.items()
+            if streaming_issue({"step": step, "method": "remove", **params, key: value}) is None}
+
 
 # Define UI
 app_ui = ui.page_fluid(
-    ui.input_file("file", "Upload File", multiple=False, accept=[".csv", ".xlsx", ".xls", ".txt", ".json"]),
+    ui.input_file("file", "Upload File", multiple=False, accept=UPLOAD_EXTENSIONS),
+    # Streaming builds the summary chunk by chunk and previews a row sample; downloads process every row chunk by chunk
+    ui.input_checkbox("streaming", "Streaming ingest (large files)", value=False),
+    ui.output_ui("streaming_note"),
 
     # Handle Missing Values (No column selection)
-    ui.input_select("missing_values", "Handle Missing Values:",
-                    {
-                        "none": "Do Nothing",
-                        "drop": "Remove Rows with Missing Values",
-                        "mean": "Fill with Mean",
-                        "median": "Fill with Median",
-                        "mode": "Fill with Mode",
-                        "remove_columns": "Remove Columns with High Missing Values"
-                    }, selected="none"),
+    ui.input_select("missing_values", "Handle Missing Values:", MISSING_VALUE_METHODS, selected="none"),
     ui.output_ui("missing_threshold_ui"),  # Only needed for remove_columns
 
     # Handle Outliers
@@ -30,13 +57,7 @@ app_ui = ui.page_fluid(
                     }, selected="none"),
     ui.output_ui("outlier_column_ui"),
 
-    ui.input_select("leverage", "Handle Leverage Points:",
-                    {
-                        "none": "Do Nothing",
-                        "remove": "Remove Leverage Points",
-                        "mean": "Replace with Mean",
-                        "median": "Replace with Median"
-                    }, selected="none"),
+    ui.input_select("leverage", "Handle Leverage Points:", LEVERAGE_METHODS, selected="none"),
     ui.output_ui("leverage_column_ui"),
 
     # Convert Data Types
@@ -54,121 +75,319 @@ app_ui = ui.page_fluid(
 
     # Display Tables
     ui.output_table("data_summary"),
-    ui.output_table("preview_data"),
-    ui.output_table("processed_data"),
+    paged_grid_ui("preview_data"),
+    paged_grid_ui("processed_data"),
     
-    # Download Processed Data
-    ui.download_button("download", "Download Processed Data")
+    # Download Processed Data (streamed in chunks as it is written)
+    ui.input_select("export_format", "Download Format:", export_choices(), selected="csv"),
+    ui.download_button("download", "Download Processed Data"),
+    # Saved pipelines can be run headless: python pipeline.py preprocessing_pipeline.json input.csv
+    ui.download_button("download_pipeline", "Download Pipeline Spec"),
+
+    # Timings of every reactive in this process (PERF_PANEL=1)
+    *([perf_panel_ui("perf")] if PERF_PANEL else [])
 )
 
 # Define Server Logic
 def server(input, output, session):
+    if PERF_PANEL:
+        perf_panel_server("perf")
+    stream_state = {"chunks": None, "profile": None}  # Chunk reader and running aggregates
+    stream_version = reactive.Value(0)  # Bumped after every chunk and at end of file
+    stream_sample_version = reactive.Value(0)  # Bumped when the row sample should be re-read
+
+    def bump(value):
+        with reactive.isolate():
+            value.set(value() + 1)
+
+    def uploaded_path():
+        file_info = input.file()
+        return file_info[0]["datapath"] if file_info else None
+
+    def streaming_active():
+        path = uploaded_path()
+        return bool(input.streaming() and path and is_streamable(path))
+
+    @reactive.extended_task
+    @instrument
+    async def chunk_job(chunks):
+        return await run_in_background(profile_next_chunk, chunks, name="stream_chunk")  # Parsed off the event loop
+
+    @reactive.Effect
+    @instrument
+    def start_stream():
+        chunk_job.cancel()  # A chunk of the previous file still parsing is discarded
+        if stream_state["chunks"] is not None:
+            stream_state["chunks"].close()  # Releases the previous file and parser
+        if not streaming_active():
+            stream_state["chunks"] = stream_state["profile"] = None
+            return
+        stream_state["profile"] = StreamingProfile()
+        stream_state["chunks"] = ChunkReader(uploaded_path())
+        chunk_job.invoke(stream_state["chunks"])
+
+    @reactive.Effect
+    @instrument
+    def store_chunk():
+        part = chunk_job.result()
+        profile = stream_state["profile"]
+        if part is None:  # End of file
+            stream_state["chunks"] = None
+            profile.done = True
+            bump(stream_sample_version)
+        else:
+            first = profile.rows == 0
+            profile.merge(part)
+            if first:  # Give the previews something to show
+                bump(stream_sample_version)
+            chunk_job.invoke(stream_state["chunks"])  # Outputs are sent while the next chunk parses
+        bump(stream_version)
+
     @output
     @render.ui
-    def preview_data():
-        df = get_data()
-        if df is None:
-            return ui.HTML("<p>No data uploaded.</p>")
-
-        table_html = df.head(15).to_html(classes="table table-striped", index=False)
-        return ui.HTML(f"""
-            <div style="max-height: 300px; overflow: auto; border: 1px solid #ddd; padding: 10px; width: 100%;">
-                <table class="table table-striped" style="width: 100%; border-collapse: collapse; text-align: left; display: block; overflow: auto;">
-                    {table_html}
-                </table>
-            </div>
-        """)
-        
+    @instrument
+    def streaming_note():
+        if not streaming_active():
+            return None
+        return ui.p("Streaming: the download is processed chunk by chunk, with statistics from passes over the file. "
+                    "Mode imputation, the MAD rule and leverage need the whole file in memory and are turned off; "
+                    "medians and quartiles are approximate.")
+
+    @reactive.Effect
+    @instrument
+    def restrict_streaming_choices():
+        """Options that can't run chunk by chunk (pipeline.streaming_issue) are removed while streaming."""
+        streaming = streaming_active()
+        for input_id, step, choices in (("missing_values", "impute", MISSING_VALUE_METHODS),
+                                        ("leverage", "leverage", LEVERAGE_METHODS)):
+            choices = streamable_choices(step, choices) if streaming else choices
+            with reactive.isolate():
+                selected = input[input_id]()
+            ui.update_select(input_id, choices=choices, selected=selected if selected in choices else "none")
+
+    @reactive.extended_task
+    @instrument
+    async def load_job(file_path):
+        return await run_in_background(load_dataset, file_path)  # Parsed off the event loop
+
+    @reactive.Effect(priority=1)  # Before outputs, so they show progress instead of the previous file
+    @instrument
+    def submit_load():
+        file_path = uploaded_path()
+        load_job.cancel()
+        if file_path and not streaming_active():
+            load_job.invoke(file_path)
+
+    @reactive.Effect
+    @instrument
+    def report_load_error():
+        error = load_job.result().attrs.get("load_error")
+        if error:
+            ui.notification_show(f"Could not load the file: {error}", type="error", duration=None)
+
     @reactive.Calc
+    @instrument
     def get_data():
-        file_info = input.file()
-        if not file_info:
+        file_path = uploaded_path()
+        if not file_path:
             return None
-        file_path = file_info[0]["datapath"]
-        
-        if file_path.endswith(".csv"):
-            df = pd.read_csv(file_path)
-        elif file_path.endswith((".xlsx", ".xls")):
-            df = pd.read_excel(file_path)
-        elif file_path.endswith(".txt"):
-            df = pd.read_csv(file_path, delimiter="\t")
-        elif file_path.endswith(".json"):
-            df = pd.read_json(file_path)
-        else:
+        if streaming_active():
+            stream_sample_version()
+            profile = stream_state["profile"]
+            if profile is None or profile.rows == 0:
+                return None
+            return profile.sample.rows.copy(deep=False)
+        df = load_job.result()  # Cached by file content
+        if df.empty:
             return None
         return df
 
+    @reactive.Calc
+    @instrument
+    def data_profile():
+        """Per-column statistics of get_data(), computed once per dataset and shared with the column pickers."""
+        df = get_data()
+        if df is None:
+            return None
+        return get_profile(df, data_key())
+
     @output
     @render.table
+    @instrument
     def data_summary():
-        df = get_data()
-        if df is None:
+        if streaming_active():
+            stream_version()
+            profile = stream_state["profile"]
+            if profile is None or profile.rows == 0:
+                return pd.DataFrame()
+            var_types = profile.var_types()
+            return pd.DataFrame({
+                "Column": var_types["Variable"],
+                "Data Type": var_types["Data Type"],
+                "Missing %": var_types["% Missing"].astype(str) + "%" + ("" if profile.done else " (so far)")
+            })
+        profile = data_profile()
+        if profile is None:
             return pd.DataFrame()
-        summary = pd.DataFrame({
-            "Column": df.columns,
-            "Data Type": df.dtypes.astype(str),
-            "Missing %": ((df.isnull().sum() / len(df)) * 100).round(2).astype(str) + "%"
-        })
-        return summary
+        summary = profile.data_summary()
+        report = compaction_report(uploaded_path())  # Memory before -> after the dtype compaction on load
+        if report is None or list(report["Column"]) != list(map(str, summary["Column"])):
+            return summary
+        before, after = report["Bytes Before"], report["Bytes After"]
+        summary["Memory (KB)"] = [f"{b / 1024:,.1f} -> {a / 1024:,.1f}" for b, a in zip(before, after)]
+        saved = 1 - after.sum() / before.sum() if before.sum() else 0.0
+        total = {"Column": "Total", "Data Type": "", "Missing %": "",
+                 "Memory (KB)": f"{before.sum() / 1024:,.1f} -> {after.sum() / 1024:,.1f} ({saved:.0%} saved)"}
+        return pd.concat([summary, pd.DataFrame([total])], ignore_index=True)
 
     @output
     @render.ui
+    @instrument
     def missing_threshold_ui():
         if input.missing_values() == "remove_columns":
             return ui.input_numeric("missing_threshold", "Set Missing Value Threshold (%)", value=50, min=0, max=100)
         return None
 
+    def column_choices(numeric_only=True):
+        profile = data_profile()
+        if profile is None:
+            return []
+        return profile.numeric_columns if numeric_only else list(profile.columns)
+
+    def selected_columns(input_id):
+        return list(input[input_id]()) if input_id in input else []
+
+    def column_selector(input_id, label, numeric_only=True):
+        with reactive.isolate():
+            selected = selected_columns(input_id)  # Keep the selection when the method changes
+        return ui.input_selectize(input_id, label, column_choices(numeric_only), selected=selected, multiple=True)
+
+    def option_selector(input_id, label, choices, default):
+        with reactive.isolate():
+            selected = input[input_id]() if input_id in input else default  # Keep the choice when the method changes
+        if selected not in choices:
+            selected = default
+        return ui.input_select(input_id, label, choices, selected=selected)
+
+    @output
+    @render.ui
+    @instrument
+    def outlier_column_ui():
+        if input.outliers() != "none":
+            # Flags are cached per dataset and rule, so switching the treatment doesn't re-detect
+            return ui.TagList(
+                option_selector("outlier_rule", "Outlier Rule:",
+                                streamable_choices("outliers", OUTLIER_RULES, key="rule")
+                                if streaming_active() else OUTLIER_RULES, "iqr"),
+                column_selector("outlier_columns", "Outlier Columns (empty = all numeric):"),
+            )
+        return None
+
+    @output
+    @render.ui
+    @instrument
+    def leverage_column_ui():
+        if input.leverage() != "none":
+            return ui.TagList(
+                option_selector("leverage_solver", "Leverage Computation:", LEVERAGE_SOLVERS, "auto"),
+                column_selector("leverage_columns", "Regressor Columns (empty = all numeric):"),
+            )
+        return None
+
+    @output
+    @render.ui
+    @instrument
+    def convert_column_ui():
+        if input.data_type() != "none":
+            return column_selector("convert_columns", "Columns to Convert (empty = all non-numeric):",
+                                   numeric_only=False)
+        return None
+
+    @output
+    @render.ui
+    @instrument
+    def normalization_column_ui():
+        if input.normalization() != "none":
+            return column_selector("normalization_columns", "Columns to Scale (empty = all numeric):")
+        return None
+
     @reactive.Calc
+    @instrument
+    def pipeline():
+        """Builds the preprocessing pipeline from the selected options."""
+        impute = {"step": "impute", "method": input.missing_values()}
+        if input.missing_values() == "remove_columns":
+            impute["threshold"] = input.missing_threshold()
+        steps = [
+            impute,
+            {"step": "outliers", "method": input.outliers(), "columns": selected_columns("outlier_columns"),
+             "rule": input.outlier_rule() if "outlier_rule" in input else "iqr"},
+            {"step": "leverage", "method": input.leverage(), "columns": selected_columns("leverage_columns"),
+             "solver": input.leverage_solver() if "leverage_solver" in input else "auto"},
+        ]
+        if input.data_type() == "to_numeric":
+            steps.append({"step": "to_numeric", "columns": selected_columns("convert_columns")})
+        steps.append({"step": "scale", "method": input.normalization(),
+                      "columns": selected_columns("normalization_columns")})
+        return Pipeline(steps)
+
+    @reactive.Calc
+    @instrument
+    def data_key():
+        """Content fingerprint of the uploaded file (None while streaming, when only a sample is loaded)."""
+        if streaming_active() or not uploaded_path():
+            return None
+        return dataset_fingerprint(uploaded_path())
+
+    @reactive.Calc
+    @instrument
     def preprocess_data():
         df = get_data()
         if df is None:
             return None
-        
-        # Handle Missing Values (applies to entire columns)
-        missing_method = input.missing_values()
-        if missing_method == "drop":
-            df = df.dropna()
-        elif missing_method == "mean":
-            df = df.fillna(df.mean(numeric_only=True))
-        elif missing_method == "median":
-            df = df.fillna(df.median(numeric_only=True))
-        elif missing_method == "mode":
-            df = df.fillna(df.mode().iloc[0])
-        elif missing_method == "remove_columns":
-            threshold = input.missing_threshold() / 100
-            df = df.loc[:, (df.isnull().mean() * 100) < threshold]
-
-        return df
+        # Each step is cached by its input fingerprint, so only steps after the changed one rerun
+        return pipeline().run(df, fingerprint=data_key())
     
+    @reactive.Calc
+    @instrument
+    def processed_key():
+        return pipeline().fingerprint(data_key()) if data_key() is not None else None
+
+    # Paged previews: rows are sorted, filtered and sliced on the server
+    paged_grid_server("preview_data", get_data, data_key)
+    paged_grid_server("processed_data", preprocess_data, processed_key)
+
     @output
-    @render.ui
-    def processed_data():
-        df = preprocess_data()
-        if df is None:
-            return ui.HTML("<p>No processed data available.</p>")
-        
-        table_html = df.head(15).to_html(classes="table table-striped", index=False)
-        return ui.HTML(f"""
-            <div style="max-height: 300px; overflow: auto; border: 1px solid #ddd; padding: 10px; width: 100%;">
-                <table class="table table-striped" style="width: 100%; border-collapse: collapse; text-align: left; display: block; overflow: auto;">
-                    {table_html}
-                </table>
-            </div>
-        """)
+    @render.download(filename=lambda: export_filename("processed_data", input.export_format()))
+    @instrument
+    async def download():
+        if streaming_active():
+            # The preview only holds a sample; every row is processed chunk by chunk, never the whole file at once
+            steps, file_path, profile = pipeline(), uploaded_path(), stream_state["profile"]
+            chunks = steps.run_chunks(lambda: iter_chunks(file_path),
+                                      profile if profile is not None and profile.done else None)
+            export = iter_export_chunks(chunks, input.export_format())
+        else:
+            df = preprocess_data()
+            if df is None:
+                return
+            export = iter_export(df, input.export_format())
+        async for chunk in iterate_in_background(export, name="export"):
+            yield chunk
 
     @output
-    @render.download
-    def download():
-        df = preprocess_data()
-        if df is None:
-            return None
-        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".csv")
-        df.to_csv(temp_file.name, index=False)
-        return temp_file.name
+    @render.download(filename="preprocessing_pipeline.json")
+    @instrument
+    def download_pipeline():
+        yield json.dumps(pipeline().to_dict(), indent=2)
 
-print("Initializing Shiny app...")
 app = App(app_ui, server)
-print("Shiny app created successfully.")
-print("Starting the Shiny app server...")
-app.run()
-print("Shiny app has stopped.")  # This will print only if the app stops
+
+# `python data_preprocessing.py` serves the app. Importing the module (shiny run, prefork.py, and the spawned
+# column-statistics workers, which re-import __main__) only builds it, with no output and no server
+if __name__ == "__main__":
+    print("Initializing Shiny app...")
+    print("Shiny app created successfully.")
+    print("Starting the Shiny app server...")
+    app.run()
+    print("Shiny app has stopped.")  # This will print only if the app stops
@@ -0,0 +1,213 @@
+import hashlib
+import os
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from column_store import open_store, write_store
+from lru import LRU
+
+DIGEST_MEMO_ENTRIES = 1024
+SNAPSHOT_PATTERNS = ("*.arrow", "*.duckdb")  # Arrow snapshots and pushdown.py's imported databases
+STALE_PARTIAL_SECONDS = 3600  # A .tmp file untouched this long was left by a crashed write
+
+_digest_memo = LRU(max_entries=DIGEST_MEMO_ENTRIES)  # (path, size, mtime) -> digest, so an unchanged file isn't re-hashed
+
+
+def file_digest(file_path, chunk_size=1 << 20):
+    """Returns a hex digest of the file contents, read in fixed-size chunks."""
+    stat = os.stat(file_path)
+    memo_key = (str(file_path), stat.st_size, stat.st_mtime_ns)
+    cached = _digest_memo.get(memo_key)
+    if cached is not None:
+        return cached
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    _digest_memo.put(memo_key, digest.hexdigest())
+    return digest.hexdigest()
+
+
+def frame_nbytes(df):
+    """Returns the in-memory size of a DataFrame in bytes (including object payloads)."""
+    return int(df.memory_usage(deep=True, index=True).sum())
+
+
+def _entry_nbytes(entry):
+    return frame_nbytes(entry[0])
+
+
+class DatasetCache:
+    """LRU cache of parsed DataFrames keyed by file content, backed by memory-mapped Arrow snapshots on disk.
+
+    Frames restored from (or just written to) a snapshot are zero-copy views of the
+    mapped file, so sessions and worker processes share one copy of the data. The disk budget also
+    covers the databases pushdown.py imports into the same directory.
+    """
+
+    def __init__(self, max_bytes, snapshot_dir=None, max_disk_bytes=None):
+        self.max_bytes = max_bytes  # Memory budget for cached frames (one larger than this is kept on disk only)
+        self.snapshot_dir = Path(snapshot_dir) if snapshot_dir else None
+        self.max_disk_bytes = max_disk_bytes  # Disk budget for snapshots (None = unbounded)
+        self._frames = LRU(max_bytes=max_bytes, sizeof=_entry_nbytes)  # key -> (frame, metadata dict or None)
+        self._loading = {}  # key -> Future of a parse in progress, awaited by other callers for the same key
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _snapshot_path(self, key):
+        return self.snapshot_dir / f"{key}.arrow"
+
+    def _read_snapshot(self, key):
+        if self.snapshot_dir is None:
+            return None
+        path = self._snapshot_path(key)
+        if not path.exists():
+            return None
+        try:
+            store = open_store(path)
+            path.touch()  # So disk pruning keeps recently used snapshots
+            return store.frame, store.metadata
+        except Exception as e:
+            print(f"Ignoring unreadable dataset snapshot {path.name}: {e}")
+            return None
+
+    def _write_snapshot(self, key, df, metadata=None):
+        """Writes a snapshot and returns the memory-mapped frame, or the original frame if it can't be stored."""
+        if self.snapshot_dir is None:
+            return df
+        try:
+            self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+            path = self._snapshot_path(key)
+            write_store(df, path, metadata)
+            mapped = open_store(path).frame
+        except Exception as e:
+            # Missing pyarrow, mixed-type object columns, a non-default index, full disk...
+            print(f"Skipping dataset snapshot: {e}")
+            return df
+        self.prune_snapshots()
+        return mapped
+
+    def _disk_files(self, patterns):
+        """(path, stat) of the files in the snapshot directory matching `patterns`, oldest first."""
+        files = []
+        for pattern in patterns:
+            for path in self.snapshot_dir.glob(pattern):
+                try:
+                    files.append((path, path.stat()))
+                except FileNotFoundError:  # Pruned by another worker meanwhile
+                    pass
+        return sorted(files, key=lambda file: file[1].st_mtime)
+
+    def _remove_stale_partials(self):
+        cutoff = time.time() - STALE_PARTIAL_SECONDS
+        for path, stat in self._disk_files(["*.tmp"]):
+            if stat.st_mtime < cutoff:
+                path.unlink(missing_ok=True)
+
+    def prune_snapshots(self):
+        """Deletes the least recently used snapshots and databases until the disk budget is met, and stale partial writes."""
+        if self.snapshot_dir is None or not self.snapshot_dir.exists():
+            return
+        self._remove_stale_partials()
+        if self.max_disk_bytes is None:
+            return
+        snapshots = self._disk_files(SNAPSHOT_PATTERNS)
+        total = sum(stat.st_size for _, stat in snapshots)
+        for path, stat in snapshots[:-1]:  # Never delete the file that was just written
+            if total <= self.max_disk_bytes:
+                break
+            total -= stat.st_size
+            path.unlink(missing_ok=True)
+
+    def get(self, key):
+        """Returns the cached frame for a key, or None. Checks memory first, then disk."""
+        with self._lock:
+            entry = self._frames.get(key)
+            if entry is not None:
+                self.hits += 1
+                return entry[0]
+            entry = self._read_snapshot(key)
+            if entry is not None:
+                self.disk_hits += 1
+                self._frames.put(key, entry)
+                return entry[0]
+            self.misses += 1
+            return None
+
+    def put(self, key, df, metadata=None):
+        """Caches a frame (and optional JSON-serializable metadata) and returns the copy that was kept.
+
+        The snapshot is written and mapped before taking the lock, so other sessions' lookups don't wait on it.
+        """
+        df = self._write_snapshot(key, df, metadata)
+        with self._lock:
+            self._frames.put(key, (df, metadata))  # The metadata is evicted with its frame
+        return df
+
+    def metadata(self, key):
+        """Returns the metadata stored with a cached frame (from memory or its snapshot), or None."""
+        with self._lock:
+            entry = self._frames.get(key)
+            if entry is not None:
+                return entry[1]
+        entry = self._read_snapshot(key)
+        return entry[1] if entry is not None else None
+
+    def key(self, file_path, tag=""):
+        """Returns the cache key for a file: its content digest plus the parse tag."""
+        return file_digest(file_path) + (f"-{tag}" if tag else "")
+
+    def get_or_load(self, file_path, loader, tag=""):
+        """Returns the cached parse of a file, calling loader(file_path) on a miss.
+
+        The key combines the content digest with a tag describing how the file
+        is parsed, so the same bytes read with different options are cached separately.
+        The loader may return (frame, metadata) to keep a dict with the frame; see metadata().
+        A shallow copy is returned so callers can rename or add columns freely.
+        Concurrent calls for the same key parse the file once: the others wait for that result (or error).
+        """
+        key = self.key(file_path, tag)
+        with self._lock:
+            df = self.get(key)
+            loading = self._loading.get(key) if df is None else None
+            if df is None and loading is None:
+                future = self._loading[key] = Future()
+        if df is None and loading is not None:
+            df = loading.result()
+        elif df is None:
+            try:
+                loaded = loader(file_path)
+                df = self.put(key, *loaded) if isinstance(loaded, tuple) else self.put(key, loaded)
+            except BaseException as e:
+                future.set_exception(e)
+                raise
+            else:
+                future.set_result(df)
+            finally:
+                with self._lock:
+                    del self._loading[key]
+        return df.copy(deep=False)
+
+    def clear(self, disk=False):
+        with self._lock:
+            self._frames.clear()
+            if disk and self.snapshot_dir is not None and self.snapshot_dir.exists():
+                for path, _ in self._disk_files(SNAPSHOT_PATTERNS):
+                    path.unlink(missing_ok=True)
+                self._remove_stale_partials()  # Fresh ones belong to writes in progress
+
+    def stats(self):
+        """Returns hit/miss counters and current memory usage."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self._frames.evictions,
+                "entries": len(self._frames),
+                "bytes": self._frames.nbytes,
+                "max_bytes": self.max_bytes,
+            }
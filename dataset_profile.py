@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+from lru import LRU
+
+PROFILE_CACHE_ENTRIES = 32
+TOP_K = 20  # Most frequent values kept for categorical columns
+
+
+def dtype_class(series):
+    """Classifies a column as numeric, boolean, datetime or categorical (matching select_dtypes(np.number))."""
+    if pd.api.types.is_bool_dtype(series):
+        return "boolean"
+    if pd.api.types.is_numeric_dtype(series):
+        return "numeric"
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "datetime"
+    return "categorical"
+
+
+class ColumnProfile:
+    """Statistics for one column, computed in a single pass over its values."""
+
+    def __init__(self, name, series, top_k=TOP_K):
+        self.name = name
+        self.dtype = str(series.dtype)
+        self.kind = dtype_class(series)
+        self.missing = int(series.isna().sum())
+        self.count = len(series) - self.missing
+        self.distinct = int(series.nunique())
+        self.mean = self.std = self.min = self.max = np.nan
+        self.quantiles = {0.25: np.nan, 0.5: np.nan, 0.75: np.nan}
+        self.top_values = None
+        if self.kind == "numeric":
+            values = series.to_numpy(dtype=np.float64, na_value=np.nan)
+            values = values[~np.isnan(values)]
+            if len(values) > 0:
+                self.mean = values.mean()
+                self.std = values.std(ddof=1) if len(values) > 1 else np.nan
+                self.min, self.max = values.min(), values.max()
+                self.quantiles = dict(zip(self.quantiles, np.quantile(values, list(self.quantiles))))
+        else:
+            counts = series.value_counts()
+            self.top_values = counts[counts > 0].head(top_k)  # Categoricals also count unused categories
+
+
+class DatasetProfile:
+    """Per-column profile of a dataset, built once per dataset version and shared by every stats view."""
+
+    def __init__(self, df, top_k=TOP_K):
+        self.rows = len(df)
+        self.columns = {name: ColumnProfile(name, df[name], top_k) for name in df.columns}
+        self.done = True  # Same interface as streaming.StreamingProfile
+
+    @property
+    def column_count(self):
+        return len(self.columns)
+
+    def columns_of(self, *kinds):
+        return [name for name, col in self.columns.items() if col.kind in kinds]
+
+    @property
+    def numeric_columns(self):
+        return self.columns_of("numeric")
+
+    @property
+    def categorical_columns(self):
+        """Every non-numeric column (what select_dtypes(exclude=np.number) returns)."""
+        return self.columns_of("categorical", "boolean", "datetime")
+
+    def summary_stats(self):
+        """Returns describe() statistics for numeric columns, one row per variable."""
+        return pd.DataFrame([{
+            "Variable": name, "count": float(col.count), "mean": col.mean, "std": col.std, "min": col.min,
+            "25%": col.quantiles[0.25], "50%": col.quantiles[0.5], "75%": col.quantiles[0.75], "max": col.max,
+        } for name, col in self.columns.items() if col.kind == "numeric"])
+
+    def var_types(self):
+        """Returns type, distinct count and missing values per column."""
+        return pd.DataFrame({
+            "Variable": list(self.columns),
+            "Data Type": [col.dtype for col in self.columns.values()],
+            "Unique Values": [col.distinct for col in self.columns.values()],
+            "Missing Values": [col.missing for col in self.columns.values()],
+            "% Missing": [round(col.missing / self.rows * 100, 2) if self.rows else np.nan
+                          for col in self.columns.values()],
+        })
+
+    def data_summary(self):
+        """Returns the column / type / missing % table shown by data_preprocessing.py."""
+        return pd.DataFrame({
+            "Column": list(self.columns),
+            "Data Type": [col.dtype for col in self.columns.values()],
+            "Missing %": [f"{round(col.missing / self.rows * 100, 2) if self.rows else np.nan}%"
+                          for col in self.columns.values()],
+        })
+
+
+_profiles = LRU(max_entries=PROFILE_CACHE_ENTRIES)  # dataset key -> DatasetProfile, shared by every session in this process
+
+
+def get_profile(df, dataset_key=None):
+    """Returns the DatasetProfile for df, reusing the cached one when dataset_key has been profiled before."""
+    if dataset_key is None:
+        return DatasetProfile(df)
+    return _profiles.get_or_compute(dataset_key, lambda: DatasetProfile(df))
@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from lru import LRU
+from export import EXPORT_CHUNK_ROWS, arrow_schema
+
+HASH_FEATURES = 32  # Buckets for the hashing trick
+ENCODE_CHUNK_CELLS = 10_000_000  # Indicator cells materialized at once when a one-hot frame is streamed
+PREVIEW_MAX_LEVELS = 50  # Wider one-hot previews only show the levels that occur in the shown rows
+CODES_CACHE_ENTRIES = 16
+
+_codes_cache = LRU(max_entries=CODES_CACHE_ENTRIES)
+
+
+class CategoryCodes:
+    """A column as integer codes into its sorted levels (-1 = missing): one-hot encoding without the dense block.
+
+    Indicator columns are expanded only for the rows asked for, so memory depends on the rows shown
+    or written, not on rows x levels.
+    """
+
+    def __init__(self, series):
+        codes, levels = pd.factorize(series, sort=True)
+        self.name = series.name
+        self.codes = codes.astype(np.int32 if len(levels) < 2**31 else np.int64, copy=False)
+        self.levels = pd.Index(levels)
+        self.has_missing = bool((codes < 0).any())
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + self.levels.memory_usage()
+
+    def column_names(self, prefix, levels=None):
+        """Names pd.get_dummies(prefix=prefix) gives the indicator columns."""
+        return [f"{prefix}_{level}" for level in (self.levels if levels is None else self.levels[levels])]
+
+    def one_hot(self, start, stop, index, levels=None):
+        """Indicator columns for rows start:stop, like pd.get_dummies(series.dropna()) aligned back to all rows.
+
+        `levels` (positions into self.levels) restricts the columns. Missing rows are missing in every column.
+        """
+        codes = self.codes[start:stop]
+        if levels is None:
+            levels = np.arange(len(self.levels))
+        position = np.full(len(self.levels) + 1, -1, dtype=np.int64)  # Code -> output column (-1 = not shown)
+        position[levels] = np.arange(len(levels))
+        columns = position[codes]  # Code -1 (missing) lands on the last entry, which is always -1
+        block = np.zeros((len(codes), len(levels)), dtype=bool)
+        shown = columns >= 0
+        block[np.flatnonzero(shown), columns[shown]] = True
+        if self.has_missing and (codes < 0).any():
+            block = block.astype(object)
+            block[codes < 0] = np.nan
+        return pd.DataFrame(block, index=index, columns=self.column_names(self.name, levels))
+
+    def sparse_one_hot(self, index):
+        """Indicator columns for every row as sparse booleans, like pd.get_dummies(sparse=True): memory grows
+        with the rows, not rows x levels. Rows where the value is missing are False in every column.
+        """
+        from scipy import sparse
+
+        rows = np.flatnonzero(self.codes >= 0)
+        matrix = sparse.csc_matrix((np.ones(len(rows), dtype=bool), (rows, self.codes[rows])),
+                                   shape=(len(self.codes), len(self.levels)))
+        return pd.DataFrame.sparse.from_spmatrix(matrix, index=index, columns=self.column_names(self.name))
+
+
+def category_codes(dataset_key, series):
+    """CategoryCodes for a column, shared across sessions per (dataset_key, column)."""
+    key = (dataset_key, series.name)
+    codes = _codes_cache.get(key) if dataset_key is not None else None
+    if codes is None:
+        codes = CategoryCodes(series)
+        if dataset_key is not None:
+            _codes_cache.put(key, codes, codes.nbytes)
+    return codes
+
+
+def one_hot_preview(df, column, codes, rows=5):
+    """The first `rows` rows with `column` one-hot encoded; only those rows are expanded.
+
+    With more than PREVIEW_MAX_LEVELS levels, only the levels that occur in those rows get a column.
+    """
+    head = df.head(rows)
+    levels = None
+    if len(codes.levels) > PREVIEW_MAX_LEVELS:
+        shown = codes.codes[:len(head)]
+        levels = np.unique(shown[shown >= 0])
+    return pd.concat([head.drop(columns=[column]), codes.one_hot(0, len(head), head.index, levels)], axis=1)
+
+
+def one_hot_chunks(df, column, codes, chunk_rows=EXPORT_CHUNK_ROWS, max_cells=ENCODE_CHUNK_CELLS):
+    """Yields df with `column` one-hot encoded, in row chunks small enough to hold max_cells indicators.
+
+    The chunks concatenate to pd.concat([df.drop(columns=[column]), pd.get_dummies(df[column].dropna(),
+    prefix=column)], axis=1), which never exists in memory as a whole.
+    """
+    rest = df.drop(columns=[column])
+    chunk_rows = max(1, min(chunk_rows, max_cells // max(len(codes.levels), 1)))
+    for start in range(0, max(len(df), 1), chunk_rows):  # An empty frame still yields its header
+        chunk = rest.iloc[start:start + chunk_rows]
+        yield pd.concat([chunk, codes.one_hot(start, start + len(chunk), chunk.index)], axis=1)
+
+
+def one_hot_schema(df, column, codes):
+    """Arrow schema of the one_hot_chunks() output, for export.iter_export_chunks().
+
+    The other columns' types come from the whole frame, so a chunk that happens to be all missing
+    doesn't decide them; the indicators are booleans.
+    """
+    schema = arrow_schema(df).remove_metadata()  # The pandas metadata still lists `column`
+    schema = schema.remove(schema.get_field_index(str(column)))
+    return pa.schema(list(schema) + [pa.field(name, pa.bool_()) for name in codes.column_names(column)])
+
+
+def hash_encode(series, n_features=HASH_FEATURES):
+    """Hashing trick: one indicator column per hash bucket of the value, so the width doesn't grow with the levels.
+
+    Values that share a bucket share a column; missing values are 0 in every column.
+    """
+    hashes = pd.util.hash_pandas_object(series, index=False).to_numpy()
+    buckets = (hashes % np.uint64(n_features)).astype(np.intp)
+    present = np.flatnonzero(series.notna().to_numpy())
+    block = np.zeros((len(series), n_features), dtype=np.int8)
+    block[present, buckets[present]] = 1
+    return pd.DataFrame(block, index=series.index, columns=[f"{series.name}_hash_{i}" for i in range(n_features)])
+
+
+def count_encode(series):
+    """Count encoding: each value replaced by how many rows have it (missing stays missing)."""
+    codes, _ = pd.factorize(series)
+    counts = np.bincount(codes[codes >= 0]).astype(np.float64)
+    values = np.where(codes >= 0, counts[np.maximum(codes, 0)] if len(counts) else np.nan, np.nan)
+    return pd.Series(values, index=series.index, name=series.name)
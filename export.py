@@ -0,0 +1,124 @@
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+EXPORT_CHUNK_ROWS = 100_000  # Rows serialized per chunk; the first chunk is sent before the rest is written
+
+# format -> (label, file extension)
+EXPORT_FORMATS = {
+    "csv": ("CSV", ".csv"),
+    "csv.gz": ("CSV (gzip)", ".csv.gz"),
+    "csv.zst": ("CSV (zstd)", ".csv.zst"),
+    "parquet": ("Parquet", ".parquet"),
+    "feather": ("Feather", ".feather"),
+}
+_CSV_CODECS = {"csv.gz": "gzip", "csv.zst": "zstd"}
+COLUMNAR_CODEC = "zstd"  # Column compression inside Parquet and Feather files
+
+
+def export_choices():
+    """Returns {format: label} for a download format selector."""
+    return {fmt: label for fmt, (label, _) in EXPORT_FORMATS.items()}
+
+
+def export_filename(stem, fmt):
+    return stem + EXPORT_FORMATS[fmt][1]
+
+
+class _ChunkSink:
+    """Write-only file object that collects bytes until the caller drains them."""
+
+    def __init__(self):
+        self._parts = []
+        self.closed = False
+
+    def write(self, data):
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def writable(self):
+        return True
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts.clear()
+        return data
+
+
+def _row_chunks(df, chunk_rows):
+    for start in range(0, max(len(df), 1), chunk_rows):  # An empty frame still yields its header/schema
+        yield df.iloc[start:start + chunk_rows]
+
+
+def arrow_schema(df):
+    """Arrow schema for exporting df, from its dtypes (all-null columns are written as strings).
+
+    Object columns are inferred from all of their values, so pass the whole frame rather than a chunk.
+    """
+    schema = pa.Schema.from_pandas(df, preserve_index=False)
+    for i, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            schema = schema.set(i, field.with_type(pa.string()))
+    return schema
+
+
+def iter_export(df, fmt="csv", chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yields df serialized as `fmt` in byte chunks, one per `chunk_rows` rows, without a temporary file.
+
+    CSV matches df.to_csv(index=False); compressed CSV is a single gzip/zstd stream. Parquet gets one
+    row group per chunk and Feather one record batch per chunk.
+    """
+    return iter_export_chunks(_row_chunks(df, chunk_rows), fmt, arrow_schema(df))
+
+
+def _to_arrow(chunk, schema):
+    """Converts a chunk with its own inferred types, then casts it to the file's schema."""
+    table = pa.Table.from_pandas(chunk, preserve_index=False)
+    try:
+        return table.select(schema.names).cast(schema)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+        raise ValueError(f"Export chunk doesn't fit the file's schema: {e}") from e
+
+
+def iter_export_chunks(chunks, fmt="csv", schema=None):
+    """Like iter_export(), for a frame given as an iterable of row chunks with the same columns.
+
+    Lets a frame that is too large to build (e.g. a wide one-hot encoding) be generated while it is written.
+    Parquet and Feather chunks are cast to `schema` (see arrow_schema()), or to the first chunk's schema when
+    none is given; a later chunk whose values don't fit it (e.g. fractions in a column that was all integers)
+    raises ValueError.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    sink = _ChunkSink()
+    stream = pa.PythonFile(sink, mode="w")
+    if fmt in _CSV_CODECS:
+        stream = pa.CompressedOutputStream(stream, _CSV_CODECS[fmt])
+    writer = None
+    for i, chunk in enumerate(chunks):
+        chunk = chunk.set_axis(chunk.columns.astype(str), axis=1)  # Arrow requires string column names
+        if fmt.startswith("csv"):
+            stream.write(chunk.to_csv(index=False, header=i == 0).encode())
+        else:
+            if writer is None:
+                schema = schema if schema is not None else arrow_schema(chunk)
+                if fmt == "parquet":
+                    writer = pq.ParquetWriter(stream, schema, compression=COLUMNAR_CODEC)
+                else:
+                    writer = pa.ipc.new_file(stream, schema,
+                                             options=pa.ipc.IpcWriteOptions(compression=COLUMNAR_CODEC))
+            writer.write_table(_to_arrow(chunk, schema))
+        data = sink.drain()
+        if data:
+            yield data
+    if writer is not None:
+        writer.close()  # Writes the Parquet footer / Feather trailer
+    stream.close()
+    data = sink.drain()
+    if data:
+        yield data
@@ -1,12 +1,21 @@
+import json
 from shiny import App, ui, render, reactive
 import pandas as pd
-import matplotlib.pyplot as plt
 import numpy as np
-import tempfile
+from shared import dataset_fingerprint, load_dataset
+from formats import UPLOAD_EXTENSIONS
+from jobs import iterate_in_background, run_in_background
+from encoding import HASH_FEATURES, category_codes, hash_encode, one_hot_chunks, one_hot_preview, one_hot_schema
+from export import export_choices, export_filename, iter_export, iter_export_chunks
+from feature_spec import FeatureSpec, is_one_hot, transform_frame, transformed_column as transform_column
+from incremental import append_file, appendable
+from instrumentation import PERF_PANEL, instrument, perf_panel_server, perf_panel_ui
+from transforms import SCALERS, bin_labels, is_numeric
 
 # Define UI
 app_ui = ui.page_fluid(
-    ui.input_file("file", "Upload CSV File", multiple=False, accept=[".csv"]),
+    ui.input_file("file", "Upload File", multiple=False, accept=UPLOAD_EXTENSIONS),
+    ui.input_file("append_file", "Append Rows", multiple=False, accept=UPLOAD_EXTENSIONS),  # Scaling uses every row so far
     ui.output_ui("column_selector"),
     ui.input_select("transformation", "Choose Transformation:", 
                     {
@@ -15,6 +24,8 @@ app_ui = ui.page_fluid(
                         "square": "Square",
                         "standard": "Standardize",
                         "one_hot": "One-Hot Encoding",
+                        "hashing": f"Hashing Trick ({HASH_FEATURES} columns)",
+                        "count": "Count Encoding",
                         "minmax": "Min-Max Scaling",
                         "poly2": "Polynomial (x²)",
                         "poly3": "Polynomial (x³)",
@@ -23,121 +34,207 @@ app_ui = ui.page_fluid(
     ui.output_plot("plot_output"),
     ui.output_table("preview_data"),
     ui.output_table("transformed_data"),
-    ui.download_button("download_csv", "Download Transformed Data")  # New download button
+    ui.input_select("export_format", "Download Format:", export_choices(), selected="csv"),
+    ui.download_button("download_csv", "Download Transformed Data"),  # Streamed in chunks as it is written
+    ui.download_button("download_spec", "Download Feature Spec"),  # Replayed on other files by batch.py
+    *([perf_panel_ui("perf")] if PERF_PANEL else [])  # Timings of every reactive in this process (PERF_PANEL=1)
 )
 
 # Server Logic
 def server(input, output, session):
+    if PERF_PANEL:
+        perf_panel_server("perf")
     df = reactive.Value(None)
-    transformed_df = reactive.Value(None)  # Store transformed dataset
+    dataset_key = reactive.Value(None)  # Content fingerprint of the uploaded file, used as the transform cache key
+    appended = reactive.Value(None)  # Latest incremental.AppendableDataset, or None before the first append
+    append_state = {"chain": {}}  # chain: latest version of the uploaded dataset, shared by queued appends
+
+    @reactive.extended_task
+    @instrument
+    async def load_job(path):
+        return path, await run_in_background(load_dataset, path)  # Parsed off the event loop
 
     @reactive.effect
+    @instrument
     def update_df():
         file_info = input.file()
         if file_info and len(file_info) > 0:
-            df.set(pd.read_csv(file_info[0]["datapath"]))
-            transformed_df.set(df.get().copy())  # Initialize transformed dataset
+            load_job.cancel()  # A newer upload supersedes one still parsing
+            append_job.cancel()
+            load_job.invoke(file_info[0]["datapath"])
+
+    @reactive.effect
+    @instrument
+    def store_df():
+        path, loaded = load_job.result()
+        if error := loaded.attrs.get("load_error"):
+            ui.notification_show(f"Could not load the file: {error}", type="error", duration=None)
+            df.set(None)
+            return
+        df.set(loaded)  # Cached by file content
+        dataset_key.set(dataset_fingerprint(path))
+        append_state["chain"] = {}  # A fresh dict: an append of the previous file still running writes to the old one
+        appended.set(None)
+
+    def append_rows(chain, loaded, key, path):
+        """Appends a file to the chain's latest version; queued appends run in order, each on the previous one."""
+        try:
+            chain["version"] = append_file(chain.get("version") or appendable(loaded, key), path)
+        except ValueError as e:
+            return None, None, str(e)
+        return chain["version"], chain["version"].frame, None  # Joined here: every view reads the whole column
+
+    @reactive.extended_task
+    @instrument
+    async def append_job(chain, loaded, key, path):
+        return await run_in_background(append_rows, chain, loaded, key, path, name="append")
+
+    @reactive.effect
+    @instrument
+    def submit_append():
+        file_info = input.append_file()
+        if not file_info:
+            return
+        with reactive.isolate():
+            if df.get() is None:
+                ui.notification_show("Upload a file before appending rows to it.", type="warning")
+                return
+            append_job.invoke(append_state["chain"], df.get(), dataset_key.get(), file_info[0]["datapath"])
+
+    @reactive.effect
+    @instrument
+    def store_append():
+        version, frame, error = append_job.result()
+        if error:
+            ui.notification_show(f"Could not append the file: {error}", type="error", duration=None)
+            return
+        appended.set(version)
+        df.set(frame)
+        dataset_key.set(version.key)  # A new key per version, so cached transforms never mix versions
+        ui.notification_show(f"Appended batch {version.batches}: {version.rows:,} rows in total", type="message")
 
     @output
     @render.ui
+    @instrument
     def column_selector():
         if df.get() is not None:
             all_columns = df.get().columns
-            return ui.input_select("column", "Select Column:", {col: col for col in all_columns})
+            with reactive.isolate():  # Appended rows re-render the selector; keep the chosen column
+                selected = input.column() if "column" in input and input.column() in all_columns else None
+            return ui.input_select("column", "Select Column:", {col: col for col in all_columns}, selected=selected)
         return None
 
     @output
     @render.table
+    @instrument
     def preview_data():
         if df.get() is not None:
             return df.get().head()
         return None
 
+    def column_ready():
+        return df.get() is not None and "column" in input and input.column() in df.get().columns
+
+    def one_hot_ready():
+        return is_one_hot(df.get(), input.column(), input.transformation())
+
+    def scaler():
+        """Standard/minmax parameters from the appended dataset's running aggregates, or None to compute them."""
+        if appended.get() is None or input.transformation() not in SCALERS or not is_numeric(df.get()[input.column()]):
+            return None
+        return appended.get().scaler(input.column(), input.transformation())
+
+    @reactive.calc
+    @instrument
+    def transformed_column():
+        """The selected column after the selected transformation, computed once and shared by the table, plot and download."""
+        return transform_column(df.get(), input.column(), input.transformation(), dataset_key.get(), scaler())
+
+    @reactive.calc
+    @instrument
+    def one_hot_codes():
+        """The selected column as codes into its levels; one-hot columns are expanded from these only for the rows shown or written."""
+        return category_codes(dataset_key.get(), df.get()[input.column()])
+
+    @reactive.calc
+    @instrument
+    def transformed_df():
+        """The full dataset with the transformation applied; the uploaded columns are shared, not copied.
+
+        One-hot is not built here: it is streamed by one_hot_chunks() (see download_csv).
+        """
+        if input.transformation() == "one_hot":
+            return df.get().copy(deep=False)  # Numeric column: one-hot doesn't apply
+        return transform_frame(df.get(), input.column(), input.transformation(), dataset_key.get(), scaler())
+
     @output
     @render.table
+    @instrument
     def transformed_data():
-        if df.get() is None or input.column() is None or input.column() not in df.get().columns:
+        if not column_ready():
             return None
-        
-        column_data = df.get()[input.column()].dropna()  
-        new_df = df.get().copy()  
-
-        is_numeric = np.issubdtype(column_data.dtype, np.number)
-        transformed_data = column_data.copy()
-
-        if input.transformation() == "log" and is_numeric:
-            column_data = column_data[column_data > 0]  
-            transformed_data = np.log1p(column_data)
-        elif input.transformation() == "square" and is_numeric:
-            transformed_data = column_data ** 2
-        elif input.transformation() == "standard" and is_numeric:
-            transformed_data = (column_data - column_data.mean()) / column_data.std()
-        elif input.transformation() == "one_hot" and not is_numeric:
-            one_hot_encoded = pd.get_dummies(column_data, prefix=input.column())
-            new_df = new_df.drop(columns=[input.column()])  
-            new_df = pd.concat([new_df, one_hot_encoded], axis=1)
-        elif input.transformation() == "minmax" and is_numeric:
-            transformed_data = (column_data - column_data.min()) / (column_data.max() - column_data.min())
-        elif input.transformation() == "poly2" and is_numeric:
-            transformed_data = column_data ** 2
-        elif input.transformation() == "poly3" and is_numeric:
-            transformed_data = column_data ** 3
-        elif input.transformation() == "binning" and is_numeric:
-            transformed_data = pd.cut(column_data, bins=5, labels=["Very Low", "Low", "Medium", "High", "Very High"])
-
+        column = input.column()
+        if one_hot_ready():
+            return one_hot_preview(df.get(), column, one_hot_codes())
         if input.transformation() == "one_hot":
-            transformed_df.set(new_df)  
-            return new_df.head()
-        
-        
-        new_df[input.column() + "_transformed"] = transformed_data
-        transformed_df.set(new_df)
-        return new_df[[input.column(), input.column() + "_transformed"]].head()
+            return df.get().head()
+        preview = df.get()[[column]].head().copy()  # Only the shown rows are materialized
+        if input.transformation() == "hashing":
+            return pd.concat([preview, hash_encode(preview[column])], axis=1)
+        transformed = transformed_column().head()
+        if input.transformation() == "binning" and is_numeric(preview[column]):
+            transformed = bin_labels(transformed)
+        preview[column + "_transformed"] = transformed
+        return preview
 
     @output
     @render.plot
+    @instrument
     def plot_output():
-        if df.get() is None or input.column() is None or input.column() not in df.get().columns:
+        if not column_ready() or input.transformation() in ("one_hot", "hashing"):
             return None
-        
-        column_data = df.get()[input.column()].dropna() 
-        is_numeric = np.issubdtype(column_data.dtype, np.number)
-        transformed_data = column_data.copy()
-
-        if input.transformation() == "log" and is_numeric:
-            column_data = column_data[column_data > 0]  
-            transformed_data = np.log1p(column_data)
-        elif input.transformation() == "square" and is_numeric:
-            transformed_data = column_data ** 2
-        elif input.transformation() == "standard" and is_numeric:
-            transformed_data = (column_data - column_data.mean()) / column_data.std()
-        elif input.transformation() == "minmax" and is_numeric:
-            transformed_data = (column_data - column_data.min()) / (column_data.max() - column_data.min())
-        elif input.transformation() == "poly2" and is_numeric:
-            transformed_data = column_data ** 2
-        elif input.transformation() == "poly3" and is_numeric:
-            transformed_data = column_data ** 3
-        elif input.transformation() == "binning" and is_numeric:
-            transformed_data = pd.cut(column_data, bins=5, labels=[1, 2, 3, 4, 5])
 
-        if input.transformation() == "one_hot":
-            return None
+        column_data = df.get()[input.column()].dropna()
+        transformed_data = transformed_column().dropna()
+        if input.transformation() == "log" and is_numeric(column_data):
+            column_data = column_data[column_data > 0]
+        elif input.transformation() == "binning" and is_numeric(column_data):
+            transformed_data = transformed_data + 1  # Bins 1-5
+        elif input.transformation() == "count" and not is_numeric(column_data):
+            column_data = None  # Only the counts: a histogram of every level isn't readable
+
+        import matplotlib.pyplot as plt  # Imported on the first plot, not at startup
 
         fig, ax = plt.subplots()
-        ax.hist(column_data, alpha=0.5, label="Original", bins=20)
+        if column_data is not None:
+            ax.hist(column_data, alpha=0.5, label="Original", bins=20)
         ax.hist(transformed_data, alpha=0.5, label="Transformed", bins=20)
         ax.legend()
         ax.set_title(f"Feature Transformation Impact: {input.transformation().capitalize()}")
         return fig
 
  
-    @session.download(filename="transformed_data.csv")
-    def download_csv():
-        if transformed_df.get() is not None:
-            # Create a temporary CSV file
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".csv") as tmpfile:
-                transformed_df.get().to_csv(tmpfile.name, index=False)
-                return tmpfile.name
+    @session.download(filename=lambda: export_filename("transformed_data", input.export_format()))
+    @instrument
+    async def download_csv():
+        if column_ready() and one_hot_ready():  # Encoded chunk by chunk while it is written
+            data, column, codes = df.get(), input.column(), one_hot_codes()
+            export = iter_export_chunks(one_hot_chunks(data, column, codes), input.export_format(),
+                                        one_hot_schema(data, column, codes))
+        elif column_ready():
+            export = iter_export(transformed_df(), input.export_format())
+        elif df.get() is not None:
+            export = iter_export(df.get(), input.export_format())
+        else:
+            return
+        async for chunk in iterate_in_background(export, name="export"):
+            yield chunk
+
+    @session.download(filename="feature_spec.json")
+    @instrument
+    def download_spec():
+        column = input.column() if column_ready() else None
+        yield json.dumps(FeatureSpec(column, input.transformation()).to_dict(), indent=2)
 
 
 app = App(app_ui, server)
@@ -0,0 +1,124 @@
+import json
+import pandas as pd
+from encoding import category_codes, count_encode, hash_encode, one_hot_chunks, one_hot_schema
+from export import EXPORT_CHUNK_ROWS, iter_export, iter_export_chunks
+from transforms import SCALERS, apply_transform, bin_labels, is_numeric, scale_column, transform_cache
+
+# Transformations offered by feature.py: the transforms.TRANSFORMS kernels plus the categorical encodings
+TRANSFORMATIONS = ["none", "log", "square", "standard", "one_hot", "hashing", "count", "minmax", "poly2", "poly3",
+                   "binning"]
+
+
+# **Pure functions behind feature.py: a frame and a column in, the transformed column or frame out**
+
+def transformed_column(df, column, transformation, dataset_key=None, scaler=None):
+    """The column after `transformation`; binning gives codes 0-4 (see transforms.bin_labels).
+
+    `scaler` is an optional (center, spread) for standard and minmax scaling, e.g. from the running
+    aggregates of an appended dataset. Memoized in transforms.transform_cache when `dataset_key`
+    identifies df's contents.
+    """
+    series = df[column]
+
+    def compute():
+        if scaler is not None and transformation in SCALERS and is_numeric(series):
+            return scale_column(series, *scaler)
+        if transformation == "count":
+            return count_encode(series)
+        return apply_transform(series, transformation)
+
+    if dataset_key is None:
+        return compute()
+    return transform_cache.get_or_compute((dataset_key, column, transformation), compute)
+
+
+def is_one_hot(df, column, transformation):
+    """One-hot only applies to categorical columns."""
+    return transformation == "one_hot" and not is_numeric(df[column])
+
+
+def transform_frame(df, column, transformation, dataset_key=None, scaler=None):
+    """The whole frame with `transformation` applied to `column`; the other columns are shared, not copied.
+
+    Hashing and one-hot replace the column with their indicator columns, the other transformations add
+    a `<column>_transformed` column. One-hot columns are sparse (see encoding.CategoryCodes.sparse_one_hot),
+    so they never take rows x levels memory; iter_transform_chunks() and iter_transform_export() write them
+    out dense, one chunk at a time.
+    """
+    if is_one_hot(df, column, transformation):
+        codes = category_codes(dataset_key, df[column])
+        return pd.concat([df.drop(columns=[column]), codes.sparse_one_hot(df.index)], axis=1)
+    new_df = df.copy(deep=False)
+    if transformation == "one_hot":
+        return new_df  # Numeric column: one-hot doesn't apply
+    if transformation == "hashing":
+        return pd.concat([new_df.drop(columns=[column]), hash_encode(new_df[column])], axis=1)
+    transformed = transformed_column(df, column, transformation, dataset_key, scaler)
+    if transformation == "binning" and is_numeric(new_df[column]):
+        transformed = bin_labels(transformed)
+    new_df[column + "_transformed"] = transformed
+    return new_df
+
+
+def iter_transform_chunks(df, column, transformation, dataset_key=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Yields transform_frame() in row chunks; one-hot columns are expanded (dense) one chunk at a time."""
+    if is_one_hot(df, column, transformation):
+        yield from one_hot_chunks(df, column, category_codes(dataset_key, df[column]), chunk_rows)
+        return
+    frame = transform_frame(df, column, transformation, dataset_key)
+    for start in range(0, max(len(frame), 1), chunk_rows):
+        yield frame.iloc[start:start + chunk_rows]
+
+
+def iter_transform_export(df, column, transformation, fmt="csv", dataset_key=None):
+    """transform_frame() serialized as `fmt` in byte chunks (see export.iter_export)."""
+    if is_one_hot(df, column, transformation):
+        codes = category_codes(dataset_key, df[column])
+        return iter_export_chunks(one_hot_chunks(df, column, codes), fmt, one_hot_schema(df, column, codes))
+    return iter_export(transform_frame(df, column, transformation, dataset_key), fmt)
+
+
+# **Spec**
+
+class FeatureSpec:
+    """A transformation designed in feature.py, e.g. {"column": "body_mass_g", "transformation": "log"}.
+
+    Like a pipeline.Pipeline spec it is saved as JSON and replayed on other files; a file without the
+    column is passed through unchanged.
+    """
+
+    def __init__(self, column=None, transformation="none"):
+        if transformation not in TRANSFORMATIONS:
+            raise ValueError(f"Unknown transformation: {transformation}")
+        self.column = column
+        self.transformation = transformation
+
+    def applies(self, df):
+        return self.column is not None and self.column in df.columns
+
+    def apply(self, df, dataset_key=None):
+        if not self.applies(df):
+            return df
+        return transform_frame(df, self.column, self.transformation, dataset_key)
+
+    def iter_export(self, df, fmt="csv", dataset_key=None):
+        """apply(df) serialized as `fmt` in byte chunks, with one-hot expanded while it is written."""
+        if not self.applies(df):
+            return iter_export(df, fmt)
+        return iter_transform_export(df, self.column, self.transformation, fmt, dataset_key)
+
+    def to_dict(self):
+        return {"column": self.column, "transformation": self.transformation}
+
+    @classmethod
+    def from_dict(cls, spec):
+        return cls(spec.get("column"), spec.get("transformation", "none"))
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
@@ -0,0 +1,260 @@
+import codecs
+import csv
+import functools
+import json
+import os
+import time
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+
+# Extensions offered by the upload widgets; the format itself is sniffed from the content
+UPLOAD_EXTENSIONS = [".csv", ".tsv", ".txt", ".json", ".jsonl", ".ndjson", ".xlsx", ".xls", ".parquet", ".feather",
+                     ".arrow", ".rds", ".gz", ".zst"]
+SNIFF_BYTES = 64 * 1024  # Head of the (decompressed) file used to detect the format
+DELIMITERS = [",", "\t", ";", "|"]
+COMPRESSION_MAGIC = {b"\x1f\x8b": "gzip", b"\x28\xb5\x2f\xfd": "zstd"}
+BINARY_MAGIC = {b"PAR1": "parquet", b"ARROW1": "feather", b"FEA1": "feather", b"PK\x03\x04": "excel",
+                b"\xd0\xcf\x11\xe0": "excel"}
+RDS_MAGIC = (b"X\n", b"A\n", b"B\n")  # R serialization headers (XDR, ASCII, native)
+ARROW_ENCODINGS = {"csv": ("utf-8", "utf-8-sig", "latin-1"), "jsonl": ("utf-8",)}  # Others go to pandas
+COMPRESSED_SUFFIXES = ("gz", "zst")  # Skipped when the extension is used as a hint
+
+# kind: "csv" (any delimited text), "json", "jsonl", "parquet", "feather", "excel" or "rds".
+# compression: None, "gzip" or "zstd"; delimiter and encoding only apply to text formats.
+FileFormat = namedtuple("FileFormat", ["kind", "compression", "delimiter", "encoding"])
+
+
+def _extension(file_path):
+    """The file's extension, skipping a compression suffix: "data.tsv.gz" -> "tsv"."""
+    parts = os.path.basename(str(file_path)).lower().split(".")[1:]
+    if parts and parts[-1] in COMPRESSED_SUFFIXES:
+        parts.pop()
+    return parts[-1] if parts else ""
+
+
+def open_stream(file_path, compression=None):
+    """Opens a file for reading, decompressing gzip or zstd on the fly (Arrow codecs, no extra packages)."""
+    import pyarrow as pa
+
+    return pa.input_stream(str(file_path), compression=compression)
+
+
+def _detect_encoding(head):
+    if head.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if head.startswith((codecs.BOM_UTF16_LE, codecs.BOM_UTF16_BE)):
+        return "utf-16"
+    try:
+        head.decode("utf-8")
+    except UnicodeDecodeError as e:
+        if e.start < len(head) - 3:  # Not just a character cut in half at the end of the sample
+            return "latin-1"
+    return "utf-8"
+
+
+def _detect_delimiter(lines, default):
+    """The candidate that splits the sample lines into the same number (> 1) of fields; ties go to `default`."""
+    best, best_fields = default, 1
+    for delimiter in sorted(DELIMITERS, key=lambda d: d != default):
+        widths = {len(row) for row in csv.reader(lines, delimiter=delimiter) if row}
+        if len(widths) == 1 and (fields := widths.pop()) > best_fields:
+            best, best_fields = delimiter, fields
+    return best
+
+
+def _text_kind(text, ext):
+    stripped = text.lstrip()
+    if stripped.startswith("["):
+        return "json"
+    if stripped.startswith("{"):
+        lines = [line for line in stripped.splitlines() if line.strip()]
+        if ext in ("jsonl", "ndjson"):
+            return "jsonl"
+        try:
+            json.loads(lines[0])
+        except ValueError:
+            return "json"  # An object spread over several lines
+        return "jsonl" if len(lines) > 1 and lines[1].lstrip().startswith("{") else "json"
+    return "csv"
+
+
+@functools.lru_cache(maxsize=256)
+def _sniff(file_path, size, mtime_ns):
+    ext = _extension(file_path)
+    with open(file_path, "rb") as f:
+        head = f.read(SNIFF_BYTES)
+    compression = next((name for magic, name in COMPRESSION_MAGIC.items() if head.startswith(magic)), None)
+    if compression is None:
+        kind = next((kind for magic, kind in BINARY_MAGIC.items() if head.startswith(magic)), None)
+        if kind is not None:
+            return FileFormat(kind, None, None, None)
+    else:
+        with open_stream(file_path, compression) as stream:
+            head = stream.read(SNIFF_BYTES)
+    if head.startswith(RDS_MAGIC):
+        return FileFormat("rds", compression, None, None)
+    encoding = _detect_encoding(head)
+    text = head.decode(encoding, errors="ignore")
+    kind = _text_kind(text, ext)
+    if kind != "csv":
+        return FileFormat(kind, compression, None, encoding)
+    lines = text.splitlines()
+    if len(head) == SNIFF_BYTES and len(lines) > 1:
+        lines = lines[:-1]  # The last line may be cut off
+    delimiter = _detect_delimiter(lines[:100], "\t" if ext in ("tsv", "txt") else ",")
+    return FileFormat("csv", compression, delimiter, encoding)
+
+
+def sniff_format(file_path):
+    """Detects format, compression, delimiter and encoding from the file's first bytes.
+
+    The extension only breaks ties (a .tsv whose sample has no delimiter at all is still read as
+    tab-separated). Results are cached per path, size and modification time.
+    """
+    stat = os.stat(file_path)
+    return _sniff(str(file_path), stat.st_size, stat.st_mtime_ns)
+
+
+def _arrow_to_pandas(table):
+    import pyarrow.types as pat
+
+    nullable_bools = [field.name for field, column in zip(table.schema, table.columns)
+                      if pat.is_boolean(field.type) and column.null_count]
+    df = table.to_pandas(split_blocks=True, self_destruct=True)  # Frees Arrow buffers as columns are converted
+    for name in nullable_bools:
+        df[name] = df[name].fillna(np.nan)  # Missing as NaN, not None, in the object column pandas' readers give
+    return df
+
+
+def _temporal_columns(schema):
+    import pyarrow.types as pat
+
+    return [field.name for field in schema if pat.is_temporal(field.type)]
+
+
+def _head(file_path, fmt):
+    """The first SNIFF_BYTES of the decompressed file, cut after the last complete line."""
+    with open_stream(file_path, fmt.compression) as stream:
+        head = stream.read(SNIFF_BYTES)
+    return head if len(head) < SNIFF_BYTES else head[:head.rfind(b"\n") + 1]
+
+
+def _read_strings_as_text(read, file_path, fmt):
+    """Runs read(source, string_columns) so that columns Arrow would parse as dates stay strings, as with
+    the pandas readers. They are found in the head first; the whole file is read again only if a column
+    looks like dates further down.
+    """
+    import pyarrow as pa
+
+    head = read(pa.py_buffer(_head(file_path, fmt)), [])
+    temporal = _temporal_columns(head.schema)
+    with open_stream(file_path, fmt.compression) as stream:
+        table = read(stream, temporal)
+    if more := _temporal_columns(table.schema):
+        temporal += more
+        with open_stream(file_path, fmt.compression) as stream:
+            table = read(stream, temporal)
+    if not temporal:
+        return table
+    names = table.column_names  # The JSON reader puts typed fields first; restore the file's order
+    order = [name for name in head.column_names if name in names]
+    return table.select(order + [name for name in names if name not in order])
+
+
+def _read_csv_arrow(file_path, fmt):
+    """Multi-threaded Arrow CSV reader."""
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+
+    def read(source, string_columns):
+        return pacsv.read_csv(
+            source,
+            read_options=pacsv.ReadOptions(use_threads=True, encoding=fmt.encoding),
+            parse_options=pacsv.ParseOptions(delimiter=fmt.delimiter),
+            convert_options=pacsv.ConvertOptions(strings_can_be_null=True,
+                                                 column_types={name: pa.string() for name in string_columns}),
+        )
+
+    return _read_strings_as_text(read, file_path, fmt)
+
+
+def _read_jsonl_arrow(file_path, fmt):
+    """Multi-threaded Arrow JSON-lines reader."""
+    import pyarrow as pa
+    import pyarrow.json as pajson
+
+    def read(source, string_columns):
+        schema = pa.schema([(name, pa.string()) for name in string_columns]) if string_columns else None
+        return pajson.read_json(
+            source,
+            read_options=pajson.ReadOptions(use_threads=True),
+            parse_options=pajson.ParseOptions(explicit_schema=schema, unexpected_field_behavior="infer"),
+        )
+
+    return _read_strings_as_text(read, file_path, fmt)
+
+
+def _usable_names(table):
+    """Arrow keeps duplicate and empty header names; pandas renames them ("a.1", "Unnamed: 0")."""
+    names = table.column_names
+    return len(set(names)) == len(names) and all(names)
+
+
+def _read_pandas(file_path, fmt):
+    """Single-threaded pandas readers: Excel, JSON documents, RDS, and the fallback for text Arrow rejects."""
+    if fmt.kind == "excel":
+        return pd.read_excel(file_path)  # pandas picks openpyxl or xlrd from the content too
+    if fmt.kind == "rds":
+        import pyreadr
+
+        if fmt.compression == "zstd":
+            raise ValueError("zstd-compressed RDS files are not supported; save with compress = \"gzip\"")
+        return pyreadr.read_r(str(file_path))[None]  # Extract dataframe from RDS object
+    with open_stream(file_path, fmt.compression) as stream:  # Arrow decompresses, so zstd needs no extra package
+        if fmt.kind == "csv":
+            return pd.read_csv(stream, sep=fmt.delimiter, encoding=fmt.encoding)
+        return pd.read_json(stream, lines=fmt.kind == "jsonl", encoding=fmt.encoding)
+
+
+def read_file(file_path, timings=None):
+    """Parses a data file of any supported format into a DataFrame.
+
+    The format is sniffed from the content (see sniff_format). Delimited text and JSON lines are
+    parsed by Arrow's multi-threaded readers, Parquet and Feather read with threads too; the result
+    has the dtypes the pandas readers would give. If `timings` is a dict, the seconds spent in each
+    stage are stored in it: "sniff", "parse" (reading, decompressing and parsing) and "convert"
+    (Arrow to pandas).
+    """
+    timings = {} if timings is None else timings
+    start = time.perf_counter()
+    fmt = sniff_format(file_path)
+    timings["sniff"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    table = None
+    if fmt.kind == "parquet":
+        import pyarrow.parquet as pq
+
+        table = pq.read_table(str(file_path), use_threads=True)
+    elif fmt.kind == "feather":
+        import pyarrow.feather as feather
+
+        table = feather.read_table(str(file_path), use_threads=True)
+    elif fmt.encoding in ARROW_ENCODINGS.get(fmt.kind, ()):
+        import pyarrow as pa
+
+        try:
+            table = (_read_csv_arrow if fmt.kind == "csv" else _read_jsonl_arrow)(file_path, fmt)
+        except pa.ArrowInvalid:
+            table = None  # Ragged rows, mixed JSON types...: pandas copes or gives a clearer error
+        if table is not None and not _usable_names(table):
+            table = None
+    df = _read_pandas(file_path, fmt) if table is None else None
+    timings["parse"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    if df is None:
+        df = _arrow_to_pandas(table)
+    timings["convert"] = time.perf_counter() - start
+    return df
@@ -0,0 +1,323 @@
+import copy
+import functools
+import hashlib
+import os
+import threading
+import numpy as np
+import pandas as pd
+from correlation import CorrelationResult
+from dataset_profile import TOP_K, DatasetProfile, dtype_class
+from lru import LRU
+from streaming import ColumnStats
+
+APPEND_CACHE_ENTRIES = int(os.environ.get("APPEND_CACHE_ENTRIES", 32))  # Loaded datasets whose aggregates are kept
+VALUE_COUNT_MAX_LEVELS = 10_000  # Non-numeric columns with more levels fall back to a HyperLogLog distinct count
+
+_base_aggregates = LRU(max_entries=APPEND_CACHE_ENTRIES)  # dataset key -> DatasetAggregates of the loaded rows
+
+
+class CoMoments:
+    """Mergeable pairwise-complete co-moments of numeric columns, for Pearson matrices like DataFrame.corr().
+
+    For every pair (i, j) it keeps the number of rows where both are present and the sums of x_i, x_i**2
+    and x_i * x_j over those rows. Values are shifted by a fixed per-column offset (the first batch's
+    means) so that large offsets don't cost precision. Updating with a batch costs O(rows x columns**2).
+    """
+
+    def __init__(self):
+        self.columns = []
+        self.shift = np.zeros(0)
+        self.n = self.sx = self.sxx = self.sxy = np.zeros((0, 0))  # sx[i, j]: sum of x_i where x_j is present too
+
+    def _extend(self, columns, shift):
+        """Adds columns (with zero sums) so that every name in `columns` has a row and column."""
+        new = [col for col in columns if col not in self.columns]
+        if not new:
+            return
+        grow = len(new)
+        for name in ("n", "sx", "sxx", "sxy"):
+            setattr(self, name, np.pad(getattr(self, name), ((0, grow), (0, grow))))
+        self.shift = np.concatenate([self.shift, [shift[columns.index(col)] for col in new]])
+        self.columns = self.columns + new
+
+    def _shift_to(self, shift):
+        """Re-expresses the sums around new per-column offsets."""
+        d = self.shift - shift  # x_new = x_old + d
+        n, sx = self.n, self.sx
+        self.sxy = self.sxy + d[:, None] * sx.T + d[None, :] * sx + np.outer(d, d) * n
+        self.sxx = self.sxx + 2 * d[:, None] * sx + (d ** 2)[:, None] * n
+        self.sx = sx + d[:, None] * n
+        self.shift = shift
+
+    def update(self, df, columns):
+        """Folds the rows of df's `columns` (numeric) into the sums."""
+        block = df[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        present = ~np.isnan(block)
+        counts = present.sum(axis=0)
+        sums = np.where(present, block, 0.0).sum(axis=0)
+        self._extend(columns, np.divide(sums, counts, out=np.zeros(len(columns)), where=counts > 0))
+        order = [self.columns.index(col) for col in columns]
+        x = np.where(present, block - self.shift[order], 0.0)
+        p = present.astype(np.float64)
+        index = np.ix_(order, order)
+        self.n[index] += p.T @ p
+        self.sx[index] += x.T @ p
+        self.sxx[index] += (x * x).T @ p
+        self.sxy[index] += x.T @ x
+        return self
+
+    def copy(self):
+        """An independent copy; its size depends on the columns, not the rows."""
+        other = CoMoments()
+        other.columns, other.shift = list(self.columns), self.shift.copy()
+        other.n, other.sx, other.sxx, other.sxy = self.n.copy(), self.sx.copy(), self.sxx.copy(), self.sxy.copy()
+        return other
+
+    def merge(self, other):
+        other = other.copy()
+        self._extend(other.columns, other.shift)
+        other._extend(self.columns, self.shift)
+        order = [other.columns.index(col) for col in self.columns]
+        other._reorder(order)
+        other._shift_to(self.shift)
+        for name in ("n", "sx", "sxx", "sxy"):
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        return self
+
+    def _reorder(self, order):
+        index = np.ix_(order, order)
+        self.n, self.sx, self.sxx, self.sxy = self.n[index], self.sx[index], self.sxx[index], self.sxy[index]
+        self.shift = self.shift[order]
+        self.columns = [self.columns[i] for i in order]
+
+    def correlation(self, columns):
+        """Pearson matrix of `columns` over pairwise-complete rows (NaN for constant or too-short pairs)."""
+        order = [self.columns.index(col) for col in columns]
+        index = np.ix_(order, order)
+        n, sx, sxx, sxy = self.n[index], self.sx[index], self.sxx[index], self.sxy[index]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cov = sxy - sx * sx.T / n
+            var = sxx - sx ** 2 / n  # var[i, j]: spread of x_i over the rows where x_j is present
+            matrix = cov / np.sqrt(var * var.T)
+        matrix = np.clip(matrix, -1.0, 1.0)
+        diagonal = np.diag(matrix).copy()
+        np.fill_diagonal(matrix, np.where(np.isnan(diagonal), np.nan, 1.0))
+        return pd.DataFrame(matrix, index=columns, columns=columns)
+
+
+class DatasetAggregates:
+    """Mergeable statistics of a dataset: streaming.ColumnStats per column (count, missing, moments, min/max,
+    quantile sketch, HyperLogLog), value counts of the non-numeric columns and CoMoments of the numeric ones.
+
+    Folding in a batch costs time proportional to the batch, not to the rows already seen.
+    """
+
+    def __init__(self):
+        self.rows = 0
+        self.columns = {}  # name -> ColumnStats, in first-seen order
+        self.value_counts = {}  # name -> Series of counts (non-numeric columns with few enough levels)
+        self.comoments = CoMoments()
+
+    def update(self, df):
+        for name in df.columns:
+            if name not in self.columns:
+                self.columns[name] = ColumnStats(name)
+                self.columns[name].missing = self.rows  # Column absent from earlier batches
+            stats = self.columns[name]
+            had_numbers = stats.numeric and stats.count > 0
+            stats.update(df[name])
+            if not stats.numeric:
+                if had_numbers:
+                    self.value_counts[name] = None  # Text arrived after numbers: earlier rows weren't counted
+                self._count_values(name, df[name].value_counts())
+        for name, stats in self.columns.items():
+            if name not in df.columns:
+                stats.missing += len(df)
+        self.rows += len(df)
+        self.comoments.update(df, [name for name in self.numeric_columns if name in df.columns])
+        return self
+
+    def _count_values(self, name, counts):
+        counts = counts[counts > 0]  # Categoricals also count unused categories
+        if name in self.value_counts:
+            if self.value_counts[name] is None:
+                return
+            counts = self.value_counts[name].add(counts, fill_value=0).astype(np.int64)
+        self.value_counts[name] = counts if len(counts) <= VALUE_COUNT_MAX_LEVELS else None
+
+    def merge(self, other):
+        """Combines aggregates of two disjoint parts of a dataset (the rows of `other` after these)."""
+        for name, stats in other.columns.items():
+            if name not in self.columns:
+                self.columns[name] = ColumnStats(name)
+                self.columns[name].missing = self.rows
+            mine = self.columns[name]
+            counted_here = mine.count == 0 or name in self.value_counts
+            counted_there = stats.count == 0 or name in other.value_counts
+            mine.merge(stats)
+            if mine.numeric:
+                continue
+            if not (counted_here and counted_there):
+                self.value_counts[name] = None  # One side only kept numeric statistics
+            elif name in other.value_counts:
+                if other.value_counts[name] is None:
+                    self.value_counts[name] = None
+                else:
+                    self._count_values(name, other.value_counts[name])
+        for name, stats in self.columns.items():
+            if name not in other.columns:
+                stats.missing += other.rows
+        self.rows += other.rows
+        self.comoments.merge(other.comoments)
+        return self
+
+    @property
+    def numeric_columns(self):
+        return [name for name, stats in self.columns.items() if stats.numeric and stats.count > 0]
+
+
+class AggregateColumnProfile:
+    """Same attributes as dataset_profile.ColumnProfile, read from DatasetAggregates.
+
+    Counts, moments and min/max are exact. Quartiles come from the quantile sketch; distinct counts are
+    exact for non-numeric columns with value counts and HyperLogLog estimates otherwise.
+    """
+
+    def __init__(self, name, dtype, stats, counts=None, top_k=TOP_K):
+        self.name = name
+        self.dtype = str(dtype)
+        self.kind = dtype_class(pd.Series([], dtype=dtype))
+        self.missing = stats.missing
+        self.count = stats.count
+        self.distinct = len(counts) if counts is not None else min(stats.distinct.count(), stats.count)
+        self.mean = self.std = self.min = self.max = np.nan
+        self.quantiles = {0.25: np.nan, 0.5: np.nan, 0.75: np.nan}
+        self.top_values = None
+        if self.kind == "numeric" and stats.numeric and stats.count > 0:
+            self.mean, self.std, self.min, self.max = stats.mean, stats.std(), stats.min, stats.max
+            self.quantiles = dict(zip(self.quantiles, stats.quantiles.quantiles(list(self.quantiles))))
+        elif counts is not None:
+            self.top_values = counts.sort_values(ascending=False, kind="stable").head(top_k)
+
+
+class AggregateProfile(DatasetProfile):
+    """DatasetProfile of an appended dataset, built from its aggregates without a pass over the rows."""
+
+    def __init__(self, aggregates, dtypes, top_k=TOP_K):
+        self.rows = aggregates.rows
+        self.columns = {name: AggregateColumnProfile(name, dtypes[name], stats, aggregates.value_counts.get(name), top_k)
+                        for name, stats in aggregates.columns.items()}
+        self.done = True
+
+
+def _concat_rows(frames):
+    """The frames' rows one after another; categoricals on every side stay categorical over the union of levels."""
+    frames = [frame.copy(deep=False) for frame in frames]
+    names = set(frames[0].columns).intersection(*(frame.columns for frame in frames[1:]))
+    for name in names:
+        dtypes = [frame[name].dtype for frame in frames]
+        if all(isinstance(dtype, pd.CategoricalDtype) for dtype in dtypes) \
+                and not all(dtype.categories.equals(dtypes[0].categories) for dtype in dtypes):
+            levels = functools.reduce(pd.Index.union, [dtype.categories for dtype in dtypes])
+            for frame in frames:
+                frame[name] = frame[name].cat.set_categories(levels)
+    return pd.concat(frames, ignore_index=True)
+
+
+class _Chain:
+    """What the versions of one appended dataset share: the loaded frame and each batch, the running
+    aggregates (updated in place) and the last joined frame. Only ever appended to.
+    """
+
+    def __init__(self, frame, aggregates):
+        self.frames = [frame]
+        self.aggregates = aggregates
+        self.joined = (1, frame)  # (frames joined, frame): the latest full view, extended by later ones
+        self.lock = threading.Lock()
+
+    def frame(self, count):
+        """The first `count` frames as one DataFrame, joined onto the last full view when that one is older."""
+        with self.lock:
+            done, joined = self.joined
+            if done == count:
+                return joined
+            if done > count:  # An older version: not kept, so later views stay one copy
+                return _concat_rows(self.frames[:count])
+            joined = _concat_rows([joined] + self.frames[done:count])
+            self.joined = (count, joined)
+            return joined
+
+
+class AppendableDataset:
+    """One version of a dataset that grows by appended batches.
+
+    append() folds a batch into the dataset's running aggregates in place, at a cost proportional to the
+    batch, and returns the next version with its own key (so caches keyed by dataset never mix versions).
+    A version's profile and co-moments are frozen when it is created; its rows are kept as the list of
+    batch frames and only joined into one DataFrame when `frame` is read.
+    """
+
+    def __init__(self, chain, key, batches=0):
+        self._chain = chain
+        self.key = key
+        self.batches = batches  # Batches appended since the dataset was loaded
+        self.rows = chain.aggregates.rows
+        self.profile = AggregateProfile(chain.aggregates, _concat_rows([f.iloc[:0] for f in chain.frames]).dtypes)
+        self._comoments = chain.aggregates.comoments.copy()
+
+    @property
+    def frame(self):
+        """Every row of this version as one DataFrame (a copy of the batches, made on first use)."""
+        return self._chain.frame(self.batches + 1)
+
+    def correlation_matrix(self, columns):
+        """Exact Pearson CorrelationResult (pairwise complete, like DataFrame.corr()) from the co-moments."""
+        columns = list(columns)
+        return CorrelationResult(matrix=self._comoments.correlation(columns), lower=None, upper=None, n=self.rows,
+                                 approximate=False)
+
+    def scaler(self, column, transformation):
+        """(center, spread) of transforms' standard or minmax scaling for a column, or None for other transformations."""
+        stats = self.profile.columns[column]
+        if transformation == "standard":
+            return stats.mean, stats.std
+        if transformation == "minmax":
+            return stats.min, stats.max - stats.min
+        return None
+
+    def append(self, batch, batch_key=None):
+        """The next version, with batch's rows after these (columns missing on either side are missing values).
+
+        Only the latest version of a dataset can be appended to.
+        """
+        chain = self._chain
+        with chain.lock:
+            if len(chain.frames) != self.batches + 1:
+                raise ValueError("Rows can only be appended to the latest version of a dataset")
+            batch_key = batch_key or pd.util.hash_pandas_object(batch, index=False).sum()
+            chain.aggregates.update(batch)
+            chain.frames.append(batch)
+        key = hashlib.blake2b(f"{self.key}+{batch_key}".encode(), digest_size=16).hexdigest()
+        return AppendableDataset(chain, key, self.batches + 1)
+
+
+def appendable(df, dataset_key):
+    """The first version of an appendable dataset. Its aggregates take one pass over the rows, once per
+    dataset; each call gets its own copy, so sessions appending to the same file don't share batches.
+    """
+    aggregates = _base_aggregates.get(dataset_key) if dataset_key is not None else None
+    if aggregates is None:
+        aggregates = DatasetAggregates().update(df)
+        if dataset_key is not None:
+            _base_aggregates.put(dataset_key, aggregates)
+    return AppendableDataset(_Chain(df, copy.deepcopy(aggregates)), dataset_key)
+
+
+def append_file(dataset, file_path):
+    """Appends a file's rows to an AppendableDataset; raises ValueError if the file can't be loaded."""
+    from shared import dataset_fingerprint, load_dataset
+
+    batch = load_dataset(file_path)
+    if error := batch.attrs.get("load_error"):
+        raise ValueError(error)
+    return dataset.append(batch, dataset_fingerprint(file_path))
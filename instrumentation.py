@@ -0,0 +1,314 @@
+import asyncio
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from shiny import module, reactive, render, ui
+from shiny.types import SilentCancelOutputException, SilentException
+
+INSTRUMENT = os.environ.get("INSTRUMENT", "1") != "0"  # Set INSTRUMENT=0 to leave functions unwrapped
+PERF_PANEL = os.environ.get("PERF_PANEL", "0") == "1"  # Show the Performance panel in the apps
+EVENT_LOG_SIZE = 10_000  # Most recent calls kept for the JSON-lines export
+SIGNATURE_SAMPLE_ROWS = 1_000  # Rows hashed to recognise a recomputed, identical frame
+
+
+def rss_bytes():
+    """Current resident set size (Linux), or the process peak where /proc isn't available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        return peak_rss_bytes()
+
+
+def peak_rss_bytes():
+    """Largest resident set size this process has reached (getrusage; KB on Linux, bytes on macOS)."""
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def nbytes(value):
+    """Approximate size of a value in bytes (shallow for frames), or None when it can't be sized cheaply."""
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=False).sum())
+    if isinstance(value, pd.Series):
+        return int(value.memory_usage(index=False))
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    if isinstance(value, (tuple, list)):
+        sizes = [nbytes(item) for item in value]
+        return sum(size for size in sizes if size is not None) if any(size is not None for size in sizes) else None
+    return None
+
+
+def signature(value):
+    """Cheap content signature of a frame or series (shape, columns and a hash of sampled rows); None otherwise."""
+    if not isinstance(value, (pd.DataFrame, pd.Series)) or len(value) == 0:
+        return None
+    step = max(len(value) // SIGNATURE_SAMPLE_ROWS, 1)
+    sample = value.iloc[::step]
+    try:
+        hashed = int(pd.util.hash_pandas_object(sample, index=False).sum())
+    except TypeError:  # Unhashable cells (lists, dicts)
+        return None
+    columns = tuple(map(str, value.columns)) if isinstance(value, pd.DataFrame) else (str(value.name),)
+    return (value.shape, columns, hashed)
+
+
+class Recorder:
+    """Per-function counters for instrumented reactive code, shared by every session in this process."""
+
+    def __init__(self, event_log_size=EVENT_LOG_SIZE):
+        self._lock = threading.Lock()
+        self._stats = {}
+        self.events = deque(maxlen=event_log_size)
+
+    def _entry(self, name):
+        if name not in self._stats:
+            self._stats[name] = {
+                "runs": 0, "invalidations": 0, "errors": 0, "redundant_runs": 0,
+                "total_seconds": 0.0, "max_seconds": 0.0, "last_seconds": 0.0,
+                "input_bytes": None, "output_bytes": None, "memory_delta_bytes": 0, "signature": None,
+            }
+        return self._stats[name]
+
+    def invalidated(self, name):
+        with self._lock:
+            self._entry(name)["invalidations"] += 1
+
+    def record(self, name, seconds, input_bytes=None, output=None, memory_delta=0, error=False, output_bytes=None):
+        output_signature = signature(output)
+        if output_bytes is None:
+            output_bytes = nbytes(output)
+        with self._lock:
+            entry = self._entry(name)
+            entry["runs"] += 1
+            entry["errors"] += int(error)
+            entry["total_seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds)
+            entry["last_seconds"] = seconds
+            entry["input_bytes"] = input_bytes
+            entry["output_bytes"] = output_bytes
+            entry["memory_delta_bytes"] = memory_delta
+            if output_signature is not None and output_signature == entry["signature"]:
+                entry["redundant_runs"] += 1  # Recomputed the same result it already had
+            entry["signature"] = output_signature
+            self.events.append({
+                "time": time.time(), "name": name, "seconds": seconds, "input_bytes": input_bytes,
+                "output_bytes": output_bytes, "memory_delta_bytes": memory_delta, "error": error,
+            })
+
+    def snapshot(self):
+        """Returns one row per instrumented function; `same_output_as` lists functions that produced an identical frame."""
+        with self._lock:
+            stats = {name: dict(entry) for name, entry in self._stats.items()}
+        by_signature = {}
+        for name, entry in stats.items():
+            if entry["signature"] is not None:
+                by_signature.setdefault(entry["signature"], []).append(name)
+        rows = []
+        for name, entry in sorted(stats.items(), key=lambda item: -item[1]["total_seconds"]):
+            twins = [other for other in by_signature.get(entry.pop("signature"), []) if other != name]
+            runs = entry["runs"]
+            rows.append({
+                "name": name, **entry,
+                "mean_seconds": entry["total_seconds"] / runs if runs else 0.0,
+                "same_output_as": ", ".join(twins),
+            })
+        return pd.DataFrame(rows)
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+            self.events.clear()
+
+
+recorder = Recorder()
+
+
+def _input_bytes(args, kwargs):
+    sizes = [nbytes(value) for value in (*args, *kwargs.values())]
+    sizes = [size for size in sizes if size is not None]
+    return sum(sizes) if sizes else None
+
+
+def _is_error(exc):
+    """Shiny's silent exceptions (req(), in-progress tasks) and cancellations are control flow, not errors."""
+    return exc is not None and not isinstance(
+        exc, (SilentException, SilentCancelOutputException, asyncio.CancelledError, GeneratorExit))
+
+
+class _Call:
+    """Times one call and records it on exit; the wrapper stores the result (or streamed size) on it."""
+
+    def __init__(self, label, args, kwargs):
+        self.label, self.args, self.kwargs = label, args, kwargs
+        self.result = self.output_bytes = None
+
+    def __enter__(self):
+        try:  # Count the next invalidation of the reactive context this call runs in
+            reactive.get_current_context().on_invalidate(lambda: recorder.invalidated(self.label))
+        except RuntimeError:
+            pass
+        self.start, self.rss = time.perf_counter(), rss_bytes()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        recorder.record(self.label, time.perf_counter() - self.start, _input_bytes(self.args, self.kwargs),
+                        self.result, rss_bytes() - self.rss, _is_error(exc), self.output_bytes)
+        return False
+
+
+def instrument(fn=None, *, name=None):
+    """Records runs, invalidations, time, input/output sizes and RSS change of a reactive calc, render or effect.
+
+    Apply it below the Shiny decorator (@reactive.calc / @render.* / @reactive.effect) so Shiny sees the
+    wrapper; the wrapper keeps the function's name, which render functions use as their output id.
+    Works for plain, async and async-generator functions.
+    """
+    if fn is None:
+        return lambda fn: instrument(fn, name=name)
+    if not INSTRUMENT:
+        return fn
+    label = name or f"{Path(fn.__code__.co_filename).stem}.{fn.__name__}"
+
+    if inspect.isasyncgenfunction(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with _Call(label, args, kwargs) as call:
+                call.output_bytes = 0
+                async for chunk in fn(*args, **kwargs):
+                    call.output_bytes += nbytes(chunk) or 0
+                    yield chunk
+    elif inspect.iscoroutinefunction(fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            with _Call(label, args, kwargs) as call:
+                call.result = await fn(*args, **kwargs)
+                return call.result
+    else:
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with _Call(label, args, kwargs) as call:
+                call.result = fn(*args, **kwargs)
+                return call.result
+    return wrapper
+
+
+# **Exports**
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def prometheus_text():
+    """Returns the counters (plus job executor and dataset cache metrics) in Prometheus text exposition format."""
+    from jobs import job_stats
+    from shared import cache_stats
+
+    metrics = [
+        ("reactive_runs_total", "counter", "Executions of an instrumented function", "runs"),
+        ("reactive_invalidations_total", "counter", "Invalidations of an instrumented reactive", "invalidations"),
+        ("reactive_redundant_runs_total", "counter", "Runs that recomputed an identical frame", "redundant_runs"),
+        ("reactive_errors_total", "counter", "Runs that raised an error", "errors"),
+        ("reactive_seconds_total", "counter", "Total execution time", "total_seconds"),
+        ("reactive_seconds_max", "gauge", "Slowest execution", "max_seconds"),
+        ("reactive_output_bytes", "gauge", "Size of the last output", "output_bytes"),
+        ("reactive_memory_delta_bytes", "gauge", "RSS change during the last run", "memory_delta_bytes"),
+    ]
+    stats = recorder.snapshot()
+    lines = []
+    for metric, kind, help_text, column in metrics:
+        lines += [f"# HELP {metric} {help_text}", f"# TYPE {metric} {kind}"]
+        for row in stats.to_dict("records"):
+            if row[column] is not None and not pd.isna(row[column]):
+                lines.append(f'{metric}{{name="{_escape(row["name"])}"}} {row[column]}')
+    jobs = job_stats()
+    lines += ["# HELP job_queue_depth Background jobs waiting for a worker", "# TYPE job_queue_depth gauge",
+              f"job_queue_depth {jobs['queue_depth']}",
+              "# HELP job_running Background jobs currently running", "# TYPE job_running gauge",
+              f"job_running {jobs['running']}"]
+    lines += ["# HELP job_run_seconds Background job run time percentiles", "# TYPE job_run_seconds gauge"]
+    for job, latency in jobs["latency"].items():
+        for quantile, key in [("0.5", "run_p50"), ("0.95", "run_p95")]:
+            lines.append(f'job_run_seconds{{job="{_escape(job)}",quantile="{quantile}"}} {latency[key]}')
+    cache = cache_stats()
+    lines += ["# HELP dataset_cache_events_total Dataset cache lookups by outcome",
+              "# TYPE dataset_cache_events_total counter"]
+    for outcome in ["hits", "disk_hits", "misses", "evictions"]:
+        if outcome in cache:
+            lines.append(f'dataset_cache_events_total{{outcome="{outcome}"}} {cache[outcome]}')
+    return "\n".join(lines) + "\n"
+
+
+def json_lines(events=True):
+    """Returns the recent call log (events=True) or the per-function summary as JSON lines."""
+    if events:
+        records = list(recorder.events)
+    else:
+        records = recorder.snapshot().to_dict("records")
+    return "".join(json.dumps(record, default=str) + "\n" for record in records)
+
+
+# **Shiny module: perf_panel_ui("id") in the UI, perf_panel_server("id") in the server (shown when PERF_PANEL=1)**
+
+@module.ui
+def perf_panel_ui():
+    return ui.div(
+        ui.output_text_verbatim("summary"),
+        ui.output_data_frame("stats"),
+        ui.layout_columns(
+            ui.download_button("prometheus", "Export Prometheus text"),
+            ui.download_button("events", "Export call log (JSON lines)"),
+            ui.input_action_button("reset", "Reset counters"),
+        ),
+    )
+
+
+@module.server
+def perf_panel_server(input, output, session, refresh_seconds=2):
+    from jobs import job_stats
+    from shared import cache_stats
+
+    @reactive.effect
+    @reactive.event(input.reset)
+    def reset():
+        recorder.reset()
+
+    @render.text
+    def summary():
+        reactive.invalidate_later(refresh_seconds)
+        input.reset()
+        jobs, cache = job_stats(), cache_stats()
+        return (f"Background jobs: {jobs['queue_depth']} queued, {jobs['running']} running, "
+                f"{jobs.get('completed', 0)} completed, {jobs.get('cancelled', 0)} cancelled\n"
+                f"Dataset cache: {cache}")
+
+    @render.data_frame
+    def stats():
+        reactive.invalidate_later(refresh_seconds)
+        input.reset()
+        table = recorder.snapshot()
+        if len(table) > 0:
+            seconds = ["total_seconds", "max_seconds", "last_seconds", "mean_seconds"]
+            table[seconds] = table[seconds].round(4)
+        return render.DataGrid(table, filters=True, selection_mode="none")
+
+    @render.download(filename="metrics.prom")
+    def prometheus():
+        yield prometheus_text()
+
+    @render.download(filename="reactive_events.jsonl")
+    def events():
+        yield json_lines()
@@ -0,0 +1,120 @@
+import asyncio
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", min(4, os.cpu_count() or 1)))
+ANALYSIS_WORKERS = int(os.environ.get("ANALYSIS_WORKERS", min(2, os.cpu_count() or 1)))  # See run_analysis_in_background
+LATENCY_WINDOW = 200  # Recent jobs per name kept for latency percentiles
+
+
+class JobMetrics:
+    """Queue depth, outcome counts and recent wait/run latencies of background jobs."""
+
+    def __init__(self, window=LATENCY_WINDOW):
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.counts = defaultdict(int)  # submitted / started / finished / completed / failed / cancelled
+        self._latencies = defaultdict(lambda: deque(maxlen=window))  # name -> (wait seconds, run seconds)
+
+    def count(self, outcome, queued=0, running=0):
+        with self._lock:
+            self.counts[outcome] += 1
+            self.queued += queued
+            self.running += running
+
+    def record(self, name, wait, run):
+        with self._lock:
+            self._latencies[name].append((wait, run))
+
+    def snapshot(self):
+        """Returns current queue depth, counters and p50/p95 latencies (seconds) per job name."""
+        with self._lock:
+            latencies = {}
+            for name, samples in self._latencies.items():
+                wait, run = np.array(samples).T
+                latencies[name] = {
+                    "jobs": len(samples),
+                    "wait_p50": float(np.median(wait)), "wait_p95": float(np.percentile(wait, 95)),
+                    "run_p50": float(np.median(run)), "run_p95": float(np.percentile(run, 95)),
+                }
+            return {"queue_depth": self.queued, "running": self.running, **self.counts, "latency": latencies}
+
+
+class JobExecutor:
+    """Runs blocking functions on a thread pool so the Shiny event loop keeps serving other sessions.
+
+    NumPy, pandas and the Arrow/Excel parsers release the GIL for their heavy loops, so threads
+    give real parallelism here without pickling frames to another process. Cancelling the awaiting
+    task drops a job that hasn't started; a job that is already running finishes in its thread and
+    its result is discarded.
+    """
+
+    def __init__(self, workers=JOB_WORKERS, prefix="job", metrics=None):
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix=prefix)
+        self.metrics = metrics if metrics is not None else JobMetrics()
+
+    async def run(self, fn, *args, name=None, **kwargs):
+        name = name or getattr(fn, "__name__", "job")
+        metrics = self.metrics
+        submitted = time.perf_counter()
+
+        def call():
+            started = time.perf_counter()
+            metrics.count("started", queued=-1, running=1)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                metrics.count("finished", running=-1)
+                metrics.record(name, started - submitted, time.perf_counter() - started)
+
+        metrics.count("submitted", queued=1)
+        future = self._pool.submit(call)
+        try:
+            result = await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            if future.cancel():  # Never started
+                metrics.count("cancelled", queued=-1)
+            else:
+                metrics.count("cancelled")
+            raise
+        except Exception:
+            metrics.count("failed")
+            raise
+        metrics.count("completed")
+        return result
+
+
+executor = JobExecutor()  # Shared by every session in this process
+analysis_executor = JobExecutor(ANALYSIS_WORKERS, prefix="analysis", metrics=executor.metrics)
+
+
+async def run_in_background(fn, *args, name=None, **kwargs):
+    """Awaits fn(*args, **kwargs) on the shared job executor."""
+    return await executor.run(fn, *args, name=name, **kwargs)
+
+
+async def run_analysis_in_background(fn, *args, name=None, **kwargs):
+    """Like run_in_background(), on a separate pool for long statistics (trendlines, correlation matrices).
+
+    A running job can't be stopped, so one whose input was superseded keeps its thread until it finishes;
+    on this pool it can only delay other analyses, never the loads and downloads on the shared executor.
+    """
+    return await analysis_executor.run(fn, *args, name=name, **kwargs)
+
+
+async def iterate_in_background(iterable, name=None):
+    """Async iterator over a blocking iterable; each item is produced on the shared job executor."""
+    iterator = iter(iterable)
+    done = object()
+    while (item := await executor.run(next, iterator, done, name=name or "iterate")) is not done:
+        yield item
+
+
+def job_stats():
+    """Returns the queue depth, counters and latencies of both executors (they share one JobMetrics)."""
+    return executor.metrics.snapshot()
@@ -0,0 +1,81 @@
+import threading
+from collections import OrderedDict
+
+
+class LRU:
+    """Thread-safe least-recently-used cache, bounded by entry count, bytes or both.
+
+    The in-process caches (datasets, pipeline steps, transforms, profiles, row orders, correlations,
+    detections) are all instances of this. `sizeof(value)` gives an entry's bytes when put() isn't
+    told; a value larger than the whole byte budget is not kept.
+    """
+
+    def __init__(self, max_entries=None, max_bytes=None, sizeof=None):
+        self.max_entries, self.max_bytes = max_entries, max_bytes
+        self.sizeof = sizeof
+        self._items = OrderedDict()  # key -> (value, nbytes), most recently used last
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """The value for a key (now the most recently used), or None."""
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value, nbytes=None):
+        """Stores a value, replacing any under the same key, and evicts the least recently used entries."""
+        if nbytes is None:
+            nbytes = int(self.sizeof(value)) if self.sizeof is not None else 0
+        with self._lock:
+            if self.max_bytes is not None and nbytes > self.max_bytes:
+                return
+            if key in self._items:
+                self._bytes -= self._items.pop(key)[1]
+            self._items[key] = (value, nbytes)
+            self._bytes += nbytes
+            while len(self._items) > 1 and (
+                (self.max_entries is not None and len(self._items) > self.max_entries)
+                or (self.max_bytes is not None and self._bytes > self.max_bytes)
+            ):
+                _, (_, evicted_bytes) = self._items.popitem(last=False)
+                self._bytes -= evicted_bytes
+                self.evictions += 1
+
+    def get_or_compute(self, key, compute):
+        """The cached value for a key, or compute()'s result, which is then cached (computed outside the lock)."""
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+    def __len__(self):
+        return len(self._items)
+
+    @property
+    def nbytes(self):
+        return self._bytes
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Hit, miss and eviction counters and the current size."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "entries": len(self._items), "bytes": self._bytes, "max_bytes": self.max_bytes}
@@ -0,0 +1,137 @@
+import os
+import numpy as np
+import pandas as pd
+from column_stats import column_statistics
+from lru import LRU
+
+OUTLIER_RULES = {"iqr": "IQR fences", "zscore": "Z-score", "mad": "Robust z-score (median/MAD)"}
+DEFAULT_FACTORS = {"iqr": 1.5, "zscore": 3.0, "mad": 3.5}  # Tukey's fences; 3 sigma; Iglewicz-Hoaglin
+LEVERAGE_SOLVERS = {"auto": "Automatic", "qr": "Exact (thin QR)", "sketch": "Randomized sketch (large data)"}
+MAD_SCALE = 1.4826  # MAD x this estimates the standard deviation of normal data
+SKETCH_MIN_ROWS = 1_000_000  # "auto" sketches leverage from this many complete rows
+SKETCH_MIN_SIZE = 8_192  # Rows in the CountSketch (more for many regressors)
+LEVERAGE_BLOCK_ROWS = 262_144  # Rows per block when projecting onto R⁻¹
+DETECTION_CACHE_MAX_BYTES = int(os.environ.get("DETECTION_CACHE_MAX_BYTES", 512 * 1024**2))
+
+_statistics_cache = LRU(max_entries=64)  # (input fingerprint, columns) -> statistics for every rule
+_detection_cache = LRU(max_bytes=DETECTION_CACHE_MAX_BYTES)  # (input fingerprint, columns, rule...) -> flags/scores
+
+
+# **Outlier flags: per-column fences from one pass of statistics, then one vectorized comparison**
+
+def detection_statistics(x, workers=None):
+    """Per-column statistics behind every rule (quartiles, mean, std, median, MAD), computed together."""
+    return column_statistics(x, ["q1", "q3", "mean", "std", "median", "mad"], workers)
+
+
+def outlier_fences(stats, rule="iqr", factor=None):
+    """Returns per-column (lower, upper) bounds; values outside them are outliers under `rule`."""
+    factor = DEFAULT_FACTORS[rule] if factor is None else factor
+    if rule == "iqr":
+        iqr = stats["q3"] - stats["q1"]
+        return stats["q1"] - factor * iqr, stats["q3"] + factor * iqr
+    if rule == "zscore":
+        return stats["mean"] - factor * stats["std"], stats["mean"] + factor * stats["std"]
+    if rule == "mad":
+        spread = MAD_SCALE * stats["mad"]
+        return stats["median"] - factor * spread, stats["median"] + factor * spread
+    raise ValueError(f"Unknown outlier rule: {rule}")
+
+
+class OutlierFlags:
+    """Cell-level outlier mask of a numeric frame, the rows containing any outlier, and the fences used."""
+
+    def __init__(self, x, lower, upper):
+        self.lower, self.upper = lower, upper
+        self.mask = x.lt(lower, axis=1) | x.gt(upper, axis=1)
+        self.rows = self.mask.to_numpy().any(axis=1)
+        self._replacements = {}
+
+    @property
+    def nbytes(self):
+        return int(self.mask.memory_usage(index=False).sum()) + self.rows.nbytes
+
+    def replacement(self, x, method):
+        """Mean or median of each column's non-outlier values, memoized per method."""
+        if method not in self._replacements:
+            inliers = x.where(~self.mask)
+            self._replacements[method] = inliers.mean() if method == "mean" else inliers.median()
+        return self._replacements[method]
+
+
+def outlier_flags(x, rule="iqr", factor=None, workers=None):
+    """Flags every numeric column of x under `rule` (iqr, zscore or mad)."""
+    return OutlierFlags(x, *outlier_fences(detection_statistics(x, workers), rule, factor))
+
+
+def cached_outlier_flags(x, input_key=None, rule="iqr", factor=None, workers=None):
+    """outlier_flags() memoized on the fingerprint of the frame x was taken from; the treatment isn't part
+    of the key, so switching between remove, clip and replace reuses the detection."""
+    if input_key is None:
+        return outlier_flags(x, rule, factor, workers)
+    columns = tuple(map(str, x.columns))
+    key = (input_key, columns, rule, factor)
+    flags = _detection_cache.get(key)
+    if flags is None:
+        stats = _statistics_cache.get((input_key, columns))
+        if stats is None:
+            stats = detection_statistics(x, workers)  # Shared by all three rules
+            _statistics_cache.put((input_key, columns), stats)
+        flags = OutlierFlags(x, *outlier_fences(stats, rule, factor))
+        _detection_cache.put(key, flags, flags.nbytes)
+    return flags
+
+
+# **Leverage: hat-matrix diagonals ||x_i R⁻¹||² from an exact or sketched R factor**
+
+def _sketched_r(design, size, seed=0):
+    """R factor of a CountSketch (each row added, with a random sign, to one of `size` buckets) of design."""
+    rng = np.random.default_rng(seed)
+    buckets = rng.integers(0, size, len(design))
+    signs = rng.choice([-1.0, 1.0], len(design))
+    sketch = np.column_stack([np.bincount(buckets, weights=design[:, j] * signs, minlength=size)
+                              for j in range(design.shape[1])])
+    return np.linalg.qr(sketch, mode="r")
+
+
+def leverage_scores(x, solver="auto", seed=0):
+    """Returns hat-matrix diagonals for regressors x (with intercept). Rows with NaN get 0.
+
+    "qr" takes R from a thin QR of the design (exact). "sketch" takes it from a QR of a
+    CountSketch of the rows: one O(n·p) pass plus a QR of a small matrix, with scores within a few
+    percent of exact (Drineas et al., 2012). "auto" sketches from SKETCH_MIN_ROWS rows.
+    Either way the scores are ||x_i R⁻¹||², computed in row blocks.
+    """
+    complete = x.notna().all(axis=1).to_numpy()
+    scores = np.zeros(len(x))
+    n, p = int(complete.sum()), x.shape[1] + 1
+    if n <= p:
+        return scores
+    design = np.column_stack([np.ones(n), x.to_numpy(dtype=np.float64)[complete]])
+    if solver == "auto":
+        solver = "sketch" if n >= SKETCH_MIN_ROWS else "qr"
+    if solver == "qr":
+        r = np.linalg.qr(design, mode="r")
+    elif solver == "sketch":
+        r = _sketched_r(design, min(n, max(SKETCH_MIN_SIZE, 4 * p * p)), seed)
+    else:
+        raise ValueError(f"Unknown leverage solver: {solver}")
+    r_inv = np.linalg.pinv(r)  # Pseudo-inverse, so collinear regressors don't blow up
+    values = np.empty(n)
+    for start in range(0, n, LEVERAGE_BLOCK_ROWS):
+        projected = design[start:start + LEVERAGE_BLOCK_ROWS] @ r_inv
+        values[start:start + len(projected)] = np.einsum("ij,ij->i", projected, projected)
+    scores[complete] = values
+    return scores
+
+
+def cached_leverage_scores(x, input_key=None, solver="auto"):
+    """leverage_scores() memoized on the input fingerprint, regressors and solver."""
+    if input_key is None:
+        return leverage_scores(x, solver)
+    key = (input_key, tuple(map(str, x.columns)), "leverage", solver)
+    scores = _detection_cache.get(key)
+    if scores is None:
+        scores = leverage_scores(x, solver)
+        _detection_cache.put(key, scores, scores.nbytes)
+    return scores
@@ -0,0 +1,193 @@
+import operator
+import re
+import numpy as np
+import pandas as pd
+from shiny import module, reactive, render, req, ui
+from instrumentation import instrument
+from lru import LRU
+
+GRID_MAX_CELLS = 5_000  # Most cells sent to the browser per page (rows shrink for wide tables)
+PAGE_SIZES = ["25", "50", "100", "250"]
+ORDER_CACHE_ENTRIES = 32
+
+_COMPARISON = re.compile(r"^\s*(>=|<=|!=|>|<|=)\s*(.+?)\s*$")
+_OPERATORS = {">=": operator.ge, "<=": operator.le, "!=": operator.ne, ">": operator.gt, "<": operator.lt,
+              "=": operator.eq}
+
+
+# **Server-side row order: filter and sort once per (dataset, settings), then slice pages out of it**
+
+def filter_mask(series, text):
+    """Rows matching `text`: a comparison like ">= 3" or a number for numeric columns, else a case-insensitive substring."""
+    if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+        match = _COMPARISON.match(text)
+        op, value = match.groups() if match else ("=", text)
+        try:
+            value = float(value)
+        except ValueError:
+            return np.zeros(len(series), dtype=bool)
+        with np.errstate(invalid="ignore"):
+            return _OPERATORS[op](series.to_numpy(dtype=np.float64, na_value=np.nan), value)
+    matches = series.astype("string").str.contains(text, case=False, regex=False)
+    return matches.to_numpy(dtype=bool, na_value=False)
+
+
+def row_order(df, sort_by=None, descending=False, filter_column=None, filter_text=""):
+    """Returns the row positions to display (filtered, then stably sorted with missing values last), or None for all rows in order."""
+    positions = None
+    if filter_column is not None and filter_text.strip():
+        positions = np.flatnonzero(filter_mask(df[filter_column], filter_text.strip()))
+    if sort_by is None:
+        return positions
+    column = df[sort_by] if positions is None else df[sort_by].iloc[positions]
+    ranked = column.reset_index(drop=True).sort_values(ascending=not descending, kind="stable", na_position="last")
+    order = ranked.index.to_numpy()
+    return order if positions is None else positions[order]
+
+
+_orders = LRU(max_entries=ORDER_CACHE_ENTRIES)  # (dataset key, sort, filter) -> row positions, shared by every session
+
+
+def cached_row_order(df, dataset_key=None, **settings):
+    """row_order() memoized on the dataset key and settings."""
+    if dataset_key is None:
+        return row_order(df, **settings)
+    return _orders.get_or_compute((dataset_key, *sorted(settings.items())), lambda: row_order(df, **settings))
+
+
+def page_rows(n_columns, page_size):
+    """Rows per page, capped so a page never exceeds GRID_MAX_CELLS cells."""
+    return max(1, min(int(page_size), GRID_MAX_CELLS // max(n_columns, 1)))
+
+
+def get_page(df, order, page, rows):
+    """Returns rows [page*rows, (page+1)*rows) of df in `order`; only those rows are materialized."""
+    start = page * rows
+    if order is None:
+        return df.iloc[start:start + rows]
+    return df.iloc[order[start:start + rows]]
+
+
+# **Shiny module: paged_grid_ui("id") in the UI, paged_grid_server("id", data, data_key) in the server**
+
+@module.ui
+def paged_grid_ui():
+    return ui.div(
+        ui.layout_columns(
+            ui.input_select("sort_by", "Sort by:", choices={"": "(file order)"}),
+            ui.input_checkbox("descending", "Descending", value=False),
+            ui.input_select("filter_column", "Filter column:", choices={"": "(none)"}),
+            ui.input_text("filter_text", "Filter:", placeholder="text, or >5, <=3, =2 for numbers"),
+            ui.input_select("page_size", "Rows per page:", PAGE_SIZES, selected=PAGE_SIZES[0]),
+        ),
+        ui.output_data_frame("grid"),
+        ui.layout_columns(
+            ui.input_action_button("previous", "‹ Previous"),
+            ui.input_numeric("page", None, value=1, min=1),
+            ui.output_text("position"),
+            ui.input_action_button("next", "Next ›"),
+        ),
+    )
+
+
+@module.server
+def paged_grid_server(input, output, session, data, data_key=lambda: None):
+    """`data` is a reactive returning a DataFrame (or None); `data_key` identifies its contents for caching."""
+
+    @reactive.calc
+    @instrument
+    def columns():
+        df = data()
+        return {} if df is None else {str(col): col for col in df.columns}
+
+    @reactive.effect
+    @instrument
+    def update_choices():
+        """New data keeps the sort and filter columns that still exist (see keep_page for the page)."""
+        names = list(columns())
+        with reactive.isolate():
+            sort_by, filter_column = input.sort_by(), input.filter_column()
+        ui.update_select("sort_by", choices={"": "(file order)", **dict(zip(names, names))},
+                         selected=sort_by if sort_by in names else "")
+        ui.update_select("filter_column", choices={"": "(none)", **dict(zip(names, names))},
+                         selected=filter_column if filter_column in names else "")
+
+    @reactive.calc
+    @instrument
+    def order():
+        df = data()
+        req(df is not None)
+        cols = columns()
+        return cached_row_order(
+            df, data_key(),
+            sort_by=cols.get(input.sort_by()),
+            descending=input.descending(),
+            filter_column=cols.get(input.filter_column()),
+            filter_text=input.filter_text(),
+        )
+
+    @reactive.calc
+    @instrument
+    def total_rows():
+        return len(data()) if order() is None else len(order())
+
+    @reactive.calc
+    @instrument
+    def rows_per_page():
+        return page_rows(len(columns()), input.page_size())
+
+    @reactive.calc
+    @instrument
+    def page_count():
+        return max(1, -(-total_rows() // rows_per_page()))
+
+    @reactive.calc
+    @instrument
+    def current_page():
+        page = input.page()
+        return min(max(int(page), 1), page_count()) if page is not None else 1
+
+    @reactive.effect
+    @instrument
+    def keep_page():
+        """Clamps the page number when new data (or a new filter) has fewer pages."""
+        count = page_count()
+        with reactive.isolate():
+            page = input.page()
+        if page is not None and page > count:
+            ui.update_numeric("page", value=count)
+
+    @reactive.effect
+    @reactive.event(input.filter_text, input.filter_column, input.sort_by, input.descending, input.page_size,
+                    ignore_init=True)
+    @instrument
+    def back_to_first_page():
+        ui.update_numeric("page", value=1)
+
+    @reactive.effect
+    @reactive.event(input.previous)
+    @instrument
+    def previous_page():
+        ui.update_numeric("page", value=max(current_page() - 1, 1))
+
+    @reactive.effect
+    @reactive.event(input.next)
+    @instrument
+    def next_page():
+        ui.update_numeric("page", value=min(current_page() + 1, page_count()))
+
+    @render.data_frame
+    @instrument
+    def grid():
+        page = get_page(data(), order(), current_page() - 1, rows_per_page())
+        page = page.set_axis(page.columns.astype(str), axis=1)  # Ensure column names are strings
+        return render.DataGrid(page, filters=False, selection_mode="none")
+
+    @render.text
+    @instrument
+    def position():
+        total, rows = total_rows(), rows_per_page()
+        if total == 0:
+            return "No matching rows"
+        start = (current_page() - 1) * rows
+        return f"Rows {start + 1:,}–{min(start + rows, total):,} of {total:,} (page {current_page():,} of {page_count():,})"
@@ -0,0 +1,431 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from column_stats import PREPROCESS_WORKERS, column_statistics
+from lru import LRU
+from outliers import cached_leverage_scores, cached_outlier_flags
+
+PIPELINE_CACHE_MAX_BYTES = int(os.environ.get("PIPELINE_CACHE_MAX_BYTES", 1024**3))  # Budget for cached step outputs
+
+
+# **Preprocessing steps: each takes a DataFrame plus JSON-serializable parameters and returns a new DataFrame**
+
+def numeric_columns(df, columns=None):
+    """Returns the numeric columns of df, restricted to `columns` if given."""
+    numeric = df.select_dtypes(include=np.number).columns
+    if not columns:
+        return list(numeric)
+    return [col for col in columns if col in numeric]
+
+
+def as_float(df, columns):
+    """df with the nullable numeric columns among `columns` (Int64, Float64...) as float64, missing values as NaN.
+
+    Fills, fences and scaled values are fractional and NA isn't a boolean, so the steps work on NumPy floats.
+    """
+    nullable = [col for col in columns if not isinstance(df[col].dtype, np.dtype)]
+    if not nullable:
+        return df
+    df = df.copy(deep=False)
+    for col in nullable:
+        df[col] = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+    return df
+
+
+def impute(df, method="none", threshold=50, workers=None):
+    """Handles missing values: drop rows, fill with mean/median/mode, or drop columns above `threshold` % missing."""
+    if method == "drop":
+        return df.dropna()
+    elif method in ("mean", "median"):
+        cols = numeric_columns(df)
+        df = as_float(df, cols)
+        return df.fillna(column_statistics(df[cols], [method], workers)[method])
+    elif method == "mode":
+        if len(df) == 0:
+            return df
+        cols = numeric_columns(df)
+        fill = column_statistics(df[cols], ["mode"], workers)["mode"]
+        others = [col for col in df.columns if col not in cols]
+        if others:
+            fill = pd.concat([fill, df[others].mode().iloc[0]])
+        return df.fillna(fill)
+    elif method == "remove_columns":
+        return df.loc[:, (df.isnull().mean() * 100) < threshold]
+    return df
+
+
+def handle_outliers(df, method="none", columns=None, rule="iqr", factor=None, workers=None, input_key=None):
+    """Removes, replaces (mean/median of the remaining values) or clips outliers in numeric columns.
+
+    `rule` is iqr (Tukey's fences, factor 1.5), zscore (factor 3) or mad (robust z-score, factor 3.5);
+    the flags are cached by `input_key`, so changing only `method` skips the detection.
+    """
+    cols = numeric_columns(df, columns)
+    if method == "none" or not cols:
+        return df
+    df = as_float(df, cols)
+    x = df[cols]
+    flags = cached_outlier_flags(x, input_key, rule, factor, workers)
+    if method == "remove":
+        return df[~flags.rows]
+    df = df.copy(deep=False)  # Only the replaced columns are materialized
+    if method == "clip":
+        df[cols] = x.clip(flags.lower, flags.upper, axis=1)
+    elif method in ("mean", "median"):
+        df[cols] = x.where(~flags.mask, flags.replacement(x, method), axis=1)
+    return df
+
+
+def handle_leverage(df, method="none", columns=None, factor=2.0, solver="auto", workers=None, input_key=None):
+    """Removes or replaces rows whose leverage exceeds factor * p / n for regressors `columns`.
+
+    `solver` is qr (exact), sketch (randomized, for millions of rows) or auto; scores are cached by `input_key`.
+    """
+    cols = numeric_columns(df, columns)
+    if method == "none" or not cols or len(df) == 0:
+        return df
+    df = as_float(df, cols)
+    scores = cached_leverage_scores(df[cols], input_key, solver)
+    high = scores > factor * (len(cols) + 1) / len(df)
+    if method == "remove":
+        return df[~high]
+    df = df.copy(deep=False)
+    x = df[cols]
+    statistic = "mean" if method == "mean" else "median"
+    replacement = column_statistics(x, [statistic], workers)[statistic]
+    high_rows = pd.DataFrame({col: high for col in cols}, index=x.index)
+    df[cols] = x.where(~high_rows, replacement, axis=1)
+    return df
+
+
+def convert_to_numeric(df, columns=None):
+    """Converts `columns` (default: every non-numeric column) to numbers; unparseable values become NaN."""
+    cols = columns or list(df.select_dtypes(exclude=np.number).columns)
+    cols = [col for col in cols if col in df.columns]
+    if not cols:
+        return df
+    df = df.copy(deep=False)
+    for col in cols:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df
+
+
+def scale(df, method="none", columns=None, workers=None):
+    """Applies min-max, z-score or robust (median/IQR) scaling to numeric columns."""
+    cols = numeric_columns(df, columns)
+    if method == "none" or not cols:
+        return df
+    df = as_float(df, cols)
+    x = df[cols]
+    if method == "minmax":
+        stats = column_statistics(x, ["min", "max"], workers)
+        center, spread = stats["min"], stats["max"] - stats["min"]
+    elif method == "zscore":
+        stats = column_statistics(x, ["mean", "std"], workers)
+        center, spread = stats["mean"], stats["std"]
+    elif method == "robust":
+        stats = column_statistics(x, ["median", "q1", "q3"], workers)
+        center, spread = stats["median"], stats["q3"] - stats["q1"]
+    else:
+        raise ValueError(f"Unknown scaling method: {method}")
+    df = df.copy(deep=False)
+    df[cols] = (x - center) / spread.replace(0, 1)  # Constant columns map to 0 instead of NaN
+    return df
+
+
+# **Streaming versions of the steps: statistics from StreamingProfile passes, then a function applied per chunk**
+
+def streaming_issue(step):
+    """Why `step` can't run chunk by chunk (None if it can): these options need the whole table in memory."""
+    method = step.get("method", "none")
+    if step["step"] == "impute" and method == "mode":
+        return "mode imputation needs the count of every value"
+    if step["step"] == "outliers" and method != "none" and step.get("rule", "iqr") == "mad":
+        return "the MAD rule needs the median before the deviations from it"
+    if step["step"] == "leverage" and method != "none":
+        return "leverage needs a factorization of every row"
+    return None
+
+
+def _profile_columns(profile, columns=None):
+    """Numeric columns with at least one value (columns without values are left alone, as NaN would be)."""
+    numeric = [name for name, stats in profile.columns.items() if stats.numeric and stats.count > 0]
+    return numeric if not columns else [col for col in columns if col in numeric]
+
+
+def _profile_statistic(profile, cols, statistic):
+    """Per-column statistic from a StreamingProfile; medians and quartiles come from the quantile sketch."""
+    quantiles = {"q1": 0.25, "median": 0.5, "q3": 0.75}
+    values = []
+    for col in cols:
+        stats = profile.columns[col]
+        if statistic in quantiles:
+            values.append(stats.quantiles.quantiles([quantiles[statistic]])[0])
+        elif statistic == "std":
+            values.append(stats.std())
+        else:  # mean, min, max
+            values.append(getattr(stats, statistic))
+    return pd.Series(values, index=cols, dtype=np.float64)
+
+
+def _fit_impute_chunks(profile_of, method="none", threshold=50):
+    if method == "drop":
+        return lambda chunk: chunk.dropna()
+    profile = profile_of()
+    if method in ("mean", "median"):
+        fill = _profile_statistic(profile, _profile_columns(profile), method)
+        return lambda chunk: chunk.fillna(fill)
+    if method == "remove_columns":
+        keep = {name for name, stats in profile.columns.items()
+                if profile.rows == 0 or stats.missing / profile.rows * 100 < threshold}
+        return lambda chunk: chunk.loc[:, [col for col in chunk.columns if col in keep]]
+    raise ValueError(f"Imputation can't be streamed: {method}")
+
+
+def _fit_outlier_chunks(profile_of, method="none", columns=None, rule="iqr", factor=None):
+    from outliers import outlier_fences
+
+    profile = profile_of()
+    cols = _profile_columns(profile, columns)
+    if not cols:
+        return lambda chunk: chunk
+    needed = ["q1", "q3"] if rule == "iqr" else ["mean", "std"]
+    lower, upper = outlier_fences({statistic: _profile_statistic(profile, cols, statistic) for statistic in needed},
+                                  rule, factor)
+
+    def outliers(chunk):
+        x = chunk[cols]
+        return x, x.lt(lower, axis=1) | x.gt(upper, axis=1)
+
+    if method == "remove":
+        return lambda chunk: chunk[~outliers(chunk)[1].to_numpy().any(axis=1)]
+    if method == "clip":
+        def clip(chunk):
+            chunk = chunk.copy(deep=False)
+            chunk[cols] = chunk[cols].clip(lower, upper, axis=1)
+            return chunk
+        return clip
+
+    def inliers(chunk):
+        x, mask = outliers(chunk)
+        return x.where(~mask)
+
+    replacement = _profile_statistic(profile_of(inliers), cols, method)  # Mean or median of the non-outliers
+
+    def replace(chunk):
+        x, mask = outliers(chunk)
+        chunk = chunk.copy(deep=False)
+        chunk[cols] = x.where(~mask, replacement, axis=1)
+        return chunk
+    return replace
+
+
+def _fit_scale_chunks(profile_of, method="none", columns=None):
+    profile = profile_of()
+    cols = _profile_columns(profile, columns)
+    if method == "minmax":
+        center = _profile_statistic(profile, cols, "min")
+        spread = _profile_statistic(profile, cols, "max") - center
+    elif method == "zscore":
+        center, spread = _profile_statistic(profile, cols, "mean"), _profile_statistic(profile, cols, "std")
+    elif method == "robust":
+        center = _profile_statistic(profile, cols, "median")
+        spread = _profile_statistic(profile, cols, "q3") - _profile_statistic(profile, cols, "q1")
+    else:
+        raise ValueError(f"Unknown scaling method: {method}")
+    spread = spread.replace(0, 1)  # Constant columns map to 0 instead of NaN
+
+    def apply(chunk):
+        chunk = chunk.copy(deep=False)
+        chunk[cols] = (chunk[cols] - center) / spread
+        return chunk
+    return apply
+
+
+def _fit_to_numeric_chunks(profile_of, columns=None):
+    return lambda chunk: convert_to_numeric(chunk, columns)
+
+
+CHUNK_STEPS = {  # step -> fit(profile_of, **params), which returns the function applied to each chunk
+    "impute": _fit_impute_chunks,
+    "outliers": _fit_outlier_chunks,
+    "to_numeric": _fit_to_numeric_chunks,
+    "scale": _fit_scale_chunks,
+}
+
+
+STEPS = {
+    "impute": impute,
+    "outliers": handle_outliers,
+    "leverage": handle_leverage,
+    "to_numeric": convert_to_numeric,
+    "scale": scale,
+}
+PARALLEL_STEPS = {"impute", "outliers", "leverage", "scale"}  # Steps whose column statistics can use the process pool
+DETECTION_STEPS = {"outliers", "leverage"}  # Steps that cache their detection by the fingerprint of their input
+
+
+# **Fingerprints and step cache**
+
+def frame_fingerprint(df):
+    """Returns a content hash of a DataFrame (values, index, column names and dtypes)."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(json.dumps([[str(col), str(dtype)] for col, dtype in df.dtypes.items()]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=True).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def step_fingerprint(input_fingerprint, step):
+    """Derives the fingerprint of a step's output from its input fingerprint and parameters."""
+    payload = json.dumps([input_fingerprint, step], sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+# Step outputs keyed by output fingerprint, bounded by (shallow) bytes; shared by every session in this process
+step_cache = LRU(max_bytes=PIPELINE_CACHE_MAX_BYTES, sizeof=lambda df: df.memory_usage(index=True).sum())
+
+
+# **Pipeline**
+
+class Pipeline:
+    """An ordered list of preprocessing steps, e.g. [{"step": "impute", "method": "mean"}, ...].
+
+    Each step's output is cached by the fingerprint of its input and parameters, so
+    changing a later step reuses every upstream result.
+    """
+
+    def __init__(self, steps=None):
+        self.steps = []
+        for step in steps or []:
+            self.add(**step)
+
+    def add(self, step, **params):
+        if step not in STEPS:
+            raise ValueError(f"Unknown pipeline step: {step}")
+        self.steps.append({"step": step, **params})
+        return self
+
+    def active_steps(self):
+        """Returns the steps that change the data (steps with method "none" are skipped)."""
+        return [step for step in self.steps if step.get("method", "") != "none"]
+
+    def fingerprint(self, input_fingerprint):
+        """Returns the fingerprint of the pipeline's output for an input with `input_fingerprint`."""
+        for step in self.active_steps():
+            input_fingerprint = step_fingerprint(input_fingerprint, step)
+        return input_fingerprint
+
+    def run(self, df, fingerprint=None, cache=step_cache, workers=None):
+        """Runs every step on df and returns the result. `fingerprint` identifies df's contents.
+
+        `workers` sets the process pool size for column statistics (default PREPROCESS_WORKERS, 1 = serial);
+        it doesn't change the output, so it isn't part of the cache key.
+        """
+        fingerprint = fingerprint or frame_fingerprint(df)
+        for step in self.active_steps():
+            input_fingerprint, fingerprint = fingerprint, step_fingerprint(fingerprint, step)
+            cached = cache.get(fingerprint) if cache is not None else None
+            if cached is not None:
+                df = cached
+                continue
+            params = {key: value for key, value in step.items() if key != "step"}
+            if step["step"] in PARALLEL_STEPS:
+                params["workers"] = workers
+            if step["step"] in DETECTION_STEPS and cache is not None:  # cache=None runs everything from scratch
+                params["input_key"] = input_fingerprint
+            df = STEPS[step["step"]](df, **params)
+            if cache is not None:
+                cache.put(fingerprint, df)
+        return df
+
+    def streaming_issues(self):
+        """{step name: reason} for the active steps that can't run chunk by chunk (see streaming_issue())."""
+        return {step["step"]: issue for step in self.active_steps() if (issue := streaming_issue(step))}
+
+    def run_chunks(self, open_chunks, profile=None):
+        """Yields the pipeline's output chunk by chunk, so files larger than memory can be processed.
+
+        `open_chunks()` returns a new iterator of DataFrame chunks (e.g. streaming.iter_chunks) each time it
+        is called. A step that needs statistics gets them from a StreamingProfile of its input: one more
+        pass over the file (two for replacing outliers), through the steps before it. `profile`, a finished
+        profile of the raw input, saves the first pass. Means, deviations, min/max and missing shares are
+        exact; medians and quartiles come from the quantile sketch. Raises ValueError for steps that can't
+        stream (see streaming_issues()).
+        """
+        from streaming import StreamingProfile
+
+        if issues := self.streaming_issues():
+            raise ValueError("Can't stream " + "; ".join(f"{name}: {issue}" for name, issue in issues.items()))
+        appliers = []
+
+        def step_input():
+            for chunk in open_chunks():
+                for apply in appliers:
+                    chunk = apply(chunk)
+                yield chunk
+
+        for step in self.active_steps():
+            def profile_of(transform=None, raw=profile if not appliers else None):
+                if transform is None and raw is not None:
+                    return raw
+                result = StreamingProfile(sample_rows=0)
+                for chunk in step_input():
+                    result.update(chunk if transform is None else transform(chunk))
+                result.done = True
+                return result
+
+            params = {key: value for key, value in step.items() if key != "step"}
+            appliers.append(CHUNK_STEPS[step["step"]](profile_of, **params))
+        yield from step_input()
+
+    def to_dict(self):
+        return {"steps": [dict(step) for step in self.steps]}
+
+    @classmethod
+    def from_dict(cls, spec):
+        return cls(spec.get("steps", []))
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
+
+
+def main(argv=None):
+    """Runs a saved pipeline against a file: python pipeline.py spec.json input.csv -o output.csv"""
+    from shared import read_dataset
+
+    parser = argparse.ArgumentParser(description="Run a saved preprocessing pipeline without the UI.")
+    parser.add_argument("spec", help="Pipeline spec (JSON), e.g. downloaded from data_preprocessing.py")
+    parser.add_argument("input", help="Dataset to process")
+    parser.add_argument("-o", "--output", help="Output CSV path (default: <input>_processed.csv)")
+    parser.add_argument("--workers", type=int, help=f"Processes for column statistics (default {PREPROCESS_WORKERS}; 1 = serial)")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    pipeline = Pipeline.load(args.spec)
+    timings = {}
+    try:
+        df = read_dataset(args.input, timings)  # Read once, so not through the dataset cache and its snapshots
+    except Exception as e:
+        parser.error(f"Could not load {args.input}: {type(e).__name__}: {e}")
+    if df.empty:
+        parser.error(f"Could not load {args.input}: no rows")
+    print("Parsed " + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in timings.items()))
+    # No step cache and a fixed fingerprint, as in batch.py: hashing a frame that is processed once is wasted work
+    result = pipeline.run(df, fingerprint="cli", cache=None, workers=args.workers)
+    output = args.output or os.path.splitext(args.input)[0] + "_processed.csv"
+    result.to_csv(output, index=False)
+    print(f"Processed {len(df)} rows -> {len(result)} rows in {time.perf_counter() - start:.2f}s: {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+from collections import namedtuple
+import numpy as np
+import pandas as pd
+# plotly is imported inside the figure builders: it is the slowest import here, and startup shouldn't wait for it
+
+DENSITY_BINS = 200  # Grid size of the scatter density raster (per axis)
+MAX_OUTLIER_POINTS = 2000  # Most extreme outliers drawn individually on top of the raster
+TRENDLINE_SAMPLE = 5_000  # Rows used to fit a LOWESS trendline in density mode
+
+
+def _finite(values):
+    values = pd.to_numeric(values, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    return values[np.isfinite(values)]
+
+
+def histogram_figure(values, title, nbins):
+    """Bins a numeric column with NumPy and returns a bar chart of the counts; only bin edges and counts are sent."""
+    x = _finite(values)
+    if len(x) == 0:
+        return binned_histogram_figure(np.zeros(0, dtype=np.int64), np.zeros(1), title, values.name)
+    counts, edges = np.histogram(x, bins=max(int(nbins), 1))
+    return binned_histogram_figure(counts, edges, title, values.name)
+
+
+def _error_bars(errors):
+    return None if errors is None else dict(type="data", array=np.asarray(errors), thickness=1)
+
+
+def binned_histogram_figure(counts, edges, title, name, errors=None):
+    """Bar chart of counts already binned at `edges` (e.g. by a SQL query); `errors` adds ± error bars."""
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    if counts.sum() > 0:
+        fig.add_trace(go.Bar(
+            x=(edges[:-1] + edges[1:]) / 2,
+            y=counts,
+            width=np.diff(edges),
+            error_y=_error_bars(errors),
+            customdata=np.column_stack([edges[:-1], edges[1:]]),
+            hovertemplate="%{customdata[0]:.4g} – %{customdata[1]:.4g}<br>count=%{y:,.0f}<extra></extra>",
+        ))
+    fig.update_layout(title=title, bargap=0, xaxis_title=str(name), yaxis_title="count")
+    return fig
+
+
+def bar_figure(counts, title, errors=None):
+    """Returns a bar chart for pre-aggregated category counts (a value_counts() Series); `errors` adds ± error bars."""
+    import plotly.graph_objects as go
+
+    fig = go.Figure(go.Bar(x=counts.index.astype(str), y=counts.to_numpy(), error_y=_error_bars(errors)))
+    fig.update_layout(title=title, xaxis_title=str(counts.index.name or ""), yaxis_title="count")
+    return fig
+
+
+def zscore_outliers(x, y, threshold=3):
+    """Flags points more than `threshold` standard deviations from the mean on either axis (x, y without NaN)."""
+    with np.errstate(invalid="ignore", divide="ignore"):
+        zx = np.abs((x - x.mean()) / x.std(ddof=1))
+        zy = np.abs((y - y.mean()) / y.std(ddof=1))
+    return (zx > threshold) | (zy > threshold), np.fmax(zx, zy)
+
+
+def _bin_index(values, bins):
+    """Equal-width bin index of each value and the bin edges (a faster np.histogram for uniform bins)."""
+    low, high = values.min(), values.max()
+    if high == low:
+        low, high = low - 0.5, high + 0.5
+    edges = np.linspace(low, high, bins + 1)
+    index = ((values - low) * (bins / (high - low))).astype(np.int64)
+    return np.minimum(index, bins - 1), edges  # The max value belongs to the last bin
+
+
+def trendline(x, y, reg_type):
+    """Returns (xs, ys) of the fitted trendline, or None."""
+    if reg_type == "Linear" and len(x) > 1:
+        slope, intercept = np.polyfit(x, y, 1)  # Exact OLS on every row
+        xs = np.array([x.min(), x.max()])
+        return xs, slope * xs + intercept
+    if reg_type == "Lowess" and len(x) > 2:
+        from statsmodels.nonparametric.smoothers_lowess import lowess
+
+        if len(x) > TRENDLINE_SAMPLE:
+            idx = np.random.default_rng(42).choice(len(x), TRENDLINE_SAMPLE, replace=False)
+            x, y = x[idx], y[idx]
+        # Sorted by x; plotly's default frac=2/3, with delta skipping refits between nearby x values
+        fitted = lowess(y, x, delta=0.01 * (x.max() - x.min()))
+        fitted = fitted[::max(len(fitted) // 200, 1)]  # ~200 vertices are plenty for a smooth line
+        return fitted[:, 0], fitted[:, 1]
+    return None
+
+
+# **Scatter plot stages: points -> outliers -> trendline -> styling, each recomputed only when its inputs change**
+
+ScatterPoints = namedtuple("ScatterPoints", ["x", "y", "outliers"])  # Finite x/y arrays; positions of drawn outliers
+
+
+def scatter_points(df, x_var, y_var, max_outliers=MAX_OUTLIER_POINTS):
+    """Finite (x, y) pairs of two columns and the z-score outliers among them (at most max_outliers, the most extreme)."""
+    x = df[x_var].to_numpy(dtype=np.float64, na_value=np.nan)
+    y = df[y_var].to_numpy(dtype=np.float64, na_value=np.nan)
+    finite = np.isfinite(x) & np.isfinite(y)
+    x, y = x[finite], y[finite]
+    if len(x) == 0:
+        return ScatterPoints(x, y, np.empty(0, dtype=np.int64))
+    is_outlier, z_max = zscore_outliers(x, y)
+    outliers = np.flatnonzero(is_outlier)
+    if len(outliers) > max_outliers:
+        outliers = outliers[np.argsort(z_max[outliers])[-max_outliers:]]  # Keep the most extreme
+    return ScatterPoints(x, y, outliers)
+
+
+def add_scatter_layers(fig, points):
+    """Adds the outlier and (empty) trendline traces that style_scatter and set_trendline update in place."""
+    import plotly.graph_objects as go
+
+    fig.add_trace(go.Scattergl(x=points.x[points.outliers], y=points.y[points.outliers], mode="markers",
+                               name="Outliers (|z| > 3)", meta="outliers"))
+    fig.add_trace(go.Scatter(x=[], y=[], mode="lines", meta="trend", visible=False,
+                             line=dict(color="orange", width=2)))
+    return fig
+
+
+def density_figure(points, x_var, y_var, title, bins=DENSITY_BINS):
+    """Scatter plot for large data: a 2D count raster, with outliers drawn as individual points on top.
+
+    The payload is bins² cells plus at most MAX_OUTLIER_POINTS points, whatever the row count.
+    """
+    import plotly.graph_objects as go
+
+    x, y = points.x, points.y
+    fig = go.Figure()
+    if len(x) > 0:
+        x_index, x_edges = _bin_index(x, bins)
+        y_index, y_edges = _bin_index(y, bins)
+        counts = np.bincount(y_index * bins + x_index, minlength=bins * bins).reshape(bins, bins)  # Rows = y bins
+        with np.errstate(divide="ignore"):
+            z = np.round(np.log10(counts), 3).astype(object)
+        z[counts == 0] = None  # Empty cells stay transparent
+        fig.add_trace(go.Heatmap(
+            x=np.round((x_edges[:-1] + x_edges[1:]) / 2, 6),
+            y=np.round((y_edges[:-1] + y_edges[1:]) / 2, 6),
+            z=z,
+            customdata=counts,
+            colorscale="Blues",
+            colorbar=dict(title="log10(count)"),
+            hovertemplate=f"{x_var}=%{{x:.4g}}<br>{y_var}=%{{y:.4g}}<br>count=%{{customdata}}<extra></extra>",
+        ))
+    add_scatter_layers(fig, points)
+    fig.update_layout(title=f"{title} (density of {len(x):,} points)", xaxis_title=x_var, yaxis_title=y_var,
+                      legend=dict(orientation="h", y=-0.2))
+    return fig
+
+
+def style_scatter(fig, show_outliers=False, point_size=5):
+    """Applies the style-only inputs to a scatter figure in place; on a live FigureWidget this sends one restyle.
+
+    Outliers stay visible (grey) over a density raster, since the raster hides individual points.
+    """
+    density = any(trace.type == "heatmap" for trace in fig.data)
+    with fig.batch_update():
+        fig.update_traces(marker_size=point_size, selector=lambda trace: (
+            trace.type in ("scatter", "scattergl") and trace.meta not in ("outliers", "trend")))
+        fig.update_traces(visible=show_outliers or density,
+                          marker=dict(size=point_size * 1.5 if show_outliers else point_size,
+                                      color="red" if show_outliers else "rgba(60, 60, 60, 0.7)"),
+                          selector=dict(meta="outliers"))
+    return fig
+
+
+def set_trendline(fig, trend, reg_type):
+    """Puts a trendline() result into the figure's trendline trace in place (hidden when trend is None)."""
+    xs, ys = trend if trend is not None else ([], [])
+    fig.update_traces(x=xs, y=ys, name=f"{reg_type} trend", visible=trend is not None, selector=dict(meta="trend"))
+    return fig
+
+
+def density_scatter_figure(df, x_var, y_var, title, reg_type="None", show_outliers=False, point_size=5,
+                           bins=DENSITY_BINS):
+    """All scatter stages at once: density_figure() with the trendline and styling applied."""
+    points = scatter_points(df, x_var, y_var)
+    fig = density_figure(points, x_var, y_var, title, bins)
+    set_trendline(fig, trendline(points.x, points.y, reg_type), reg_type)
+    return style_scatter(fig, show_outliers, point_size)
@@ -0,0 +1,108 @@
+import argparse
+import importlib
+import os
+import signal
+import sys
+import time
+from pathlib import Path
+
+# Modules the apps import on first use; the parent imports them once so every forked worker starts with them loaded
+WARM_MODULES = [
+    "plotly.express",
+    "plotly.graph_objects",
+    "shinywidgets",
+    "faicons",
+    "matplotlib.pyplot",
+    "scipy.stats",
+    "statsmodels.nonparametric.smoothers_lowess",
+    "pyarrow.parquet",
+    "pyarrow.csv",
+    "pyarrow.json",
+]
+RESPAWN_DELAY = 1.0  # Seconds to wait before replacing a worker that exited
+
+
+def warm_up(modules=WARM_MODULES):
+    """Imports the heavy modules and loads the default dataset into the cache. Returns seconds taken."""
+    start = time.perf_counter()
+    for name in modules:
+        try:
+            importlib.import_module(name)
+        except ImportError:
+            pass  # Optional dependency; the app imports it (and fails) only if it is used
+    from shared import load_dataset
+
+    load_dataset()  # Default dataset, shared copy-on-write by the workers
+    return time.perf_counter() - start
+
+
+def load_app(path):
+    """Returns the Shiny App defined by a file: a Shiny Express script or a module with an `app` object."""
+    from shiny.express import is_express_app, wrap_express_app
+
+    path = Path(path).resolve()
+    sys.path.insert(0, str(path.parent))
+    if is_express_app(path.name, str(path.parent)):
+        return wrap_express_app(path)
+    return importlib.import_module(path.stem).app
+
+
+def _serve(app, host, port):
+    import uvicorn
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    uvicorn.run(app, host=host, port=port, log_level="warning")
+    os._exit(0)
+
+
+def serve(app, workers=1, host="127.0.0.1", port=8000):
+    """Forks `workers` processes from this (warm) one, worker i serving on port + i, and replaces any that exit.
+
+    Shiny sessions keep state in the worker that created them, so the workers get their own ports
+    and a load balancer with sticky sessions goes in front.
+    """
+    if not hasattr(os, "fork"):
+        raise RuntimeError("Pre-forked workers need os.fork(); use `shiny run` on this platform")
+    children = {}  # pid -> port
+
+    def start(worker_port):
+        pid = os.fork()
+        if pid == 0:
+            _serve(app, host, worker_port)
+        children[pid] = worker_port
+
+    def stop(signum, frame):
+        for pid in list(children):
+            os.kill(pid, signal.SIGTERM)
+        sys.exit(0)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for i in range(workers):
+        start(port + i)
+    print(f"Serving {workers} worker(s) on http://{host}:{port}" + (f"-{port + workers - 1}" if workers > 1 else ""))
+    while children:
+        pid, _ = os.wait()
+        worker_port = children.pop(pid, None)
+        if worker_port is not None:
+            time.sleep(RESPAWN_DELAY)
+            start(worker_port)  # Forked from the warm parent, so the replacement is ready in milliseconds
+
+
+def main(argv=None):
+    """Serves an app from pre-forked warm workers: python prefork.py app.py --workers 4 --port 8000"""
+    parser = argparse.ArgumentParser(description="Serve a Shiny app from workers forked after a warm-up.")
+    parser.add_argument("app", help="App file, e.g. app.py, data_preprocessing.py or feature.py")
+    parser.add_argument("--workers", type=int, default=1, help="Worker processes; worker i listens on port + i")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args(argv)
+
+    os.chdir(Path(args.app).resolve().parent)
+    print(f"Warmed up in {warm_up():.2f}s")
+    serve(load_app(args.app), args.workers, args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
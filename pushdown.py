@@ -0,0 +1,215 @@
+import importlib.util
+import os
+import threading
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from correlation import CorrelationResult, sample_correlation_matrix
+from lru import LRU
+from dataset_profile import TOP_K, DatasetProfile
+from formats import sniff_format
+
+# Sniffed formats (see formats.py) DuckDB reads itself -> table function
+PUSHDOWN_FORMATS = {"csv": "read_csv", "jsonl": "read_json", "parquet": "read_parquet"}
+DUCKDB_ENCODINGS = {"utf-8": None, "utf-8-sig": None, "latin-1": "latin-1", "utf-16": "utf-16"}
+PUSHDOWN_SAMPLE_ROWS = 100_000  # Rows pulled into pandas for the preview and scatter plot
+DATASET_ENTRIES = 8  # Open databases kept across sessions
+NUMERIC_TYPES = ("TINYINT", "SMALLINT", "INTEGER", "BIGINT", "HUGEINT", "UTINYINT", "USMALLINT", "UINTEGER",
+                 "UBIGINT", "UHUGEINT", "FLOAT", "REAL", "DOUBLE", "DECIMAL")
+DATETIME_TYPES = ("DATE", "TIMESTAMP", "TIME")
+PUSHDOWN_AVAILABLE = importlib.util.find_spec("duckdb") is not None  # Optional dependency
+
+_datasets = LRU(max_entries=DATASET_ENTRIES)  # file fingerprint -> SqlDataset
+
+
+def is_pushdown_format(file_path):
+    fmt = sniff_format(file_path)
+    if fmt.kind == "jsonl":
+        return fmt.encoding == "utf-8"  # DuckDB's JSON reader has no encoding option
+    return fmt.kind in PUSHDOWN_FORMATS and (fmt.encoding is None or fmt.encoding in DUCKDB_ENCODINGS)
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _literal(value):
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def _reader_sql(file_path, fmt):
+    """The DuckDB table function call that reads a sniffed file, with its delimiter, compression and encoding."""
+    if fmt.kind == "parquet":
+        return f"read_parquet({_literal(file_path)})"
+    options = [_literal(file_path), f"compression = {_literal(fmt.compression or 'uncompressed')}"]
+    if fmt.kind == "csv":
+        options.append(f"delim = {_literal(fmt.delimiter)}")
+        if DUCKDB_ENCODINGS[fmt.encoding] is not None:
+            options.append(f"encoding = {_literal(DUCKDB_ENCODINGS[fmt.encoding])}")
+    else:
+        options.append("format = 'newline_delimited'")
+    return f"{PUSHDOWN_FORMATS[fmt.kind]}({', '.join(options)})"
+
+
+def sql_kind(sql_type):
+    """Classifies a DuckDB column type like dataset_profile.dtype_class classifies a pandas dtype."""
+    if sql_type == "BOOLEAN":
+        return "boolean"
+    if sql_type.startswith(NUMERIC_TYPES):
+        return "numeric"
+    if sql_type.startswith(DATETIME_TYPES):
+        return "datetime"
+    return "categorical"
+
+
+class SqlColumnProfile:
+    """Same attributes as dataset_profile.ColumnProfile, filled from one aggregate query."""
+
+    def __init__(self, name, sql_type, rows, count, distinct, moments=None):
+        self.name = name
+        self.dtype = sql_type
+        self.kind = sql_kind(sql_type)
+        self.count = count
+        self.missing = rows - count
+        self.distinct = min(distinct, count)  # HyperLogLog can overshoot on high-cardinality columns
+        self.mean = self.std = self.min = self.max = np.nan
+        self.quantiles = {0.25: np.nan, 0.5: np.nan, 0.75: np.nan}
+        self.top_values = None  # SqlDataset.value_counts() queries these on demand
+        if moments is not None and count > 0:
+            mean, std, low, high, quantiles = moments
+            self.mean, self.min, self.max = mean, low, high
+            self.std = std if std is not None else np.nan
+            self.quantiles = dict(zip(self.quantiles, quantiles))
+
+
+class SqlProfile(DatasetProfile):
+    """DatasetProfile of a table in DuckDB: every statistic comes from a single scan inside the engine.
+
+    Distinct counts (HyperLogLog) and quartiles (t-digest) are approximate, as in streaming mode.
+    """
+
+    def __init__(self, rows, columns):
+        self.rows = rows
+        self.columns = columns
+        self.done = True
+
+
+class SqlDataset:
+    """A file registered in an in-process DuckDB database; statistics are queries, and only their results reach pandas.
+
+    The file is imported once into a database file next to the dataset snapshots (keyed by file content), so
+    later queries read compressed columns instead of re-parsing text, and the database outlives the upload
+    (Shiny deletes a session's upload directory when the session ends, while the dataset is shared).
+    """
+
+    def __init__(self, file_path, database_dir, key):
+        import duckdb  # Optional dependency, only needed for pushdown mode
+
+        path = Path(database_dir) / f"{key}.duckdb"
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            partial = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with duckdb.connect(str(partial)) as con:
+                con.execute(f"CREATE TABLE data AS SELECT * FROM {_reader_sql(file_path, sniff_format(file_path))}")
+            os.replace(partial, path)
+        else:
+            path.touch()  # So disk pruning (DatasetCache.prune_snapshots) keeps recently used databases
+        self._con = duckdb.connect(str(path), read_only=True)
+        self.schema = {name: sql_type for name, sql_type, *_ in self._query("DESCRIBE data").fetchall()}
+        self._profile = self._sample = None
+        self._lock = threading.RLock()  # sample() reads the profile under the same lock
+
+    def _query(self, sql):
+        return self._con.cursor().execute(sql)  # A cursor per query, so background jobs can run concurrently
+
+    @property
+    def profile(self):
+        """SqlProfile of the whole table (one aggregate query, computed once)."""
+        with self._lock:
+            if self._profile is None:
+                self._profile = self._build_profile()
+            return self._profile
+
+    def _build_profile(self):
+        select = ["count(*)"]
+        for name, sql_type in self.schema.items():
+            col = _quote(name)
+            select += [f"count({col})", f"approx_count_distinct({col})"]
+            if sql_kind(sql_type) == "numeric":
+                value = f"{col}::DOUBLE"
+                select += [f"avg({value})", f"stddev_samp({value})", f"min({value})", f"max({value})",
+                           f"approx_quantile({value}, [0.25, 0.5, 0.75])"]
+        values = iter(self._query(f"SELECT {', '.join(select)} FROM data").fetchone())
+        rows = next(values)
+        columns = {}
+        for name, sql_type in self.schema.items():
+            count, distinct = next(values), next(values)
+            moments = [next(values) for _ in range(5)] if sql_kind(sql_type) == "numeric" else None
+            columns[name] = SqlColumnProfile(name, sql_type, rows, count, distinct, moments)
+        return SqlProfile(rows, columns)
+
+    def sample(self, rows=PUSHDOWN_SAMPLE_ROWS):
+        """A uniform row sample (reservoir, fixed seed) as a pandas frame, for the preview and scatter plot."""
+        with self._lock:
+            if self._sample is None or len(self._sample) != min(rows, self.profile.rows):
+                self._sample = self._query(
+                    f"SELECT * FROM data USING SAMPLE reservoir({int(rows)} ROWS) REPEATABLE (42)").df()
+            return self._sample.copy(deep=False)
+
+    def value_counts(self, column, n=TOP_K):
+        """The n most frequent values of a column, like Series.value_counts().head(n)."""
+        col = _quote(column)
+        counts = self._query(
+            f"SELECT {col} AS value, count(*) AS n FROM data WHERE {col} IS NOT NULL "
+            f"GROUP BY {col} ORDER BY n DESC, {col} LIMIT {int(n)}").df()
+        return pd.Series(counts["n"].to_numpy(), index=pd.Index(counts["value"], name=column), name="count")
+
+    def histogram(self, column, bins):
+        """Counts and edges of `bins` equal-width bins over the column's finite values, binned in the engine."""
+        stats = self.profile.columns[column]
+        low, high = stats.min, stats.max
+        if np.isnan(low):
+            return np.zeros(0, dtype=np.int64), np.zeros(1)
+        if high == low:
+            low, high = low - 0.5, high + 0.5
+        bins = max(int(bins), 1)
+        value = f"{_quote(column)}::DOUBLE"
+        rows = self._query(
+            f"SELECT least(floor(({value} - {float(low)!r}) * {float(bins / (high - low))!r}), {bins - 1})::BIGINT AS bin, "
+            f"count(*) FROM data WHERE isfinite({value}) GROUP BY bin").fetchall()
+        counts = np.zeros(bins, dtype=np.int64)
+        for index, count in rows:
+            counts[index] = count
+        return counts, np.linspace(low, high, bins + 1)
+
+    def correlation_matrix(self, columns, method="pearson"):
+        """A CorrelationResult for `columns`. Pearson runs in the engine over every row (pairwise complete,
+        like DataFrame.corr()); Spearman and Kendall need ranks, so they are estimated from sample()
+        with confidence bounds.
+        """
+        columns = list(columns)
+        if method != "pearson":
+            return sample_correlation_matrix(self.sample(), columns, method, self.profile.rows)
+        pairs = [(i, j) for i in range(len(columns)) for j in range(i + 1, len(columns))]
+        select = [f"corr({_quote(columns[i])}::DOUBLE, {_quote(columns[j])}::DOUBLE)" for i, j in pairs]
+        values = self._query(f"SELECT {', '.join(select)} FROM data").fetchone() if pairs else ()
+        matrix = np.eye(len(columns))
+        for (i, j), value in zip(pairs, values):
+            matrix[i, j] = matrix[j, i] = np.nan if value is None else value
+        return CorrelationResult(matrix=pd.DataFrame(matrix, index=columns, columns=columns), lower=None, upper=None,
+                                 n=self.profile.rows, approximate=False)
+
+
+def open_dataset(file_path):
+    """Returns the SqlDataset for a file, shared across sessions by file content; builds its profile and sample up front."""
+    from shared import DATASET_CACHE_DIR, dataset_cache
+
+    key = dataset_cache.key(file_path, tag="duckdb")
+    dataset = _datasets.get(key)
+    if dataset is None:
+        dataset = SqlDataset(file_path, DATASET_CACHE_DIR, key)
+        _datasets.put(key, dataset)
+        dataset_cache.prune_snapshots()  # Databases count against the snapshot disk budget
+    dataset.profile  # Scan once here, in the background job, not in the first output that asks
+    dataset.sample()  # Likewise: the reservoir sample is another full scan, so app.py's dataset() only reads it
+    return dataset
@@ -1,27 +1,108 @@
+import os
+import time
 from pathlib import Path
 import pandas as pd
+from compact import compact_frame
+from dataset_cache import DatasetCache
+from formats import read_file
 
 app_dir = Path(__file__).parent
 
+# Parsed datasets are cached by file content so re-uploads skip parsing entirely
+DATASET_CACHE_MAX_BYTES = int(os.environ.get("DATASET_CACHE_MAX_BYTES", 2 * 1024**3))  # In-memory budget
+DATASET_CACHE_MAX_DISK_BYTES = int(os.environ.get("DATASET_CACHE_MAX_DISK_BYTES", 20 * 1024**3))  # Snapshot budget
+DATASET_CACHE_DIR = Path(os.environ.get("DATASET_CACHE_DIR", app_dir / ".dataset_cache"))
+COMPACT_DTYPES = os.environ.get("COMPACT_DTYPES", "1") != "0"  # Set COMPACT_DTYPES=0 to keep pandas' default dtypes
+
+dataset_cache = DatasetCache(
+    max_bytes=DATASET_CACHE_MAX_BYTES,
+    snapshot_dir=DATASET_CACHE_DIR,
+    max_disk_bytes=DATASET_CACHE_MAX_DISK_BYTES,
+)
+
+def _file_ext(file_path):
+    return str(file_path).split(".")[-1].lower()
+
+def _record_timings(file_path, timings):
+    """Reports the seconds spent in each load stage, as load.<stage> rows in the Performance panel."""
+    from instrumentation import INSTRUMENT, recorder
+
+    if INSTRUMENT:
+        size = os.path.getsize(file_path)
+        for stage, seconds in timings.items():
+            recorder.record(f"load.{stage}", seconds, input_bytes=size)
+
+def _parse_file(file_path):
+    """Parses a file with the reader matching its sniffed format (see formats.read_file)."""
+    timings = {}
+    df = read_file(file_path, timings)
+    _record_timings(file_path, timings)
+    return df
+
+def _parse_compacted(file_path):
+    """Parses a file and compacts its dtypes; the per-column report and stage timings are cached with the frame."""
+    timings = {}
+    df = read_file(file_path, timings)
+    start = time.perf_counter()
+    df, report = compact_frame(df)
+    timings["compact"] = time.perf_counter() - start
+    _record_timings(file_path, timings)
+    return df, {"compaction": report.to_dict("list"), "timings": timings}
+
+def _cache_tag(file_path):
+    return _file_ext(file_path) + "-sniffed" + ("-compact" if COMPACT_DTYPES else "")
+
 def load_dataset(file_path=None):
-    """Loads a dataset from a given path. Supports CSV, Excel, JSON, and RDS."""
-    if file_path is None:
-        return pd.read_csv(app_dir / "penguins.csv")  # Default dataset
+    """Loads a dataset from a given path. Supports delimited text (CSV, TSV, ...), Excel, JSON, JSON lines,
+    Parquet, Feather and RDS, optionally gzip- or zstd-compressed; the format is sniffed from the content.
 
-    file_ext = file_path.split(".")[-1].lower()
+    Results are cached by file content, so loading the same file again is served from memory or disk.
+    Columns are stored in compact dtypes (see compact.py and compaction_report()).
+    If the file can't be read, returns an empty DataFrame whose attrs["load_error"] says why.
+    """
+    if file_path is None:
+        file_path = app_dir / "penguins.csv"  # Default dataset
 
     try:
-        if file_ext == "csv":
-            return pd.read_csv(file_path)
-        elif file_ext in ["xls", "xlsx"]:
-            return pd.read_excel(file_path, engine="openpyxl")
-        elif file_ext == "json":
-            return pd.read_json(file_path)
-        elif file_ext == "rds":
-            import pyreadr
-            return pyreadr.read_r(file_path)[None]  # Extract dataframe from RDS object
+        loader = _parse_compacted if COMPACT_DTYPES else _parse_file
+        return dataset_cache.get_or_load(file_path, loader, tag=_cache_tag(file_path))
     except Exception as e:
         print(f"Error loading file: {e}")
-        return pd.DataFrame()  # Return empty DataFrame if there's an error
+        df = pd.DataFrame()  # Return empty DataFrame if there's an error
+        df.attrs["load_error"] = f"{type(e).__name__}: {e}"
+        return df
+
+def read_dataset(file_path, timings=None):
+    """Parses and compacts a file like load_dataset, bypassing the cache: for batch jobs that read each file once.
+
+    Errors are raised. If `timings` is a dict, the seconds per stage (sniff, parse, convert, compact) are stored in it.
+    """
+    timings = {} if timings is None else timings
+    df = read_file(file_path, timings)
+    if COMPACT_DTYPES:
+        start = time.perf_counter()
+        df, _ = compact_frame(df)
+        timings["compact"] = time.perf_counter() - start
+    return df
+
+def dataset_fingerprint(file_path):
+    """Returns the content fingerprint load_dataset uses for a file (cheap once the file has been loaded)."""
+    return dataset_cache.key(file_path, tag=_cache_tag(file_path))
+
+def compaction_report(file_path=None):
+    """Returns the dtype and bytes before/after compaction per column of a loaded file, or None."""
+    metadata = dataset_cache.metadata(dataset_fingerprint(file_path or app_dir / "penguins.csv"))
+    if metadata is None or "compaction" not in metadata:
+        return None
+    return pd.DataFrame(metadata["compaction"])
+
+def load_timings(file_path=None):
+    """Returns the seconds each stage (sniff, parse, convert, compact) took when a loaded file was parsed, or None."""
+    metadata = dataset_cache.metadata(dataset_fingerprint(file_path or app_dir / "penguins.csv"))
+    if metadata is None or "timings" not in metadata:
+        return None
+    return metadata["timings"]
 
-df = load_dataset()  # Default dataset
+def cache_stats():
+    """Returns hit/miss counters for the dataset cache."""
+    return dataset_cache.stats()
@@ -0,0 +1,338 @@
+import threading
+import numpy as np
+import pandas as pd
+from formats import open_stream, sniff_format
+
+STREAMABLE_KINDS = ("csv", "jsonl")  # Sniffed formats (see formats.py) that can be read in row chunks
+STREAM_CHUNK_ROWS = 100_000  # Rows parsed per chunk
+SAMPLE_ROWS = 100_000  # Rows kept in the uniform sample used for plots and previews
+
+
+def is_streamable(file_path):
+    """Returns True if the file can be read in chunks."""
+    return sniff_format(file_path).kind in STREAMABLE_KINDS
+
+
+def iter_chunks(file_path, chunk_rows=STREAM_CHUNK_ROWS):
+    """Yields DataFrames of at most chunk_rows rows from delimited text or JSON lines, possibly compressed."""
+    fmt = sniff_format(file_path)
+    if fmt.kind not in STREAMABLE_KINDS:
+        raise ValueError(f"Cannot stream {fmt.kind} files")
+    with open_stream(file_path, fmt.compression) as stream:
+        if fmt.kind == "jsonl":
+            reader = pd.read_json(stream, lines=True, encoding=fmt.encoding, chunksize=chunk_rows)
+        else:
+            reader = pd.read_csv(stream, sep=fmt.delimiter, encoding=fmt.encoding, chunksize=chunk_rows)
+        with reader:
+            yield from reader
+
+
+class ChunkReader:
+    """iter_chunks() read from background jobs and closed from the event loop.
+
+    close() never waits for a chunk being parsed: the reader closes itself once that chunk is done,
+    so the file and parser of an abandoned stream are released either way.
+    """
+
+    def __init__(self, file_path, chunk_rows=STREAM_CHUNK_ROWS):
+        self._chunks = iter_chunks(file_path, chunk_rows)
+        self._lock = threading.Lock()  # Held while a chunk is parsed
+        self.closed = False
+
+    def read(self):
+        """Returns the next chunk, or None at end of file or once closed."""
+        with self._lock:
+            chunk = None if self.closed else next(self._chunks, None)
+        if chunk is None or self.closed:
+            self.close()
+        return chunk
+
+    def close(self):
+        self.closed = True  # Set before trying the lock, so a read in progress sees it when it finishes
+        if self._lock.acquire(blocking=False):
+            try:
+                self._chunks.close()
+            finally:
+                self._lock.release()
+
+
+def profile_next_chunk(reader):
+    """Parses the next chunk and profiles it on its own (None at end of file). Only the merge into the
+    running profile runs on the event loop, so that profile is never read while it is being updated.
+    """
+    chunk = reader.read()
+    return None if chunk is None else StreamingProfile().update(chunk)
+
+
+def _is_numeric(series):
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+
+def _bit_length(values):
+    """Vectorized int.bit_length() for a uint64 array."""
+    if len(values) and values.max() < np.uint64(1 << 53):  # Exact in float64: the exponent is the bit length
+        return np.frexp(values.astype(np.float64))[1].astype(np.int64)
+    values = values.copy()
+    lengths = np.zeros(values.shape, dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        mask = values >= (np.uint64(1) << np.uint64(shift))
+        lengths[mask] += shift
+        values[mask] >>= np.uint64(shift)
+    return lengths + (values > 0)
+
+
+class HyperLogLog:
+    """Mergeable approximate distinct counter (about 1.6% standard error at p=12)."""
+
+    def __init__(self, p=12):
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    def update(self, values):
+        """Adds the non-null values of an array or Series."""
+        values = pd.Series(values).dropna()
+        if values.empty:
+            return
+        if isinstance(values.dtype, pd.CategoricalDtype):  # Registers only depend on the distinct values
+            values = pd.Series(values.cat.categories[np.unique(values.cat.codes)].to_numpy())
+        if _is_numeric(values):
+            values = values.astype("float64")  # 1 and 1.0 hash the same across chunks
+        hashes = pd.util.hash_array(values.to_numpy())
+        index = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        remainder = hashes & np.uint64((1 << (64 - self.p)) - 1)
+        rank = (64 - self.p) - _bit_length(remainder) + 1  # Position of the first 1-bit
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def count(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.power(2.0, -self.registers.astype(np.float64)))
+        zeros = np.count_nonzero(self.registers == 0)
+        if estimate <= 2.5 * m and zeros > 0:
+            estimate = m * np.log(m / zeros)  # Linear counting for small cardinalities
+        return int(round(estimate))
+
+
+class QuantileSketch:
+    """Mergeable approximate quantile sketch built from KLL-style compactors.
+
+    Level i holds items that each stand for 2**i original values. When a level
+    grows past k items it is sorted and every other item is promoted.
+    """
+
+    def __init__(self, k=256, seed=None):
+        self.k = k
+        self.levels = [np.empty(0)]
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        values = values[~np.isnan(values)]
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self._compress()
+
+    def _compress(self):
+        level = 0
+        while level < len(self.levels):
+            items = self.levels[level]
+            if len(items) > self.k:
+                items = np.sort(items)
+                even = len(items) - len(items) % 2
+                promoted = items[self._rng.integers(2):even:2]
+                self.levels[level] = items[even:]  # Odd item out stays at this level
+                if level + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                self.levels[level + 1] = np.concatenate([self.levels[level + 1], promoted])
+            level += 1
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0))
+        for level, items in enumerate(other.levels):
+            self.levels[level] = np.concatenate([self.levels[level], items])
+        self._compress()
+        return self
+
+    def quantiles(self, qs):
+        """Returns approximate values at the given quantiles (NaN if the sketch is empty)."""
+        items = np.concatenate(self.levels)
+        if len(items) == 0:
+            return np.full(len(qs), np.nan)
+        weights = np.concatenate([np.full(len(lvl), 2.0 ** i) for i, lvl in enumerate(self.levels)])
+        order = np.argsort(items)
+        items, cum_weights = items[order], np.cumsum(weights[order])
+        positions = np.searchsorted(cum_weights, np.asarray(qs) * cum_weights[-1], side="left")
+        return items[np.clip(positions, 0, len(items) - 1)]
+
+
+class ColumnStats:
+    """Running, mergeable statistics for one column."""
+
+    def __init__(self, name):
+        self.name = name
+        self.dtype = None
+        self.numeric = True
+        self.count = 0  # Non-null values
+        self.missing = 0
+        self.min = np.inf
+        self.max = -np.inf
+        self.mean = 0.0
+        self.m2 = 0.0  # Sum of squared deviations from the mean (Welford)
+        self.quantiles = QuantileSketch()
+        self.distinct = HyperLogLog()
+
+    def _merge_dtype(self, dtype):
+        if self.dtype is None or self.dtype == dtype:
+            return dtype
+        try:
+            return np.result_type(self.dtype, dtype)
+        except TypeError:
+            return np.dtype(object)
+
+    def _merge_moments(self, n, mean, m2):
+        total = self.count + n
+        delta = mean - self.mean
+        self.mean += delta * n / total
+        self.m2 += m2 + delta * delta * self.count * n / total
+
+    def update(self, series):
+        """Folds one chunk of the column into the running statistics."""
+        values = series.dropna()
+        self.dtype = self._merge_dtype(series.dtype)
+        self.missing += len(series) - len(values)
+        self.distinct.update(values)
+        if self.numeric and not _is_numeric(series):
+            self.numeric = False  # e.g. a text value appeared in a later chunk
+        if self.numeric and len(values) > 0:
+            x = values.to_numpy(dtype=np.float64)
+            mean = x.mean()
+            self._merge_moments(len(x), mean, float(((x - mean) ** 2).sum()))
+            self.min = min(self.min, x.min())
+            self.max = max(self.max, x.max())
+            self.quantiles.update(x)
+        self.count += len(values)
+
+    def merge(self, other):
+        self.dtype = self._merge_dtype(other.dtype) if other.dtype is not None else self.dtype
+        self.numeric = self.numeric and other.numeric
+        self.missing += other.missing
+        self.distinct.merge(other.distinct)
+        if self.numeric and other.count > 0:
+            self._merge_moments(other.count, other.mean, other.m2)
+            self.min = min(self.min, other.min)
+            self.max = max(self.max, other.max)
+            self.quantiles.merge(other.quantiles)
+        self.count += other.count
+        return self
+
+    def std(self):
+        return np.sqrt(self.m2 / (self.count - 1)) if self.count > 1 else np.nan
+
+
+class RowSample:
+    """Mergeable uniform sample of rows (bottom-k of random keys)."""
+
+    def __init__(self, size=SAMPLE_ROWS, seed=None):
+        self.size = size
+        self.rows = pd.DataFrame()
+        self.keys = np.empty(0)
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, chunk):
+        self._keep(chunk, self._rng.random(len(chunk)))
+
+    def merge(self, other):
+        self._keep(other.rows, other.keys)
+        return self
+
+    def _keep(self, rows, keys):
+        if len(self.keys) > 0:
+            rows = pd.concat([self.rows, rows], ignore_index=True)
+            keys = np.concatenate([self.keys, keys])
+        else:
+            rows = rows.reset_index(drop=True)
+        if len(keys) > self.size:
+            keep = np.sort(np.argpartition(keys, self.size)[:self.size])
+            rows, keys = rows.iloc[keep].reset_index(drop=True), keys[keep]
+        self.rows, self.keys = rows, keys
+
+
+class StreamingProfile:
+    """Dataset statistics accumulated chunk by chunk in bounded memory."""
+
+    def __init__(self, sample_rows=SAMPLE_ROWS):
+        self.rows = 0
+        self.columns = {}  # name -> ColumnStats, in first-seen order
+        self.sample = RowSample(sample_rows)
+        self.done = False
+
+    def update(self, chunk):
+        """Folds a DataFrame chunk into the profile."""
+        for name in chunk.columns:
+            if name not in self.columns:
+                self.columns[name] = ColumnStats(name)
+                self.columns[name].missing = self.rows  # Column absent from earlier chunks
+            self.columns[name].update(chunk[name])
+        for name, stats in self.columns.items():
+            if name not in chunk.columns:
+                stats.missing += len(chunk)
+        self.rows += len(chunk)
+        self.sample.update(chunk)
+        return self
+
+    def merge(self, other):
+        """Combines two profiles built from disjoint parts of a dataset."""
+        for name, stats in other.columns.items():
+            if name in self.columns:
+                self.columns[name].merge(stats)
+            else:
+                self.columns[name] = ColumnStats(name)
+                self.columns[name].missing = self.rows
+                self.columns[name].merge(stats)
+        for name, stats in self.columns.items():
+            if name not in other.columns:
+                stats.missing += other.rows
+        self.rows += other.rows
+        self.sample.merge(other.sample)
+        return self
+
+    @property
+    def column_count(self):
+        return len(self.columns)
+
+    def summary_stats(self):
+        """Returns describe()-style statistics for numeric columns (quantiles are approximate)."""
+        records = []
+        for name, stats in self.columns.items():
+            if not stats.numeric or stats.count == 0:
+                continue
+            q25, q50, q75 = stats.quantiles.quantiles([0.25, 0.5, 0.75])
+            records.append({
+                "Variable": name, "count": float(stats.count), "mean": stats.mean, "std": stats.std(),
+                "min": stats.min, "25%": q25, "50%": q50, "75%": q75, "max": stats.max,
+            })
+        return pd.DataFrame(records)
+
+    def var_types(self):
+        """Returns per-column type, approximate distinct count and missing values."""
+        return pd.DataFrame({
+            "Variable": list(self.columns),
+            "Data Type": [str(stats.dtype) for stats in self.columns.values()],
+            "Unique Values": [stats.distinct.count() for stats in self.columns.values()],
+            "Missing Values": [stats.missing for stats in self.columns.values()],
+            "% Missing": [round(stats.missing / self.rows * 100, 2) if self.rows else 0.0
+                          for stats in self.columns.values()],
+        })
+
+
+def profile_file(file_path, chunk_rows=STREAM_CHUNK_ROWS, sample_rows=SAMPLE_ROWS):
+    """Streams a whole file through a StreamingProfile and returns it."""
+    profile = StreamingProfile(sample_rows)
+    for chunk in iter_chunks(file_path, chunk_rows):
+        profile.update(chunk)
+    profile.done = True
+    return profile
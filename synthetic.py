@@ -0,0 +1,93 @@
+import argparse
+import numpy as np
+import pandas as pd
+
+WRITERS = {
+    "csv": lambda df, path: df.to_csv(path, index=False),
+    "tsv": lambda df, path: df.to_csv(path, sep="\t", index=False),
+    "txt": lambda df, path: df.to_csv(path, sep="\t", index=False),
+    "json": lambda df, path: df.to_json(path, date_format="iso"),
+    "jsonl": lambda df, path: df.to_json(path, orient="records", lines=True, date_format="iso"),
+    "xlsx": lambda df, path: df.to_excel(path, index=False),
+    "parquet": lambda df, path: df.to_parquet(path, index=False),
+    "feather": lambda df, path: df.to_feather(path),
+    "gz": lambda df, path: df.to_csv(path, index=False, compression="gzip"),  # e.g. big.csv.gz
+}
+
+
+def generate_dataset(rows=100_000, numeric=6, categorical=3, datetime=1, boolean=1, missing_rate=0.05,
+                     cardinality=20, outlier_rate=0.01, seed=0):
+    """Returns a synthetic DataFrame with the given shape and dtype mix.
+
+    Numeric columns are correlated normals, every third one log-normal and every third one integer,
+    with `outlier_rate` of values pushed 8-15 standard deviations out. Categorical columns
+    draw `cardinality` levels with Zipf-like frequencies. Every column except the first numeric one
+    has `missing_rate` of its values set to missing (integer columns become nullable Int64).
+    """
+    rng = np.random.default_rng(seed)
+    columns = {}
+    base = rng.standard_normal(rows)
+    for i in range(numeric):
+        values = 0.5 * base + rng.standard_normal(rows)  # Shared component -> nonzero correlations
+        if outlier_rate > 0:
+            outliers = rng.random(rows) < outlier_rate
+            signs = rng.choice([-1, 1], outliers.sum())
+            values[outliers] += signs * rng.uniform(8, 15, outliers.sum()) * values.std()
+        if i % 3 == 1:
+            values = np.exp(values / 4)  # Right-skewed
+        elif i % 3 == 2:
+            values = np.round(values * 100).astype(np.int64)
+        columns[f"num_{i}"] = values
+    weights = 1 / np.arange(1, cardinality + 1)
+    levels = np.array([f"level_{j}" for j in range(cardinality)], dtype=object)
+    for i in range(categorical):
+        columns[f"cat_{i}"] = levels[rng.choice(cardinality, rows, p=weights / weights.sum())]
+    for i in range(datetime):
+        columns[f"date_{i}"] = pd.Timestamp("2020-01-01") + pd.to_timedelta(rng.integers(0, 5 * 365 * 86400, rows), unit="s")
+    for i in range(boolean):
+        columns[f"flag_{i}"] = rng.random(rows) < 0.3
+    df = pd.DataFrame(columns)
+
+    if missing_rate > 0:
+        for col in df.columns[1:]:
+            missing = rng.random(rows) < missing_rate
+            if df[col].dtype == bool:
+                df[col] = df[col].astype(object)
+            elif df[col].dtype.kind == "i":
+                df[col] = df[col].astype("Int64")  # Nullable, so the missing values don't turn it into floats
+            df.loc[missing, col] = None
+    return df
+
+
+def write_dataset(df, path):
+    """Writes df in the format given by the file extension (any format load_dataset reads, except RDS)."""
+    ext = str(path).split(".")[-1].lower()
+    if ext not in WRITERS:
+        raise ValueError(f"Unsupported file type: .{ext}")
+    WRITERS[ext](df, path)
+    return path
+
+
+def main(argv=None):
+    """Writes a synthetic dataset: python synthetic.py big.csv --rows 1000000 --numeric 20"""
+    parser = argparse.ArgumentParser(description="Generate a synthetic dataset for testing and benchmarks.")
+    parser.add_argument("output", help="Output path; the extension picks the format (csv, tsv, txt, json, jsonl, xlsx, parquet, feather, csv.gz)")
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--numeric", type=int, default=6)
+    parser.add_argument("--categorical", type=int, default=3)
+    parser.add_argument("--datetime", type=int, default=1)
+    parser.add_argument("--boolean", type=int, default=1)
+    parser.add_argument("--missing-rate", type=float, default=0.05)
+    parser.add_argument("--cardinality", type=int, default=20)
+    parser.add_argument("--outlier-rate", type=float, default=0.01)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    df = generate_dataset(args.rows, args.numeric, args.categorical, args.datetime, args.boolean,
+                          args.missing_rate, args.cardinality, args.outlier_rate, args.seed)
+    write_dataset(df, args.output)
+    print(f"Wrote {len(df):,} rows x {df.shape[1]} columns to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+import pytest
+import column_stats
+from column_stats import column_statistics
+
+STATISTICS = ["mean", "median", "std", "min", "max", "mode", "q1", "q3", "mad"]
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.standard_normal((2_000, 10)), columns=[f"x{i}" for i in range(10)])
+    df["x3"] = rng.integers(0, 5, 2_000).astype(np.int64)
+    df.loc[rng.random(2_000) < 0.1, "x1"] = np.nan
+    return df
+
+
+def test_serial_matches_pandas(frame):
+    values = column_statistics(frame, STATISTICS, workers=1)
+    pd.testing.assert_series_equal(values["mean"], frame.mean(), check_names=False)
+    pd.testing.assert_series_equal(values["std"], frame.std(), check_names=False)
+    pd.testing.assert_series_equal(values["q1"], frame.quantile(0.25), check_names=False)
+    pd.testing.assert_series_equal(values["mad"], (frame - frame.median()).abs().median(), check_names=False)
+    assert values["mode"]["x3"] == frame["x3"].mode().iloc[0]
+
+
+def test_parallel_matches_serial(frame, monkeypatch):
+    monkeypatch.setattr(column_stats, "PARALLEL_MIN_CELLS", 0)
+    serial = column_statistics(frame, STATISTICS, workers=1)
+    parallel = column_statistics(frame, STATISTICS, workers=2)
+    for statistic in STATISTICS:
+        pd.testing.assert_series_equal(parallel[statistic], serial[statistic], check_exact=True)
@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+import pytest
+from compact import compact_frame, compact_series
+
+
+@pytest.mark.parametrize("values", [
+    [0, 1, 2, 3],
+    [-5, 127, 128, 255],  # int8/int16 range: kept at int32, whose arithmetic doesn't wrap
+    [-(2**30), 2**30 - 1],  # The widest range int32 takes, with a bit to spare
+])
+def test_small_integers_become_int32_with_exact_arithmetic(values):
+    original = pd.Series(np.array(values * 3, dtype=np.int64))
+    compacted = compact_series(original)
+    assert compacted.dtype == np.int32
+    assert (compacted == original).all()
+    pd.testing.assert_series_equal((compacted + compacted).astype(np.int64), original + original)
+    pd.testing.assert_series_equal((compacted - compacted[::-1].to_numpy()).astype(np.int64),
+                                   original - original[::-1].to_numpy())
+    assert compacted.sum() == original.sum()
+
+
+@pytest.mark.parametrize("values", [[0, 2**30], [-(2**30) - 1, 0], [0, 2**40]])
+def test_integers_without_headroom_stay_int64(values):
+    assert compact_series(pd.Series(values, dtype=np.int64)).dtype == np.int64
+
+
+def test_strings_round_trip():
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({
+        "few": rng.choice(["b", "a", "c"], 1_000).astype(object),
+        "many": [f"id_{i}" for i in range(1_000)],
+        "floats": rng.standard_normal(1_000),
+    })
+    df.loc[::7, "few"] = None
+    compacted, report = compact_frame(df)
+    assert isinstance(compacted["few"].dtype, pd.CategoricalDtype)
+    assert list(compacted["few"].cat.categories) == ["a", "b", "c"]  # Sorted, so sorting keeps its order
+    assert compacted["few"].isna().equals(df["few"].isna())
+    assert (compacted["few"].astype(object).dropna() == df["few"].dropna()).all()
+    assert (compacted["many"].astype(object) == df["many"]).all()
+    assert compacted["floats"].dtype == np.float64 and compacted["floats"].equals(df["floats"])
+    assert list(report["Column"]) == ["few", "many", "floats"]
+    assert (report["Bytes After"] <= report["Bytes Before"]).all()
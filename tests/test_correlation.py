@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import pytest
+import correlation
+from correlation import correlation_matrix
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    n = 3_000
+    base = rng.standard_normal(n)
+    df = pd.DataFrame({
+        "a": base + rng.standard_normal(n),
+        "b": np.exp(base),
+        "c": np.round(base * 2),  # Ties
+        "d": rng.standard_normal(n),
+    })
+    df.loc[rng.random(n) < 0.1, "a"] = np.nan
+    df.loc[rng.random(n) < 0.2, "c"] = np.nan
+    return df
+
+
+@pytest.mark.parametrize("method", ["pearson", "spearman", "kendall"])
+def test_matches_dataframe_corr(frame, method):
+    result = correlation_matrix(frame, frame.columns, method, parallel=False)
+    assert not result.approximate and result.lower is None
+    pd.testing.assert_frame_equal(result.matrix, frame.corr(method=method), atol=1e-12, rtol=0)
+
+
+def test_spearman_reuses_cached_ranks(frame):
+    first = correlation_matrix(frame, ["a", "b", "c"], "spearman", dataset_key="test-ranks")
+    again = correlation_matrix(frame, ["c", "d", "a"], "spearman", dataset_key="test-ranks")
+    expected = frame[["c", "d", "a"]].corr(method="spearman")
+    pd.testing.assert_frame_equal(again.matrix, expected, atol=1e-12, rtol=0)
+    assert first.matrix.loc["a", "c"] == pytest.approx(again.matrix.loc["a", "c"])
+
+
+def test_parallel_kendall_matches_serial(frame, monkeypatch):
+    monkeypatch.setattr(correlation, "CORRELATION_WORKERS", 2)
+    monkeypatch.setattr(correlation, "PARALLEL_MIN_CELLS", 0)
+    block = frame.to_numpy(dtype=np.float64)
+    np.testing.assert_array_equal(correlation._kendall(block, parallel=True), correlation._kendall(block, parallel=False))
+
+
+def test_approximate_bounds_contain_the_estimate(frame):
+    result = correlation_matrix(frame, frame.columns, "pearson", approximate=True, sample_rows=1_000)
+    assert result.approximate and result.n == 1_000
+    assert (result.lower.to_numpy() <= result.matrix.to_numpy() + 1e-12).all()
+    assert (result.matrix.to_numpy() <= result.upper.to_numpy() + 1e-12).all()
+    exact = frame.corr().to_numpy()
+    inside = (result.lower.to_numpy() <= exact) & (exact <= result.upper.to_numpy())
+    assert inside.mean() > 0.8  # 95% intervals
@@ -0,0 +1,52 @@
+import os
+import time
+import numpy as np
+import pandas as pd
+from dataset_cache import STALE_PARTIAL_SECONDS, DatasetCache, frame_nbytes
+
+
+def write(path, size, age=0):
+    path.write_bytes(b"x" * size)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+
+
+def test_pruning_counts_databases_and_removes_stale_partials(tmp_path):
+    cache = DatasetCache(max_bytes=1 << 20, snapshot_dir=tmp_path, max_disk_bytes=250)
+    write(tmp_path / "old.duckdb", 100, age=30)
+    write(tmp_path / "middle.arrow", 100, age=20)
+    write(tmp_path / "new.duckdb", 100, age=10)
+    write(tmp_path / "crashed.1.2.tmp", 100, age=STALE_PARTIAL_SECONDS + 60)
+    write(tmp_path / "writing.3.4.tmp", 100)
+    cache.prune_snapshots()
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["middle.arrow", "new.duckdb", "writing.3.4.tmp"]
+
+
+def test_clear_disk_removes_databases_but_not_writes_in_progress(tmp_path):
+    cache = DatasetCache(max_bytes=1 << 20, snapshot_dir=tmp_path)
+    write(tmp_path / "a.arrow", 10)
+    write(tmp_path / "b.duckdb", 10)
+    write(tmp_path / "crashed.tmp", 10, age=STALE_PARTIAL_SECONDS + 60)
+    write(tmp_path / "writing.tmp", 10)
+    cache.clear(disk=True)
+    assert [path.name for path in tmp_path.iterdir()] == ["writing.tmp"]
+
+
+def test_metadata_is_evicted_with_its_frame():
+    df = pd.DataFrame({"x": np.arange(1_000, dtype=np.float64)})
+    cache = DatasetCache(max_bytes=frame_nbytes(df) * 2)
+    cache.put("a", df, {"name": "a"})
+    cache.put("b", df, {"name": "b"})
+    assert cache.metadata("a") == {"name": "a"}
+    cache.put("c", df, {"name": "c"})  # Evicts "b", now the least recently used
+    assert cache.get("b") is None and cache.metadata("b") is None
+    assert cache.metadata("c") == {"name": "c"}
+
+
+def test_metadata_comes_back_from_the_snapshot(tmp_path):
+    df = pd.DataFrame({"x": np.arange(1_000, dtype=np.float64)})
+    cache = DatasetCache(max_bytes=1 << 20, snapshot_dir=tmp_path)
+    cache.put("a", df, {"name": "a"})
+    cache.clear()
+    assert cache.metadata("a") == {"name": "a"}
+    pd.testing.assert_frame_equal(cache.get("a"), df)
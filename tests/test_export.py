@@ -0,0 +1,57 @@
+import io
+import numpy as np
+import pandas as pd
+import pytest
+from export import iter_export, iter_export_chunks
+from encoding import CategoryCodes, one_hot_chunks, one_hot_schema
+
+
+def read(written, fmt):
+    return pd.read_parquet(io.BytesIO(written)) if fmt == "parquet" else pd.read_feather(io.BytesIO(written))
+
+
+def late_values_frame(rows=3_000):
+    """Object columns that are all missing for the first rows, like a sparse optional field."""
+    floats = pd.Series([None] * rows, dtype=object)
+    floats[2_000:] = 1.5
+    flags = pd.Series([None] * rows, dtype=object)
+    flags[2_500:] = True
+    return pd.DataFrame({"floats": floats, "flags": flags, "i": np.arange(rows)})
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "feather"])
+def test_schema_comes_from_the_whole_frame(fmt):
+    df = late_values_frame()
+    result = read(b"".join(iter_export(df, fmt, chunk_rows=1_000)), fmt)
+    assert result["floats"].dtype == np.float64
+    np.testing.assert_array_equal(result["floats"].to_numpy(), df["floats"].to_numpy(dtype=np.float64, na_value=np.nan))
+    assert result["flags"].tolist() == df["flags"].tolist()
+    assert result["i"].tolist() == df["i"].tolist()
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "feather"])
+def test_chunks_are_cast_to_the_first_chunks_schema(fmt):
+    # read_csv chunks: ints until a missing value turns the column into floats, a column empty at first
+    chunks = [pd.DataFrame({"n": [1, 2], "s": [None, None]}),
+              pd.DataFrame({"n": [3.0, np.nan], "s": ["a", None]})]
+    result = read(b"".join(iter_export_chunks(chunks, fmt)), fmt)
+    assert result["n"].tolist()[:3] == [1, 2, 3] and pd.isna(result["n"].iloc[3])
+    assert result["s"].tolist()[2] == "a"
+
+
+def test_chunk_that_does_not_fit_the_schema_raises():
+    chunks = [pd.DataFrame({"n": [1, 2]}), pd.DataFrame({"n": [2.5, 3.0]})]
+    with pytest.raises(ValueError, match="schema"):
+        b"".join(iter_export_chunks(chunks, "parquet"))
+
+
+@pytest.mark.parametrize("fmt", ["parquet", "feather"])
+def test_one_hot_export_types_the_other_columns_from_the_whole_frame(fmt):
+    df = late_values_frame()
+    df["cat"] = np.array(["a", "b", "c"], dtype=object)[np.arange(len(df)) % 3]
+    codes = CategoryCodes(df["cat"])
+    chunks = one_hot_chunks(df, "cat", codes, chunk_rows=1_000)
+    result = read(b"".join(iter_export_chunks(chunks, fmt, one_hot_schema(df, "cat", codes))), fmt)
+    assert list(result.columns) == ["floats", "flags", "i", "cat_a", "cat_b", "cat_c"]
+    assert result["floats"].dtype == np.float64
+    assert result["cat_b"].tolist() == (df["cat"] == "b").tolist()
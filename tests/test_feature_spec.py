@@ -0,0 +1,32 @@
+import io
+import numpy as np
+import pandas as pd
+from feature_spec import iter_transform_chunks, iter_transform_export, transform_frame
+
+
+def frame(rows=10_000, levels=2_000):
+    rng = np.random.default_rng(0)
+    ids = pd.Series(np.array([f"id_{i:04d}" for i in range(levels)], dtype=object)[rng.integers(0, levels, rows)])
+    ids[rng.random(rows) < 0.05] = None
+    return pd.DataFrame({"id": ids, "x": rng.standard_normal(rows)})
+
+
+def test_one_hot_frame_is_sparse_and_matches_the_chunks():
+    df = frame()
+    result = transform_frame(df, "id", "one_hot")
+    chunks = pd.concat(iter_transform_chunks(df, "id", "one_hot", chunk_rows=3_000))
+    assert list(result.columns) == list(chunks.columns)
+    indicators = result.columns[1:]
+    assert all(isinstance(dtype, pd.SparseDtype) for dtype in result[indicators].dtypes)
+    assert result[indicators].memory_usage().sum() < len(df) * 16  # Not rows x levels
+    present = df["id"].notna()
+    np.testing.assert_array_equal(result.loc[present, indicators].sparse.to_dense().to_numpy(dtype=bool),
+                                  chunks.loc[present, indicators].to_numpy(dtype=bool))
+    assert not result.loc[~present, indicators].sparse.to_dense().to_numpy().any()
+
+
+def test_one_hot_export_matches_get_dummies():
+    df = frame(rows=2_000, levels=50)
+    written = b"".join(iter_transform_export(df, "id", "one_hot", "csv"))
+    expected = pd.concat([df.drop(columns=["id"]), pd.get_dummies(df["id"].dropna(), prefix="id")], axis=1)
+    pd.testing.assert_frame_equal(pd.read_csv(io.BytesIO(written)), pd.read_csv(io.StringIO(expected.to_csv(index=False))))
@@ -0,0 +1,62 @@
+import gzip
+import numpy as np
+import pandas as pd
+import pytest
+from formats import read_file, sniff_format
+from synthetic import generate_dataset, write_dataset
+
+
+@pytest.fixture(scope="module")
+def frame():
+    return generate_dataset(rows=2_000, numeric=3, categorical=2, seed=1)
+
+
+def assert_same_values(got, expected):
+    """Same columns and values; the readers may pick different (equivalent) dtypes."""
+    assert list(got.columns) == list(expected.columns)
+    for name in expected.columns:
+        left, right = got[name], expected[name]
+        if pd.api.types.is_numeric_dtype(right) and not pd.api.types.is_bool_dtype(right):
+            np.testing.assert_allclose(left.to_numpy(dtype=np.float64, na_value=np.nan),
+                                       right.to_numpy(dtype=np.float64, na_value=np.nan), rtol=1e-12)
+        else:
+            assert left.isna().equals(right.isna()), name
+            assert (left.dropna().astype(str).to_numpy() == right.dropna().astype(str).to_numpy()).all(), name
+
+
+@pytest.mark.parametrize("name, kind, delimiter, reference", [
+    ("data.csv", "csv", ",", lambda path: pd.read_csv(path)),
+    ("data.tsv", "csv", "\t", lambda path: pd.read_csv(path, sep="\t")),
+    ("data.csv.gz", "csv", ",", lambda path: pd.read_csv(path)),
+    ("data.jsonl", "jsonl", None, lambda path: pd.read_json(path, lines=True)),
+    ("data.parquet", "parquet", None, pd.read_parquet),
+    ("data.feather", "feather", None, pd.read_feather),
+])
+def test_read_file_matches_pandas(tmp_path, frame, name, kind, delimiter, reference):
+    path = write_dataset(frame, tmp_path / name)
+    fmt = sniff_format(path)
+    assert (fmt.kind, fmt.delimiter) == (kind, delimiter)
+    assert_same_values(read_file(path), reference(path))
+
+
+@pytest.mark.parametrize("delimiter", [";", "|", "\t"])
+def test_sniffs_the_delimiter_not_the_extension(tmp_path, frame, delimiter):
+    path = tmp_path / "data.csv"
+    frame.to_csv(path, sep=delimiter, index=False)
+    assert sniff_format(path).delimiter == delimiter
+    assert_same_values(read_file(path), pd.read_csv(path, sep=delimiter))
+
+
+def test_sniffs_content_behind_a_misleading_extension(tmp_path, frame):
+    path = tmp_path / "data.txt"
+    with gzip.open(path, "wt") as f:
+        frame.head(100).to_json(f, orient="records", lines=True, date_format="iso")
+    fmt = sniff_format(path)
+    assert (fmt.kind, fmt.compression) == ("jsonl", "gzip")
+    assert_same_values(read_file(path), pd.read_json(path, lines=True, compression="gzip"))
+
+
+def test_latin1_text(tmp_path):
+    path = tmp_path / "latin.csv"
+    path.write_bytes("name,value\ncafé,1\nnaïve,2\n".encode("latin-1"))
+    assert_same_values(read_file(path), pd.read_csv(path, encoding="latin-1"))
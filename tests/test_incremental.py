@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+from incremental import CoMoments, appendable
+
+
+def batch(seed, rows, offset=0.0):
+    rng = np.random.default_rng(seed)
+    base = rng.standard_normal(rows)
+    df = pd.DataFrame({
+        "a": 1e6 + base + rng.standard_normal(rows),  # Large offset: the shifted sums must keep precision
+        "b": base * 3 + offset,
+        "c": rng.integers(0, 100, rows),
+        "label": rng.choice(["x", "y", "z"], rows),
+    })
+    df.loc[rng.random(rows) < 0.05, "b"] = np.nan
+    return df
+
+
+@pytest.fixture
+def versions():
+    batches = [batch(0, 5_000), batch(1, 2_000, offset=5.0), batch(2, 3_000, offset=-2.0)]
+    version = appendable(batches[0], None)
+    for i, rows in enumerate(batches[1:]):
+        version = version.append(rows, f"batch-{i}")
+    return batches, version
+
+
+def test_pearson_matches_full_recompute(versions):
+    batches, version = versions
+    full = pd.concat(batches, ignore_index=True)
+    columns = ["a", "b", "c"]
+    result = version.correlation_matrix(columns)
+    assert not result.approximate and result.n == len(full)
+    np.testing.assert_allclose(result.matrix.to_numpy(), full[columns].corr().to_numpy(), atol=1e-10)
+
+
+def test_comoments_merge_matches_update():
+    left, right = batch(3, 1_000), batch(4, 1_500, offset=100.0)
+    merged = CoMoments().update(left, ["a", "b"]).merge(CoMoments().update(right, ["b", "c"]))
+    full = pd.concat([left[["a", "b"]], right[["b", "c"]]], ignore_index=True)  # Columns missing on a side are NaN
+    columns = ["a", "b", "c"]
+    expected = full[columns].corr()
+    np.testing.assert_allclose(merged.correlation(columns).to_numpy(), expected.to_numpy(), atol=1e-10)
+
+
+@pytest.mark.parametrize("transformation", ["standard", "minmax"])
+def test_scaler_matches_full_recompute(versions, transformation):
+    batches, version = versions
+    column = pd.concat(batches, ignore_index=True)["b"]
+    center, spread = version.scaler("b", transformation)
+    if transformation == "standard":
+        assert (center, spread) == pytest.approx((column.mean(), column.std()), rel=1e-10)
+    else:
+        assert (center, spread) == pytest.approx((column.min(), column.max() - column.min()), rel=1e-12)
+
+
+def test_profile_and_frame_cover_every_batch(versions):
+    batches, version = versions
+    full = pd.concat(batches, ignore_index=True)
+    assert version.rows == len(full) and version.batches == 2
+    pd.testing.assert_frame_equal(version.frame, full)
+    stats = version.profile.columns["b"]
+    assert stats.count == full["b"].count()
+
+
+def test_versions_keep_their_own_statistics():
+    first = appendable(batch(0, 1_000), None)
+    second = first.append(batch(1, 1_000, offset=50.0), "next")
+    assert first.rows == 1_000 and len(first.frame) == 1_000
+    assert first.profile.columns["b"].mean != pytest.approx(second.profile.columns["b"].mean)
+    assert first.key != second.key
+    with pytest.raises(ValueError):
+        first.append(batch(2, 10), "stale")  # Only the latest version grows
+
+
+def test_sessions_do_not_share_batches():
+    df = batch(0, 500)
+    one, two = appendable(df, "same-file"), appendable(df, "same-file")
+    one.append(batch(1, 500), "one")
+    assert two.append(batch(2, 100), "two").rows == 600
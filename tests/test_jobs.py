@@ -0,0 +1,20 @@
+import asyncio
+import threading
+from jobs import ANALYSIS_WORKERS, job_stats, run_analysis_in_background, run_in_background
+
+
+def test_busy_analysis_pool_does_not_delay_other_jobs():
+    release = threading.Event()
+
+    async def scenario():
+        stale = [asyncio.ensure_future(run_analysis_in_background(release.wait, name="stale"))
+                 for _ in range(ANALYSIS_WORKERS)]
+        await asyncio.sleep(0.05)
+        for task in stale:
+            task.cancel()  # Superseded, but their threads keep running until release
+        result = await asyncio.wait_for(run_in_background(sum, [1, 2, 3]), timeout=5)
+        release.set()
+        return result
+
+    assert asyncio.run(scenario()) == 6
+    assert job_stats()["cancelled"] >= ANALYSIS_WORKERS
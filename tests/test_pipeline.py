@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pipeline import Pipeline
+from streaming import StreamingProfile, iter_chunks
+from synthetic import generate_dataset, write_dataset
+
+
+@pytest.fixture(scope="module")
+def path(tmp_path_factory):
+    df = generate_dataset(rows=20_000, numeric=4, categorical=1, datetime=0, boolean=0, seed=2)
+    return write_dataset(df, tmp_path_factory.mktemp("pipeline") / "data.csv")
+
+
+@pytest.fixture(scope="module")
+def frame(path):
+    return pd.read_csv(path)
+
+
+def run_both(path, frame, steps):
+    pipeline = Pipeline(steps)
+    expected = pipeline.run(frame, cache=None, workers=1)
+    streamed = pd.concat(pipeline.run_chunks(lambda: iter_chunks(path, chunk_rows=3_000)))
+    return streamed, expected
+
+
+@pytest.mark.parametrize("steps", [
+    [{"step": "impute", "method": "mean"}, {"step": "scale", "method": "zscore"}],
+    [{"step": "impute", "method": "drop"}, {"step": "outliers", "method": "remove", "rule": "zscore"},
+     {"step": "scale", "method": "minmax"}],
+    [{"step": "outliers", "method": "clip", "rule": "zscore"}, {"step": "impute", "method": "remove_columns",
+                                                                "threshold": 3}],
+    [{"step": "outliers", "method": "mean", "rule": "zscore"}],
+])
+def test_exact_steps_match_the_in_memory_pipeline(path, frame, steps):
+    streamed, expected = run_both(path, frame, steps)
+    pd.testing.assert_index_equal(streamed.index, expected.index)
+    pd.testing.assert_frame_equal(streamed, expected, check_dtype=False, atol=1e-9, rtol=0)
+
+
+def test_sketched_steps_are_close(path, frame):
+    streamed, expected = run_both(path, frame, [{"step": "impute", "method": "median"}, {"step": "scale", "method": "robust"}])
+    numeric = expected.select_dtypes(np.number).columns
+    error = (streamed[numeric] - expected[numeric]).abs() / (1 + expected[numeric].abs())
+    assert (error.max() < 0.02).all()  # Medians and quartiles come from the quantile sketch
+
+
+def test_raw_profile_saves_the_first_pass(frame):
+    steps = [{"step": "impute", "method": "mean"}]
+    passes = []
+
+    def chunks():
+        passes.append(1)
+        return (frame.iloc[start:start + 5_000] for start in range(0, len(frame), 5_000))
+
+    profile = StreamingProfile(sample_rows=0).update(frame)
+    profile.done = True
+    streamed = pd.concat(Pipeline(steps).run_chunks(chunks, profile))
+    assert len(passes) == 1
+    pd.testing.assert_frame_equal(streamed, Pipeline(steps).run(frame, cache=None), check_dtype=False)
+
+
+def test_unstreamable_steps_are_refused(frame):
+    pipeline = Pipeline([{"step": "impute", "method": "mode"}, {"step": "leverage", "method": "remove"}])
+    assert set(pipeline.streaming_issues()) == {"impute", "leverage"}
+    with pytest.raises(ValueError):
+        next(pipeline.run_chunks(lambda: iter([frame])))
+
+
+@pytest.mark.parametrize("step", [
+    {"step": "impute", "method": "mean"},
+    {"step": "outliers", "method": "clip", "rule": "iqr"},
+    {"step": "leverage", "method": "mean"},
+    {"step": "scale", "method": "robust"},
+])
+def test_nullable_integers_are_processed_as_floats(step):
+    df = generate_dataset(rows=2_000, numeric=3, categorical=0, datetime=0, boolean=0, seed=4)  # num_2 is Int64
+    floats = df.astype({"num_2": np.float64})
+    result = Pipeline([step]).run(df, fingerprint="nullable", cache=None)
+    assert result["num_2"].dtype == np.float64
+    pd.testing.assert_frame_equal(result, Pipeline([step]).run(floats, fingerprint="floats", cache=None))
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pushdown import SqlDataset
+
+pytest.importorskip("duckdb")  # Optional dependency
+
+
+def frame(rows=5_000):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"x": rng.standard_normal(rows), "y": rng.integers(0, 10, rows).astype(float),
+                       "label": rng.choice(["a", "b", "c"], rows)})
+    df.loc[rng.random(rows) < 0.05, "x"] = np.nan
+    return df
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".parquet"])
+def test_dataset_outlives_its_upload(tmp_path, suffix):
+    df = frame()
+    upload = tmp_path / f"upload{suffix}"
+    df.to_csv(upload, index=False) if suffix == ".csv" else df.to_parquet(upload, index=False)
+    dataset = SqlDataset(upload, tmp_path / "cache", "key")
+    upload.unlink()  # Shiny deletes the upload directory when the session ends
+    assert dataset.profile.rows == len(df)
+    assert dataset.value_counts("label").to_dict() == df["label"].value_counts().to_dict()
+    assert dataset.profile.columns["x"].count == df["x"].count()
+    np.testing.assert_allclose(dataset.profile.columns["x"].mean, df["x"].mean())
+    matrix = dataset.correlation_matrix(["x", "y"]).matrix
+    np.testing.assert_allclose(matrix.to_numpy(), df[["x", "y"]].corr().to_numpy())
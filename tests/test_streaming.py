@@ -0,0 +1,123 @@
+import numpy as np
+import pandas as pd
+import pytest
+from streaming import ChunkReader, HyperLogLog, QuantileSketch, StreamingProfile, profile_next_chunk
+
+
+def chunks_of(df, rows):
+    return [df.iloc[start:start + rows] for start in range(0, len(df), rows)]
+
+
+@pytest.fixture
+def frame():
+    rng = np.random.default_rng(0)
+    n = 60_000
+    df = pd.DataFrame({
+        "normal": rng.normal(10, 3, n),
+        "skewed": rng.lognormal(0, 1, n),
+        "ints": rng.integers(-1000, 1000, n),
+        "text": rng.choice([f"level_{i}" for i in range(50)], n),
+    })
+    df.loc[rng.random(n) < 0.1, "normal"] = np.nan
+    return df
+
+
+def test_quantile_sketch_rank_error(frame):
+    values = frame["skewed"].to_numpy()
+    sketch = QuantileSketch(seed=1)
+    for chunk in np.array_split(values, 13):
+        sketch.update(chunk)
+    qs = np.array([0.01, 0.25, 0.5, 0.75, 0.99])
+    ranks = np.searchsorted(np.sort(values), sketch.quantiles(qs)) / len(values)
+    assert np.abs(ranks - qs).max() < 0.02
+
+
+def test_quantile_sketch_merge_matches_single_pass_error(frame):
+    values = frame["normal"].dropna().to_numpy()
+    left, right = QuantileSketch(seed=1), QuantileSketch(seed=2)
+    left.update(values[:20_000])
+    right.update(values[20_000:])
+    median = left.merge(right).quantiles([0.5])[0]
+    assert abs((values < median).mean() - 0.5) < 0.02
+
+
+def test_hyperloglog_within_error():
+    exact = 50_000
+    hll = HyperLogLog()
+    for chunk in np.array_split(np.arange(exact), 7):
+        hll.update(chunk)
+    assert abs(hll.count() - exact) / exact < 5 * 0.016  # About 1.6% standard error at p=12
+
+
+def test_hyperloglog_small_counts_and_numeric_equality():
+    hll = HyperLogLog()
+    hll.update(pd.Series([1, 2, 3, None]))
+    hll.update(pd.Series([1.0, 2.0, 4.0]))  # 1 and 1.0 are the same value
+    assert hll.count() == 4
+
+
+def test_profile_moments_are_exact(frame):
+    profile = StreamingProfile()
+    for chunk in chunks_of(frame, 7_000):
+        profile.update(chunk)
+    for name in ("normal", "skewed", "ints"):
+        stats, column = profile.columns[name], frame[name]
+        assert stats.count == column.count()
+        assert stats.missing == column.isna().sum()
+        assert stats.mean == pytest.approx(column.mean(), rel=1e-12)
+        assert stats.std() == pytest.approx(column.std(), rel=1e-10)
+        assert (stats.min, stats.max) == (column.min(), column.max())
+    assert not profile.columns["text"].numeric
+    assert profile.rows == len(frame)
+
+
+def test_profile_merge_matches_single_pass(frame):
+    single = StreamingProfile().update(frame)
+    left, right = StreamingProfile(), StreamingProfile()
+    for chunk in chunks_of(frame.iloc[:25_000], 5_000):
+        left.update(chunk)
+    right.update(frame.iloc[25_000:])
+    merged = left.merge(right)
+    assert merged.rows == single.rows
+    for name, stats in single.columns.items():
+        other = merged.columns[name]
+        assert (other.count, other.missing) == (stats.count, stats.missing)
+        if stats.numeric:
+            assert other.mean == pytest.approx(stats.mean, rel=1e-12)
+            assert other.std() == pytest.approx(stats.std(), rel=1e-10)
+
+
+def test_profile_sample_is_bounded_and_drawn_from_the_rows(frame):
+    profile = StreamingProfile(sample_rows=1_000)
+    for chunk in chunks_of(frame, 9_000):
+        profile.update(chunk)
+    sample = profile.sample.rows
+    assert len(sample) == 1_000
+    assert sample["ints"].isin(frame["ints"]).all()
+    assert sample["skewed"].mean() == pytest.approx(frame["skewed"].mean(), rel=0.15)
+
+
+def test_var_types_missing_counts(frame):
+    profile = StreamingProfile().update(frame)
+    types = profile.var_types().set_index("Variable")
+    assert types.loc["normal", "Missing Values"] == frame["normal"].isna().sum()
+    assert abs(types.loc["text", "Unique Values"] - 50) <= 1
+
+
+def test_chunk_reader_profiles_every_row_and_closes(tmp_path, frame):
+    path = tmp_path / "frame.csv"
+    frame.to_csv(path, index=False)
+    reader = ChunkReader(path, chunk_rows=25_000)
+    profile = StreamingProfile()
+    while (part := profile_next_chunk(reader)) is not None:
+        profile.merge(part)
+    assert profile.rows == len(frame) and reader.closed
+
+
+def test_closed_chunk_reader_stops(tmp_path, frame):
+    path = tmp_path / "frame.csv"
+    frame.to_csv(path, index=False)
+    reader = ChunkReader(path, chunk_rows=25_000)
+    assert len(reader.read()) == 25_000
+    reader.close()
+    assert reader.read() is None
@@ -0,0 +1,17 @@
+import pandas as pd
+from synthetic import generate_dataset
+
+
+def test_integer_columns_stay_integers_with_missing_values():
+    df = generate_dataset(rows=1_000, numeric=3, missing_rate=0.1)
+    assert df["num_2"].dtype == "Int64"
+    assert df["num_2"].isna().any()
+    assert pd.api.types.is_integer_dtype(generate_dataset(rows=100, numeric=3, missing_rate=0)["num_2"])
+
+
+def test_shape_and_seed():
+    df = generate_dataset(rows=500, numeric=4, categorical=2, datetime=1, boolean=1, cardinality=5, seed=3)
+    assert df.shape == (500, 8)
+    assert df["cat_0"].nunique() <= 5
+    pd.testing.assert_frame_equal(df, generate_dataset(rows=500, numeric=4, categorical=2, datetime=1, boolean=1,
+                                                       cardinality=5, seed=3))
@@ -0,0 +1,112 @@
+import os
+import numpy as np
+import pandas as pd
+from lru import LRU
+
+TRANSFORM_CACHE_MAX_BYTES = int(os.environ.get("TRANSFORM_CACHE_MAX_BYTES", 512 * 1024**2))
+BIN_LABELS = ["Very Low", "Low", "Medium", "High", "Very High"]
+
+
+# **Vectorized kernels: each maps a float array of shape (n,) or (n, k) column-wise, NaN in -> NaN out**
+
+def _log(x):
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(x > 0, np.log1p(x), np.nan)  # Non-positive values are dropped, as before
+
+
+def _square(x):
+    return x ** 2
+
+
+def _cube(x):
+    return x ** 3
+
+
+def _standard(x):
+    return (x - np.nanmean(x, axis=0)) / np.nanstd(x, axis=0, ddof=1)
+
+
+def _minmax(x):
+    low = np.nanmin(x, axis=0)
+    return (x - low) / (np.nanmax(x, axis=0) - low)
+
+
+def _binning(x, bins=len(BIN_LABELS)):
+    """Equal-width bin codes 0..bins-1 with right-closed bins, like pd.cut(x, bins). NaN stays NaN."""
+    low, high = np.nanmin(x, axis=0), np.nanmax(x, axis=0)
+    width = (high - low) / bins
+    with np.errstate(invalid="ignore", divide="ignore"):
+        codes = np.clip(np.ceil((x - low) / width) - 1, 0, bins - 1)
+    codes = np.where(width == 0, bins // 2, codes)  # Constant column: pd.cut puts it in the middle bin
+    return np.where(np.isnan(x), np.nan, codes)
+
+
+SCALERS = ("standard", "minmax")  # Transformations whose parameters can be given (see scale_column)
+
+TRANSFORMS = {
+    "log": _log,
+    "square": _square,
+    "standard": _standard,
+    "minmax": _minmax,
+    "poly2": _square,
+    "poly3": _cube,
+    "binning": _binning,
+}
+
+
+def is_numeric(series):
+    return pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series)
+
+
+def apply_transform(series, transformation):
+    """Returns the transformed column aligned with the input index.
+
+    Transformations that don't apply (unknown name, non-numeric column) return the column unchanged.
+    Binning returns bin codes 0-4; see bin_labels().
+    """
+    kernel = TRANSFORMS.get(transformation)
+    if kernel is None or not is_numeric(series):
+        return series
+    with np.errstate(all="ignore"):
+        values = kernel(series.to_numpy(dtype=np.float64, na_value=np.nan))
+    return pd.Series(values, index=series.index, name=series.name)
+
+
+def scale_column(series, center, spread):
+    """The standard or minmax kernel with precomputed parameters: (x - center) / spread, as a float column.
+
+    With center/spread from running aggregates (incremental.AppendableDataset.scaler), rescaling after an
+    append doesn't need another pass over the column to find its mean, deviation or range.
+    """
+    with np.errstate(all="ignore"):
+        values = (series.to_numpy(dtype=np.float64, na_value=np.nan) - center) / spread
+    return pd.Series(values, index=series.index, name=series.name)
+
+
+def bin_labels(codes, labels=BIN_LABELS):
+    """Converts bin codes from the binning kernel to a labelled categorical."""
+    values = np.nan_to_num(codes.to_numpy(dtype=np.float64), nan=-1).astype(np.int8)  # -1 = missing
+    return pd.Series(pd.Categorical.from_codes(values, categories=labels), index=codes.index, name=codes.name)
+
+
+def transform_many(df, columns, transformations):
+    """Applies every transformation to every numeric column in one batched pass per transformation.
+
+    Returns a DataFrame with one `<column>_<transformation>` column per pair.
+    """
+    columns = [col for col in columns if is_numeric(df[col])]
+    if not columns:
+        return pd.DataFrame(index=df.index)
+    block = df[columns].to_numpy(dtype=np.float64, na_value=np.nan)  # (n, k): one copy for all kernels
+    results = {}
+    with np.errstate(all="ignore"):
+        for transformation in transformations:
+            out = TRANSFORMS[transformation](block)
+            for i, col in enumerate(columns):
+                results[f"{col}_{transformation}"] = out[:, i]
+    return pd.DataFrame(results, index=df.index)
+
+
+# (dataset, column, transformation) -> transformed column, bounded by bytes; shared by every session in this process
+transform_cache = LRU(max_bytes=TRANSFORM_CACHE_MAX_BYTES, sizeof=lambda series: series.memory_usage(index=False))
+